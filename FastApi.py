@@ -1,17 +1,58 @@
-from fastapi import FastAPI, Header, HTTPException, Depends
+from fastapi import FastAPI, Header, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from pymongo import MongoClient
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
 from pydantic import BaseModel
 from typing import List, Optional, Any
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import csv
+import functools
+import hashlib
+import io
+import json
+import re
+import threading
 import logging
 
+from bot_modules.http_clients import get_stats as http_client_stats, close_all as close_http_clients
+from bot_modules.timeseries import ensure_weather_timeseries, ROLLUP_HOURLY, ROLLUP_DAILY
+from bot_modules.schemas import WeatherLog, StormLog
+from bot_modules.region_match import get_region_matcher
+from bot_modules.region_index import get_region_index
+from bot_modules.spatial_index import get_spatial_index, AUTO_DETECT_MODE
+from bot_modules import geocache
+from bot_modules.forecast_cache import bmkg_forecasts
+from bot_modules.log_store import (
+    rebuild_latest_forecast, validate_logs, store_weather_logs, store_storm_logs
+)
+
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="MHEWS Aceh API", version="2.5.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: view & index dibangun sebelum request pertama, watcher alert jalan di thread
+    await startup_latest_forecast()
+    await startup_alert_watch()
+    await startup_region_matcher()
+    await startup_spatial_index()
+    try:
+        yield
+    finally:
+        shutdown_alert_watch()
+        await shutdown_http_clients()
+        shutdown_db()
+
+app = FastAPI(title="MHEWS Aceh API", version="2.5.0", lifespan=lifespan)
 
 # Logging
 logging.basicConfig(level=logging.INFO)
@@ -22,14 +63,53 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
-    allow_headers=["X-API-KEY", "Content-Type", "Authorization"],
+    allow_headers=["X-API-KEY", "Content-Type", "Authorization", "If-None-Match"],
+    expose_headers=["ETag"],
 )
 
 # --- KONEKSI DATABASE ---
 MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI, tlsAllowInvalidCertificates=True, serverSelectionTimeoutMS=5000)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+# Jumlah thread untuk query pymongo (sebaiknya <= MONGO_MAX_POOL_SIZE)
+API_DB_THREADS = int(os.getenv("API_DB_THREADS", "32"))
+
+client = MongoClient(
+    MONGO_URI,
+    tlsAllowInvalidCertificates=True,
+    serverSelectionTimeoutMS=5000,
+    maxPoolSize=MONGO_MAX_POOL_SIZE
+)
 db = client["emergency_db"]
 
+# --- ASYNC DB ACCESS ---
+# pymongo bersifat blocking, jadi semua query dijalankan di thread pool
+# agar event loop uvicorn tidak tertahan oleh satu query yang lambat.
+db_executor = ThreadPoolExecutor(max_workers=API_DB_THREADS, thread_name_prefix="mongo")
+
+async def run_db(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(fn, *args, **kwargs))
+
+# Cache geocoding memakai koneksi & thread pool yang sama (bukan koneksi kedua)
+geocache.init_geocache(db, run=run_db)
+
+# --- LATEST FORECAST VIEW ---
+# Koleksi latest_forecast menyimpan satu dokumen per lokasi (_id = location_id)
+# berisi log BMKG terbaru yang sudah digabung dengan nama & koordinat lokasi.
+# Penulisan view & log ada di bot_modules/log_store.py (dipakai juga oleh bot).
+
+async def startup_latest_forecast():
+    try:
+        await run_db(ensure_weather_timeseries, db)
+        if await run_db(db.latest_forecast.estimated_document_count) == 0:
+            await run_db(rebuild_latest_forecast, db)
+    except Exception as e:
+        print(f"⚠️ Latest Forecast Rebuild Error: {e}")
+
+def shutdown_db():
+    db_executor.shutdown(wait=False)
+    client.close()
+
 # --- SECURITY DEPENDENCY ---
 async def verify_api_key(x_api_key: str = Header(None)):
     SERVER_API_KEY = os.getenv("API_KEY", "RAHASIA_KUNCI_API_ANDA") 
@@ -38,185 +118,620 @@ async def verify_api_key(x_api_key: str = Header(None)):
     return x_api_key
 
 # --- PYDANTIC MODELS (VALIDASI DATA) ---
-class ForecastItem(BaseModel):
-    time: str
-    temp: int
-    desc: str
-    humidity: int
-    wind_speed: float
-    precip: float
-    precip_mm: Optional[float] = None
-    humidity: Optional[int] = None
-    wind_speed: Optional[float] = None
-
 class AutoDetectRequest(BaseModel):
     lat: float
     lon: float
 
-class WeatherLogData(BaseModel):
-    temp: float
-    humidity: int
-    weather_desc: str
-    precip_mm: float
-    wind_speed: float
-
-class WeatherLog(BaseModel):
-    location_id: str
-    timestamp: datetime
-    source: str = "BMKG"
-    data: WeatherLogData
-    forecast_3h: List[ForecastItem]
-
-class StormLog(BaseModel):
-    location_id: str
-    last_check: datetime
-    source: str = "Windy"
-    parameters: dict
-    is_alert: bool
-    alert_message: Optional[str] = None
-
 # --- ENDPOINTS POST (INPUT DATA DENGAN PROTEKSI API KEY) ---
 
 @app.post("/api/v1/weather/log", dependencies=[Depends(verify_api_key)])
 async def log_weather(log: WeatherLog):
     try:
-        doc = log.dict()
-        db.weather_logs.insert_one(doc)
+        errors, rollup_errors = [], []
+        await run_db(store_weather_logs, db, [(0, log.dict())], errors, rollup_errors)
+        if errors:
+            raise HTTPException(status_code=500, detail=errors[0]["error"])
+        # Log sudah tersimpan; gagal view/rollup dilaporkan tanpa 500 (jangan di-retry)
+        if rollup_errors:
+            return {"status": "success", "rollup_errors": rollup_errors}
         return {"status": "success"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v1/storm/log", dependencies=[Depends(verify_api_key)])
 async def log_storm(log: StormLog):
     try:
-        doc = log.dict()
-        db.storm_monitor.insert_one(doc)
+        errors = []
+        await run_db(store_storm_logs, db, [(0, log.dict())], errors)
+        if errors:
+            raise HTTPException(status_code=500, detail=errors[0]["error"])
         return {"status": "success"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- BATCH INGEST ---
+LOG_BATCH_MAX = int(os.getenv("LOG_BATCH_MAX", "1000"))
+
+def validate_batch(model, items: list):
+    """
+    Validasi tiap item dengan model yang sama seperti endpoint tunggal.
+    Return (docs, errors), docs berisi pasangan (index, doc).
+    """
+    if len(items) > LOG_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Batch terlalu besar (maks {LOG_BATCH_MAX})")
+    return validate_logs(model, items)
+
+def batch_result(inserted: list, errors: list, rollup_errors: list = None):
+    result = {
+        "status": "partial" if errors else "success",
+        "inserted": len(inserted),
+        "errors": sorted(errors, key=lambda e: e["index"])
+    }
+    # Item sudah tersimpan walau latest_forecast/rollup gagal, jadi bukan "errors"
+    if rollup_errors:
+        result["rollup_errors"] = rollup_errors
+    return result
+
+@app.post("/api/v1/weather/log/batch", dependencies=[Depends(verify_api_key)])
+async def log_weather_batch(items: List[Any]):
+    docs, errors = validate_batch(WeatherLog, items)
+    rollup_errors = []
+    try:
+        inserted = await run_db(store_weather_logs, db, docs, errors, rollup_errors)
+        return batch_result(inserted, errors, rollup_errors)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/storm/log/batch", dependencies=[Depends(verify_api_key)])
+async def log_storm_batch(items: List[Any]):
+    docs, errors = validate_batch(StormLog, items)
+    try:
+        inserted = await run_db(store_storm_logs, db, docs, errors)
+        return batch_result(inserted, errors)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- ENDPOINTS GET (KONSUMSI DATA FRONTEND) ---
 
 @app.get("/api/v1/gempa/terkini")
-async def get_gempa():
+async def get_gempa(request: Request):
+    cached = cached_response(request, "gempa")
+    if cached is not None:
+        return cached
+
     # Mengambil gempa terbaru
-    data = db.alerts.find_one(sort=[("DateTime", -1)], projection={"_id": 0})
+    data = await run_db(load_latest_alert)
     return data if data else {"error": "No data"}
 
 @app.get("/api/v1/gempa/aceh")
-async def get_history():
+async def get_history(request: Request):
+    cached = cached_response(request, "aceh")
+    if cached is not None:
+        return cached
+
     # History 10 gempa terakhir di Aceh
-    return list(db.alerts.find({"is_aceh": True}, {"_id": 0}).sort("DateTime", -1).limit(10))
+    return await run_db(load_aceh_history)
+
+def precip_status_pipeline(start_time: datetime):
+    """
+    Satu pipeline untuk semua lokasi: total hujan 24 jam (BMKG),
+    status banjir, dan deskripsi cuaca terakhir.
+    """
+    return [
+        {"$project": {"_id": 1, "name": 1}},
+        # Agregasi jumlah hujan 24 jam terakhir dari BMKG
+        {"$lookup": {
+            "from": "weather_logs",
+            "localField": "_id",
+            "foreignField": "location_id",
+            "pipeline": [
+                {"$match": {"source": "BMKG", "timestamp": {"$gte": start_time}}},
+                {"$group": {"_id": None, "total_precip": {"$sum": "$data.precip_mm"}}}
+            ],
+            "as": "precip"
+        }},
+        # Ambil deskripsi cuaca terakhir
+        {"$lookup": {
+            "from": "weather_logs",
+            "localField": "_id",
+            "foreignField": "location_id",
+            "pipeline": [
+                {"$sort": {"timestamp": -1}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "weather_desc": "$data.weather_desc"}}
+            ],
+            "as": "latest"
+        }},
+        {"$set": {
+            "total": {"$toDouble": {"$ifNull": [{"$arrayElemAt": ["$precip.total_precip", 0]}, 0]}},
+            "desc": {"$ifNull": [{"$arrayElemAt": ["$latest.weather_desc", 0]}, "Berawan"]}
+        }},
+        {"$project": {
+            "_id": 0,
+            "name": 1,
+            "total_precip_24h": {"$round": ["$total", 2]},
+            # Kategori banjir sesuai standar BMKG
+            "status": {"$switch": {
+                "branches": [
+                    {"case": {"$gt": ["$total", 150]}, "then": "DANGER"},
+                    {"case": {"$gt": ["$total", 100]}, "then": "WARNING"},
+                    {"case": {"$gt": ["$total", 50]}, "then": "WASPADA"}
+                ],
+                "default": "SAFE"
+            }},
+            "desc": 1
+        }}
+    ]
 
 @app.get("/api/v1/cuaca/precip")
 async def get_precip_status():
     try:
-        locs = list(db.locations.find({}, {"_id": 1, "name": 1}))
-        results = []
         start_time = datetime.now(timezone.utc) - timedelta(hours=24)
-        
-        for loc in locs:
-            # Agregasi jumlah hujan 24 jam terakhir dari BMKG
-            pipeline = [
-                {"$match": {"location_id": loc["_id"], "timestamp": {"$gte": start_time}, "source": "BMKG"}},
-                {"$group": {"_id": None, "total_precip": {"$sum": "$data.precip_mm"}}}
-            ]
-            agg = list(db.weather_logs.aggregate(pipeline))
-            total = float(agg[0]["total_precip"]) if agg else 0.0
-            
-            # Kategori banjir sesuai standar BMKG
-            if total > 150: status = "DANGER"
-            elif total > 100: status = "WARNING"
-            elif total > 50: status = "WASPADA"
-            else: status = "SAFE"
-
-            # Ambil deskripsi cuaca terakhir
-            latest = db.weather_logs.find_one({"location_id": loc["_id"]}, sort=[("timestamp", -1)])
-            desc = latest["data"]["weather_desc"] if latest else "Berawan"
-
-            results.append({
-                "name": loc["name"],
-                "total_precip_24h": round(total, 2),
-                "status": status,
-                "desc": desc
-            })
-        return results
+        return await run_db(lambda: list(db.locations.aggregate(precip_status_pipeline(start_time))))
     except Exception as e:
         return {"error": str(e)}
 
 @app.get("/api/v1/cuaca/point-forecast")
 async def get_point_forecast():
     try:
-        # Mengambil ramalan cuaca terbaru untuk semua lokasi
-        locs = list(db.locations.find({}, {"_id": 1, "name": 1, "coordinates": 1}))
-        data = []
-        for loc in locs:
-             latest = db.weather_logs.find_one(
-                {"location_id": loc["_id"], "source": "BMKG"},
-                sort=[("timestamp", -1)],
-                projection={"_id": 0}
-            )
-             if latest:
-                 latest["location_name"] = loc["name"]
-                 latest["coords"] = loc["coordinates"]
-                 data.append(latest)
-        return data
+        # Ramalan cuaca terbaru semua lokasi (sudah termasuk nama & koordinat)
+        return await run_db(lambda: list(db.latest_forecast.find({}, {"_id": 0})))
     except Exception as e:
         return {"error": str(e)}
 
+ADM4_PATTERN = re.compile(r"\d{2}\.\d{2}\.\d{2}\.\d{4}")
+
+@app.get("/api/v1/cuaca/bmkg/{adm4}")
+async def get_bmkg_forecast(adm4: str, hours: float = 24):
+    """
+    Prakiraan BMKG satu kode ADM4: item terdekat sekarang + item sampai `hours` ke depan.
+    Memakai cache & parser yang sama dengan bot (bot_modules/bmkg_forecast.py).
+    Hanya kode ADM4 yang ada di base.csv yang diteruskan ke BMKG, supaya kode
+    acak tidak membuang entri cache milik job logger.
+    """
+    if not ADM4_PATTERN.fullmatch(adm4):
+        raise HTTPException(status_code=404, detail="Kode ADM4 tidak valid")
+    index = await run_db(get_region_index)
+    if index is not None and index.find_code(adm4) is None:
+        raise HTTPException(status_code=404, detail="Kode ADM4 tidak dikenal")
+
+    try:
+        forecast = await bmkg_forecasts.get(adm4)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"BMKG error: {e}")
+    if not forecast:
+        raise HTTPException(status_code=404, detail="Data BMKG kosong untuk kode ini")
+
+    return {
+        "adm4": adm4,
+        "lokasi": forecast.location,
+        "current": forecast.current(),
+        "forecast": forecast.upcoming(hours=max(0.0, min(hours, 168.0))),
+        "age_seconds": bmkg_forecasts.age(adm4)
+    }
+
+@app.get("/api/v1/cuaca/rollup")
+async def get_weather_rollup(
+    location_id: str,
+    granularity: str = "hourly",
+    source: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """
+    Rollup cuaca (hujan total, suhu min/max, gust max) per jam atau per hari.
+    Default: 7 hari terakhir.
+    """
+    collections = {"hourly": ROLLUP_HOURLY, "daily": ROLLUP_DAILY}
+    if granularity not in collections:
+        raise HTTPException(status_code=400, detail="granularity harus hourly atau daily")
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=7)
+    # Lokasi SYSTEM memakai ObjectId sebagai location_id
+    loc_ids = [location_id, ObjectId(location_id)] if ObjectId.is_valid(location_id) else [location_id]
+    query = {"location_id": {"$in": loc_ids}, "bucket": {"$gte": start, "$lt": end}}
+    if source:
+        query["source"] = source
+
+    return await run_db(lambda: list(db[collections[granularity]].find(query, {"_id": 0}).sort("bucket", 1)))
+
 @app.get("/api/v1/iot/trigger")
-async def iot_trigger():
-    latest = db.alerts.find_one(sort=[("DateTime", -1)])
+async def iot_trigger(request: Request):
+    cached = cached_response(request, "trigger")
+    if cached is not None:
+        return cached
+
+    latest = await run_db(load_latest_alert)
+    return {"trigger": tsunami_trigger(latest)}
+
+def tsunami_trigger(latest) -> bool:
     # Trigger sirene jika gempa berpotensi tsunami
     trigger = False
     if latest and "Potensi" in latest:
         if "tsunami" in latest["Potensi"].lower():
             trigger = True
-    return {"trigger": trigger}
+    return trigger
+
+# --- ALERT CACHE & FEED (SSE / WEBSOCKET) ---
+# Satu thread memantau koleksi alerts (change stream, fallback polling).
+# Setiap ada perubahan: gempa terbaru + history Aceh dimuat sekali, response
+# JSON + ETag disimpan di memori, lalu state di-push ke semua client stream.
+ALERT_POLL_SECONDS = int(os.getenv("ALERT_POLL_SECONDS", "5"))
+ALERT_CACHE_MAX_AGE = int(os.getenv("ALERT_CACHE_MAX_AGE", "10"))
+STREAM_PING_SECONDS = 15
+
+# key -> (body bytes, etag). Kosong sampai watcher memuat data pertama kali.
+alert_cache = {}
+alert_state = {"payload": None}
+alert_subscribers = set()
+alert_watch_stop = threading.Event()
+
+def json_bytes(data) -> bytes:
+    # Format sama dengan JSONResponse bawaan FastAPI
+    return json.dumps(
+        jsonable_encoder(data), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+def cache_entry(data):
+    body = json_bytes(data)
+    return body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def cached_response(request: Request, key: str):
+    """
+    Response dari cache memori dengan ETag/304. None jika cache belum siap.
+    """
+    entry = alert_cache.get(key)
+    if entry is None:
+        return None
+
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={ALERT_CACHE_MAX_AGE}, must-revalidate"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def publish_alert(latest, history):
+    """
+    Dipanggil di event loop. Ganti isi cache lalu kirim ke semua subscriber.
+    """
+    alert_cache["gempa"] = cache_entry(latest if latest else {"error": "No data"})
+    alert_cache["aceh"] = cache_entry(history)
+    alert_cache["trigger"] = cache_entry({"trigger": tsunami_trigger(latest)})
+
+    payload = json_bytes({"alert": latest, "trigger": tsunami_trigger(latest)}).decode("utf-8")
+    if payload == alert_state["payload"]:
+        return
+    alert_state["payload"] = payload
+
+    for q in list(alert_subscribers):
+        if q.full():
+            # Client lambat: buang event lama, yang penting state terbaru
+            q.get_nowait()
+        q.put_nowait(payload)
+
+def load_latest_alert():
+    return db.alerts.find_one(sort=[("DateTime", -1)], projection={"_id": 0})
+
+def load_aceh_history():
+    return list(db.alerts.find({"is_aceh": True}, {"_id": 0}).sort("DateTime", -1).limit(10))
+
+def watch_alerts(loop):
+    def refresh():
+        latest = load_latest_alert()
+        history = load_aceh_history()
+        loop.call_soon_threadsafe(publish_alert, latest, history)
+
+    while not alert_watch_stop.is_set():
+        try:
+            # Change stream butuh replica set (MongoDB Atlas)
+            with db.alerts.watch(
+                [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}],
+                max_await_time_ms=1000
+            ) as stream:
+                refresh()
+                while not alert_watch_stop.is_set():
+                    if stream.try_next() is not None:
+                        refresh()
+        except OperationFailure as e:
+            print(f"⚠️ Change stream tidak tersedia ({e}), fallback polling {ALERT_POLL_SECONDS}s")
+            while not alert_watch_stop.is_set():
+                try:
+                    refresh()
+                except PyMongoError as poll_err:
+                    print(f"⚠️ Alert Poll Error: {poll_err}")
+                    # Snapshot lama tidak bisa diperbarui: jangan dilayani (ETag/304) terus
+                    alert_cache.clear()
+                alert_watch_stop.wait(ALERT_POLL_SECONDS)
+        except PyMongoError as e:
+            print(f"⚠️ Alert Watch Error: {e}")
+            # Cache tidak bisa di-invalidate selama watcher mati
+            alert_cache.clear()
+            alert_watch_stop.wait(5)
+
+def subscribe_alerts() -> asyncio.Queue:
+    q = asyncio.Queue(maxsize=10)
+    if alert_state["payload"] is not None:
+        q.put_nowait(alert_state["payload"])
+    alert_subscribers.add(q)
+    return q
+
+async def startup_alert_watch():
+    loop = asyncio.get_running_loop()
+    threading.Thread(target=watch_alerts, args=(loop,), name="alert-watch", daemon=True).start()
+
+def shutdown_alert_watch():
+    alert_watch_stop.set()
+
+async def startup_region_matcher():
+    # Bangun index trigram wilayah di thread supaya request pertama tidak menunggu
+    try:
+        await run_db(get_region_matcher)
+    except Exception as e:
+        print(f"⚠️ Region Matcher Error: {e}")
+
+async def startup_spatial_index():
+    if AUTO_DETECT_MODE != "local":
+        return
+    try:
+        if await run_db(get_spatial_index, db) is None:
+            print("⚠️ AUTO_DETECT_MODE=local tapi wilayah_geo kosong (jalankan import_wilayah_geo.py)")
+    except Exception as e:
+        print(f"⚠️ Spatial Index Error: {e}")
+
+async def shutdown_http_clients():
+    await close_http_clients()
+
+@app.get("/api/v1/metrics/http")
+async def get_http_metrics():
+    """
+    Statistik pemakaian ulang koneksi HTTP keluar (reverse geocode, dll)
+    dan cache geocoding (request Nominatim yang terhindar).
+    """
+    return {**http_client_stats(), "geocode_cache": geocache.geocode_cache.metrics()}
+
+@app.get("/api/v1/stream/alerts")
+async def stream_alerts(request: Request):
+    """
+    Server-Sent Events: gempa terbaru + status trigger sirene.
+    """
+    q = subscribe_alerts()
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(q.get(), timeout=STREAM_PING_SECONDS)
+                    yield f"event: alert\ndata: {payload}\n\n"
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            alert_subscribers.discard(q)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/api/v1/ws/alerts")
+async def ws_alerts(ws: WebSocket):
+    await ws.accept()
+    q = subscribe_alerts()
+    try:
+        while True:
+            await ws.send_text(await q.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        alert_subscribers.discard(q)
+
+def auto_detect_local(lat: float, lon: float):
+    spatial = get_spatial_index(db)
+    hit = spatial.locate(lat, lon) if spatial is not None else None
+    if hit is None:
+        return None
+
+    index = get_region_index()
+    code = hit["code"]
+    names = [index.name_of(code[:n]) if index is not None else None for n in (13, 8, 5)]
+    return {
+        "found": True,
+        "adm4": code,
+        "name": names[0],
+        "level": "DESA/KELURAHAN",
+        "source": "local",
+        "method": hit["method"],
+        "distance_km": hit["distance_km"],
+        "kecamatan": names[1],
+        "kabupaten": names[2],
+        "geo_detail": {"village": names[0], "district": names[1], "city": names[2], "full_address": None}
+    }
 
 @app.post("/api/v1/auto-detect", dependencies=[Depends(verify_api_key)])
 async def auto_detect_location(req: AutoDetectRequest):
     """
+    AUTO_DETECT_MODE=local: titik -> ADM4 langsung dari spatial index (tanpa Nominatim),
+    lanjut ke alur di bawah hanya jika titik di luar cakupan data lokal.
     1. Reverse Geocode (Lat/Lon -> Village Name)
-    2. DB Lookup (Village Name -> ADM4 Code)
+    2. Fuzzy Lookup (Village Name + Kecamatan/Kota -> ADM4 Code), lihat bot_modules/region_match.py
     3. Return details
     """
     from bot_modules.services import reverse_geocode
-    from bot_modules.utils import normalize_name
     
     try:
+        if AUTO_DETECT_MODE == "local":
+            try:
+                local = await run_db(auto_detect_local, req.lat, req.lon)
+            except Exception as e:
+                # Data lokal bermasalah (path salah, Mongo error): lanjut ke Nominatim
+                print(f"⚠️ Auto-Detect Local Error: {e}")
+                local = None
+            if local is not None:
+                return local
+
         # 1. Reverse Geocode
         geo = await reverse_geocode(req.lat, req.lon)
         if not geo:
             # Fallback invalid
             raise HTTPException(status_code=404, detail="Location address not found")
         
-        village_clean = normalize_name(geo["village"]).replace("KELURAHAN ", "").replace("DESA ", "").strip()
-        
-        # 2. DB Lookup in wilayah_bmkg
-        # Try finding exact name first in wilayah_bmkg
-        wilayah = db.wilayah_bmkg.find_one({"name": village_clean})
-        
-        # Fallback text search if needed
-        if not wilayah:
-             # Try regex for partial match
-             wilayah = db.wilayah_bmkg.find_one({"name": {"$regex": f"^{village_clean}", "$options": "i"}})
+        # 2. Index trigram di memori; nama kembar dibedakan lewat kecamatan/kota geocoder.
+        #    Build index & matching dijalankan di thread pool, bukan di event loop
+        matcher = await run_db(get_region_matcher)
+        candidates = []
+        if matcher is not None and geo.get("village"):
+            candidates = await run_db(
+                matcher.match, geo["village"], district=geo.get("district"), city=geo.get("city"), limit=3
+            )
         
-        if not wilayah:
+        if not candidates:
              return {
                 "found": False,
                 "geo_name": geo["village"],
                 "fallback_message": "Wilayah tidak ada di database BMKG"
             }
 
+        best = candidates[0]
         return {
             "found": True,
-            "adm4": wilayah["_id"],
-            "name": wilayah["name"],
-            "level": wilayah["level"],
+            "adm4": best["code"],
+            "name": best["name"],
+            "level": "DESA/KELURAHAN",
+            "score": best["score"],
+            "kecamatan": best["kecamatan"],
+            "kabupaten": best["kabupaten"],
+            "alternatives": candidates[1:],
             "geo_detail": geo
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Auto-Detect Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+# --- EXPORT HISTORY (NDJSON / CSV STREAMING) ---
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+EXPORT_COLLECTIONS = {
+    "weather_logs": {
+        "time_field": "timestamp",
+        "columns": [
+            "location_id", "timestamp", "source",
+            "data.temp", "data.humidity", "data.weather_desc", "data.precip_mm", "data.wind_speed",
+            "latest.temp_c", "latest.precip_3h_mm", "latest.gust_ms", "latest.pressure_pa"
+        ]
+    },
+    "storm_monitor": {
+        "time_field": "last_check",
+        "columns": [
+            "location_id", "last_check", "source",
+            "parameters.wind_gust", "parameters.pressure", "parameters.wind_direction",
+            "is_alert", "alert_message"
+        ]
+    }
+}
+
+def export_default(o):
+    if isinstance(o, datetime):
+        return o.isoformat()
+    if isinstance(o, bytes):
+        return base64.b64encode(o).decode("ascii")
+    return str(o)
+
+def dotted_get(doc: dict, path: str):
+    value = doc
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+def next_batch(cursor, size: int) -> list:
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= size:
+            break
+    return batch
+
+@app.get("/api/v1/export/{collection}", dependencies=[Depends(verify_api_key)])
+async def export_history(
+    collection: str,
+    location_id: Optional[str] = None,
+    source: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: str = "ndjson"
+):
+    """
+    Export weather_logs / storm_monitor dari server-side cursor.
+    Dikirim per batch (chunked), jadi memori tetap kecil berapapun rentang waktunya.
+    """
+    spec = EXPORT_COLLECTIONS.get(collection)
+    if not spec:
+        raise HTTPException(status_code=404, detail=f"Koleksi tidak bisa diexport: {collection}")
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Format harus ndjson atau csv")
+
+    time_field = spec["time_field"]
+    query = {}
+    if location_id:
+        # Lokasi SYSTEM memakai ObjectId sebagai location_id (sama seperti /cuaca/rollup)
+        loc_ids = [location_id, ObjectId(location_id)] if ObjectId.is_valid(location_id) else [location_id]
+        query["location_id"] = {"$in": loc_ids}
+    if source:
+        query["source"] = source
+    if start or end:
+        query[time_field] = {}
+        if start:
+            query[time_field]["$gte"] = start
+        if end:
+            query[time_field]["$lt"] = end
+
+    # Tanpa location_id sort memakai index {time_field: 1} (bot_modules/indexes.py);
+    # allow_disk_use berjaga-jaga jika planner tetap memilih blocking sort
+    cursor = db[collection].find(
+        query, {"_id": 0}, batch_size=EXPORT_BATCH_SIZE, allow_disk_use=True
+    ).sort(time_field, 1)
+    columns = spec["columns"]
+
+    async def rows():
+        try:
+            if format == "csv":
+                buf = io.StringIO()
+                csv.writer(buf).writerow(columns)
+                yield buf.getvalue()
+
+            while True:
+                batch = await run_db(next_batch, cursor, EXPORT_BATCH_SIZE)
+                if not batch:
+                    break
+
+                if format == "csv":
+                    buf = io.StringIO()
+                    writer = csv.writer(buf)
+                    for doc in batch:
+                        writer.writerow([
+                            export_default(v) if v is not None and not isinstance(v, (str, int, float, bool)) else v
+                            for v in (dotted_get(doc, c) for c in columns)
+                        ])
+                    yield buf.getvalue()
+                else:
+                    yield "".join(json.dumps(doc, default=export_default) + "\n" for doc in batch)
+        finally:
+            await run_db(cursor.close)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"{collection}.{format}"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
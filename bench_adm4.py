@@ -0,0 +1,128 @@
+"""
+Benchmark resolve nama -> ADM4: scan base.csv per panggilan (lama) vs region_index
+vs region_match (fuzzy + konteks kecamatan/kabupaten).
+
+Jalankan: python bench_adm4.py
+Tidak butuh MongoDB. Atur jumlah query lewat env BENCH_QUERIES.
+Gagal (AssertionError) jika match typo+kec+kab lebih lambat dari BENCH_MAX_MEDIAN_MS
+(median) atau akurasi top1-nya di bawah BENCH_MIN_TYPO_TOP1.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from bot_modules.region_index import RegionIndex, REGION_CSV_PATH, name_key
+from bot_modules.region_match import RegionMatcher
+
+QUERIES = int(os.getenv("BENCH_QUERIES", "300"))
+LEGACY_QUERIES = min(QUERIES, int(os.getenv("BENCH_LEGACY_QUERIES", "30")))
+MAX_MEDIAN_MS = float(os.getenv("BENCH_MAX_MEDIAN_MS", "1.0"))
+MIN_TYPO_TOP1 = float(os.getenv("BENCH_MIN_TYPO_TOP1", "0.9"))
+
+def normalize_name(s: str) -> str:
+    return " ".join((s or "").strip().lower().split())
+
+def legacy_scan(query_name: str):
+    """
+    Loop lama get_adm4_from_csv (tanpa fallback kota): baca & normalisasi seluruh CSV.
+    """
+    target = normalize_name(query_name)
+    best_code = None
+    with open(REGION_CSV_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split(",")
+            if len(parts) < 2: continue
+            code = parts[0].strip()
+            name = normalize_name(parts[1])
+            if len(code) > 8:
+                if name == target:
+                    return code
+                if target in name or name in target:
+                    best_code = code
+    return best_code
+
+def timed(fn, queries):
+    times, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append(fn(q))
+        times.append(time.perf_counter() - t0)
+    return times, results
+
+def report(label, times):
+    ordered = sorted(times)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{label:<22} median {statistics.median(times) * 1e6:>10.1f} µs   p95 {p95 * 1e6:>10.1f} µs")
+
+def main():
+    t0 = time.perf_counter()
+    index = RegionIndex.from_csv(REGION_CSV_PATH)
+    print(f"Load CSV -> index: {time.perf_counter() - t0:.2f}s ({len(index)} wilayah)")
+
+    path = os.path.join(tempfile.gettempdir(), "bench_base.idx")
+    index.save(path)
+    t0 = time.perf_counter()
+    mapped = RegionIndex.from_file(path)
+    print(f"Load mmap index:   {(time.perf_counter() - t0) * 1000:.2f} ms ({os.path.getsize(path) // 1024} KB)")
+
+    random.seed(42)
+    villages = [i for i in range(len(index)) if len(index.codes[i]) == 13]
+    sample = random.sample(villages, QUERIES)
+    queries = []
+    for n, i in enumerate(sample):
+        code = index.codes[i]
+        if n % 3 == 0:
+            # Gaya display_name geocoder: desa, kecamatan, kabupaten
+            queries.append(f"{index.names[i]}, {index.name_of(code[:8])}, {index.name_of(code[:5])}")
+        else:
+            queries.append(index.names[i])
+
+    legacy_times, legacy_res = timed(legacy_scan, queries[:LEGACY_QUERIES])
+    mem_times, mem_res = timed(lambda q: index.lookup(q, limit=5), queries)
+    map_times, map_res = timed(lambda q: mapped.lookup(q, limit=5), queries)
+
+    print(f"\n{QUERIES} query ({LEGACY_QUERIES} untuk scan lama)")
+    report("scan base.csv (lama)", legacy_times)
+    report("index in-memory", mem_times)
+    report("index mmap", map_times)
+
+    # Akurasi: kode asli ada di kandidat teratas / top-5
+    top1 = sum(1 for i, r in zip(sample, mem_res) if r and r[0]["code"] == index.codes[i])
+    top5 = sum(1 for i, r in zip(sample, mem_res) if any(c["code"] == index.codes[i] for c in r))
+    legacy_ok = sum(1 for i, code in zip(sample, legacy_res) if code == index.codes[i])
+    unique = sum(1 for i in sample if len(index.exact_ids(name_key(index.names[i]))) == 1)
+    print(f"\nKode benar: index top1 {top1}/{QUERIES}, top5 {top5}/{QUERIES}; "
+          f"scan lama {legacy_ok}/{LEGACY_QUERIES}  (nama unik: {unique}/{QUERIES})")
+    print(f"Hasil mmap == in-memory: {mem_res == map_res}")
+
+    # Fuzzy + hierarki: nama desa dengan typo (satu huruf dibuang) + kecamatan & kabupaten
+    t0 = time.perf_counter()
+    matcher = RegionMatcher(index)
+    print(f"\nBuild trigram matcher: {time.perf_counter() - t0:.2f}s")
+
+    def typo(name):
+        pos = random.randrange(len(name))
+        return name[:pos] + name[pos + 1:] if len(name) > 4 else name
+
+    cases = [(typo(index.names[i]), index.name_of(index.codes[i][:8]), index.name_of(index.codes[i][:5])) for i in sample]
+    exact_times, exact_res = timed(lambda i: matcher.match(index.names[i], district=index.name_of(index.codes[i][:8])), sample)
+    fuzzy_times, fuzzy_res = timed(lambda c: matcher.match(c[0], district=c[1], city=c[2]), cases)
+    plain_times, plain_res = timed(lambda c: index.lookup(c[0], limit=5), cases)
+    report("match (nama+kec)", exact_times)
+    report("match (typo+kec+kab)", fuzzy_times)
+
+    ok = lambda results: sum(1 for i, r in zip(sample, results) if r and r[0]["code"] == index.codes[i])
+    print(f"Kode benar top1: match nama+kec {ok(exact_res)}/{QUERIES}, "
+          f"match typo {ok(fuzzy_res)}/{QUERIES}, lookup typo {ok(plain_res)}/{QUERIES}")
+
+    fuzzy_median_ms = statistics.median(fuzzy_times) * 1000
+    assert fuzzy_median_ms <= MAX_MEDIAN_MS, \
+        f"match typo+kec+kab median {fuzzy_median_ms:.2f} ms > {MAX_MEDIAN_MS} ms"
+    assert ok(fuzzy_res) >= MIN_TYPO_TOP1 * QUERIES, \
+        f"match typo+kec+kab top1 {ok(fuzzy_res)}/{QUERIES} < {MIN_TYPO_TOP1:.0%}"
+    print(f"✅ match typo+kec+kab: median {fuzzy_median_ms:.2f} ms <= {MAX_MEDIAN_MS} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark parsing BMKG point forecast: cara lama (flatten + strptime + scan linear,
+diulang di tiap pemakai) vs bmkg_forecast.BmkgForecast (parse sekali, query bisect).
+
+Jalankan: python bench_bmkg_parser.py
+Tidak butuh jaringan: response sintetis seukuran response asli (3 hari x 8 item / 3 jam).
+Atur jumlah lokasi per kode lewat env BENCH_LOCS (mis. satu desa dipantau banyak chat).
+"""
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timezone, timedelta
+
+from bot_modules.bmkg_forecast import BmkgForecast
+
+LOCS_PER_CODE = int(os.getenv("BENCH_LOCS", "5"))
+RUNS = int(os.getenv("BENCH_RUNS", "300"))
+
+def synthetic_response(start: datetime, days: int = 3):
+    random.seed(5)
+    cuaca = []
+    for d in range(days):
+        day = []
+        for h in range(8):
+            dt = start + timedelta(days=d, hours=3 * h)
+            local = dt + timedelta(hours=7)
+            day.append({
+                "datetime": dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "t": random.randint(22, 33), "tcc": random.randint(0, 100), "tp": round(random.uniform(0, 12), 1),
+                "weather": 3, "weather_desc": "Berawan", "weather_desc_en": "Mostly Cloudy",
+                "wd_deg": random.randint(0, 359), "wd": "W", "wd_to": "E", "ws": round(random.uniform(2, 25), 1),
+                "hu": random.randint(60, 98), "vs": 10000, "vs_text": "> 10 km", "time_index": f"{3 * (d * 8 + h)}-{3 * (d * 8 + h + 1)}",
+                "analysis_date": start.strftime("%Y-%m-%dT%H:%M:%S"),
+                "image": "https://api-apps.bmkg.go.id/storage/icon/cuaca/berawan-am.svg",
+                "utc_datetime": dt.strftime("%Y-%m-%d %H:%M:%S"),
+                "local_datetime": local.strftime("%Y-%m-%d %H:%M:%S"),
+            })
+        cuaca.append(day)
+    lokasi = {"adm4": "11.71.01.2005", "desa": "Peuniti", "kecamatan": "Baiturrahman", "kotkab": "Kota Banda Aceh",
+              "provinsi": "Aceh", "lat": 5.55, "lon": 95.32, "timezone": "Asia/Jakarta"}
+    return {"lokasi": lokasi, "data": [{"lokasi": lokasi, "cuaca": cuaca}]}
+
+def legacy_payload(data_json: dict, now_utc: datetime):
+    """
+    Salinan parsing lama jobs.build_bmkg_payload (dijalankan per lokasi).
+    """
+    forecast_flat = []
+    for sublist in data_json["data"][0].get("cuaca", []):
+        for item in sublist:
+            forecast_flat.append(item)
+
+    def parse_dt(d_str):
+        try:
+            return datetime.strptime(d_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+        except:
+            return datetime.min.replace(tzinfo=timezone.utc)
+
+    forecast_flat.sort(key=lambda x: parse_dt(x.get("utc_datetime", "")))
+    best_current, min_diff, items = None, 999999999, []
+    for item in forecast_flat:
+        dt_obj = parse_dt(item.get("utc_datetime"))
+        diff = abs((dt_obj - now_utc).total_seconds())
+        if diff < min_diff:
+            min_diff, best_current = diff, item
+        if dt_obj > now_utc and len(items) < 8:
+            items.append(item)
+    return best_current["utc_datetime"], [f["utc_datetime"] for f in items]
+
+def columnar_payload(forecast: BmkgForecast, now_utc: datetime):
+    cur = forecast.current(now_utc)
+    fmt = "%Y-%m-%d %H:%M:%S"
+    return cur["utc_datetime"].strftime(fmt), [f["utc_datetime"].strftime(fmt) for f in forecast.upcoming(now_utc, 24)]
+
+def timed(fn):
+    times = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+def report(label, times):
+    ordered = sorted(times)
+    print(f"{label:<38} median {statistics.median(times) * 1e6:8.1f} µs   p95 {ordered[int(len(ordered) * 0.95)] * 1e6:8.1f} µs")
+
+def main():
+    start = datetime(2025, 10, 12, tzinfo=timezone.utc)
+    data_json = synthetic_response(start)
+    now = start + timedelta(hours=13, minutes=20)
+    print(f"Response: {sum(len(d) for d in data_json['data'][0]['cuaca'])} item, {LOCS_PER_CODE} lokasi per kode\n")
+
+    forecast = BmkgForecast.parse(data_json)
+    # Hasil harus sama dengan parsing lama di berbagai waktu (termasuk setelah data habis).
+    # Sebelum item pertama beda disengaja: lama ambil 8 item apa adanya, baru tetap jendela 24 jam.
+    for minutes in range(0, 80 * 60, 35):
+        t = start + timedelta(minutes=minutes)
+        assert legacy_payload(data_json, t) == columnar_payload(forecast, t), t
+    print("Hasil current / 24 jam ke depan == parsing lama ✅\n")
+
+    report("lama: parse per lokasi", timed(lambda: [legacy_payload(data_json, now) for _ in range(LOCS_PER_CODE)]))
+    report("baru: parse sekali + query", timed(
+        lambda: [columnar_payload(f, now) for f in [BmkgForecast.parse(data_json)] for _ in range(LOCS_PER_CODE)]))
+    report("baru: parse saja", timed(lambda: BmkgForecast.parse(data_json)))
+    report("baru: query (cache hit, sudah parse)", timed(lambda: columnar_payload(forecast, now)))
+
+if __name__ == "__main__":
+    main()
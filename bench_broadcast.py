@@ -0,0 +1,68 @@
+"""
+Benchmark antrian broadcast terhadap fake Bot API lokal (tanpa jaringan).
+
+Jalankan: python bench_broadcast.py
+Fake API menolak dengan RetryAfter (429) jika batas global / per chat dilanggar,
+seperti Telegram. Atur lewat env: BENCH_RECIPIENTS, BENCH_API_RATE, BENCH_BROADCAST_RATE.
+"""
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from telegram.error import RetryAfter
+
+from bot_modules.broadcast import Broadcaster, BROADCAST_WORKERS
+
+RECIPIENTS = int(os.getenv("BENCH_RECIPIENTS", "10000"))
+# Batas fake API (pesan/detik). Telegram asli ~30/detik; default dinaikkan
+# supaya benchmark 10k penerima selesai dalam hitungan detik.
+API_RATE = float(os.getenv("BENCH_API_RATE", "2000"))
+# Token bucket dipasang sedikit di bawah batas API
+BROADCAST_RATE = float(os.getenv("BENCH_BROADCAST_RATE", str(API_RATE * 0.9)))
+API_LATENCY = (0.02, 0.08)
+
+class FakeBot:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.window = deque()
+        self.chat_last = {}
+        self.calls = 0
+        self.rejected = 0
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.calls += 1
+        now = time.monotonic()
+        while self.window and now - self.window[0] >= 1.0:
+            self.window.popleft()
+
+        if len(self.window) >= self.rate or now - self.chat_last.get(chat_id, -10) < 1.0:
+            self.rejected += 1
+            raise RetryAfter(1)
+
+        self.window.append(now)
+        self.chat_last[chat_id] = now
+        await asyncio.sleep(random.uniform(*API_LATENCY))
+
+async def run(rate: float):
+    bot = FakeBot(API_RATE)
+    b = Broadcaster(bot, rate=rate, workers=max(BROADCAST_WORKERS, int(rate * 0.1)))
+    b.start()
+
+    t0 = time.monotonic()
+    b.send_many(range(RECIPIENTS), "rutin", "INFO")
+    # Peringatan bahaya datang belakangan tapi harus didahulukan
+    b.send_many(range(RECIPIENTS, RECIPIENTS + 100), "🔴 BAHAYA", "DANGER")
+    await b.join()
+    elapsed = time.monotonic() - t0
+    await b.stop()
+
+    m = b.metrics()
+    print(f"rate={rate:.0f}/s  total={elapsed:.1f}s  sent={m['sent']} failed={m['failed']} "
+          f"retries={m['retries']} api_calls={bot.calls} api_429={bot.rejected}")
+    for level, lat in m["latency"].items():
+        print(f"  {level:<7} p50={lat['p50']:.2f}s p95={lat['p95']:.2f}s max={lat['max']:.2f}s")
+
+if __name__ == "__main__":
+    print(f"Penerima: {RECIPIENTS} (+100 DANGER), fake API limit {API_RATE:.0f}/s")
+    asyncio.run(run(BROADCAST_RATE))
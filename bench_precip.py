@@ -0,0 +1,77 @@
+"""
+Benchmark /api/v1/cuaca/precip: loop per lokasi (lama) vs satu pipeline.
+
+Jalankan: python bench_precip.py
+Memakai database terpisah (emergency_db_bench) supaya data asli aman.
+"""
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from dotenv import load_dotenv
+from pymongo import MongoClient, ASCENDING
+
+from FastApi import precip_status_pipeline
+
+load_dotenv()
+
+client = MongoClient(os.getenv("MONGO_URI"), serverSelectionTimeoutMS=5000)
+db = client["emergency_db_bench"]
+
+SIZES = [10, 50, 100, 250, 500]
+LOGS_PER_LOCATION = 24
+RUNS = 5
+
+def seed(n: int):
+    db.locations.drop()
+    db.weather_logs.drop()
+    db.weather_logs.create_index([("location_id", ASCENDING), ("source", ASCENDING), ("timestamp", ASCENDING)])
+    db.weather_logs.create_index([("location_id", ASCENDING), ("timestamp", ASCENDING)])
+
+    now = datetime.now(timezone.utc)
+    db.locations.insert_many([{"_id": f"BENCH:{i}", "name": f"Lokasi {i}"} for i in range(n)])
+    logs = []
+    for i in range(n):
+        for h in range(LOGS_PER_LOCATION):
+            logs.append({
+                "location_id": f"BENCH:{i}",
+                "timestamp": now - timedelta(hours=h),
+                "source": "BMKG",
+                "data": {"precip_mm": float(i % 10), "weather_desc": "Hujan Ringan"}
+            })
+    db.weather_logs.insert_many(logs)
+
+def legacy_precip(start_time):
+    results = []
+    for loc in db.locations.find({}, {"_id": 1, "name": 1}):
+        pipeline = [
+            {"$match": {"location_id": loc["_id"], "timestamp": {"$gte": start_time}, "source": "BMKG"}},
+            {"$group": {"_id": None, "total_precip": {"$sum": "$data.precip_mm"}}}
+        ]
+        agg = list(db.weather_logs.aggregate(pipeline))
+        total = float(agg[0]["total_precip"]) if agg else 0.0
+        latest = db.weather_logs.find_one({"location_id": loc["_id"]}, sort=[("timestamp", -1)])
+        results.append({"name": loc["name"], "total": total, "desc": latest["data"]["weather_desc"] if latest else "Berawan"})
+    return results
+
+def pipeline_precip(start_time):
+    return list(db.locations.aggregate(precip_status_pipeline(start_time)))
+
+def timed(fn, start_time):
+    best = None
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        fn(start_time)
+        elapsed = (time.perf_counter() - t0) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == "__main__":
+    print(f"{'lokasi':>8} | {'loop (ms)':>10} | {'pipeline (ms)':>13}")
+    print("-" * 38)
+    try:
+        for n in SIZES:
+            seed(n)
+            start_time = datetime.now(timezone.utc) - timedelta(hours=24)
+            print(f"{n:>8} | {timed(legacy_precip, start_time):>10.1f} | {timed(pipeline_precip, start_time):>13.1f}")
+    finally:
+        client.drop_database("emergency_db_bench")
@@ -0,0 +1,72 @@
+"""
+Benchmark & cek kebenaran spatial_index (AUTO_DETECT_MODE=local) dengan poligon sintetis.
+
+Grid desa berbentuk segi empat tidak beraturan (titik sudut digeser acak, tetap
+saling menempel) di sekitar Aceh; titik acak dicek terhadap brute force point-in-polygon.
+
+Jalankan: python bench_spatial.py
+Tidak butuh MongoDB / data batas desa asli. Atur ukuran grid lewat env BENCH_GRID.
+"""
+import os
+import random
+import statistics
+import time
+
+from bot_modules.spatial_index import SpatialIndex, point_in_polygons, polygons_centroid
+
+GRID = int(os.getenv("BENCH_GRID", "200")) # GRID x GRID desa
+QUERIES = int(os.getenv("BENCH_QUERIES", "2000"))
+CELL_DEG = 0.02 # ~2 km
+ORIGIN = (2.0, 95.0) # lat, lon
+
+def synthetic_villages(n: int):
+    random.seed(7)
+    # Titik sudut bersama -> poligon bertetangga tanpa celah / tumpang tindih
+    corners = [[(ORIGIN[1] + (c + random.uniform(-0.3, 0.3)) * CELL_DEG,
+                 ORIGIN[0] + (r + random.uniform(-0.3, 0.3)) * CELL_DEG)
+                for c in range(n + 1)] for r in range(n + 1)]
+    records = []
+    for r in range(n):
+        for c in range(n):
+            ring = [corners[r][c], corners[r][c + 1], corners[r + 1][c + 1], corners[r + 1][c]]
+            polygons = [[ring]]
+            lat, lon = polygons_centroid(polygons)
+            records.append({"code": f"99.{r // 100:02d}.{c // 100:02d}.{r % 100:02d}{c % 100:02d}",
+                            "lat": lat, "lon": lon, "polygons": polygons})
+    return records
+
+def main():
+    records = synthetic_villages(GRID)
+    t0 = time.perf_counter()
+    index = SpatialIndex(records)
+    print(f"Build polygon index: {time.perf_counter() - t0:.2f}s ({len(index)} desa)")
+    t0 = time.perf_counter()
+    centroids = SpatialIndex({k: v for k, v in rec.items() if k != "polygons"} for rec in records)
+    print(f"Build centroid index: {time.perf_counter() - t0:.2f}s")
+
+    random.seed(11)
+    span = GRID * CELL_DEG
+    points = [(ORIGIN[0] + random.uniform(0.05, 0.95) * span, ORIGIN[1] + random.uniform(0.05, 0.95) * span)
+              for _ in range(QUERIES)]
+
+    # Jawaban benar: poligon yang memuat titik (brute force pada sel sekitar)
+    expected = []
+    for lat, lon in points:
+        r, c = int((lat - ORIGIN[0]) / CELL_DEG), int((lon - ORIGIN[1]) / CELL_DEG)
+        near = [records[rr * GRID + cc] for rr in range(max(0, r - 1), min(GRID, r + 2))
+                for cc in range(max(0, c - 1), min(GRID, c + 2))]
+        expected.append(next((rec["code"] for rec in near if point_in_polygons(lon, lat, rec["polygons"])), None))
+
+    for label, idx in (("polygon", index), ("centroid", centroids)):
+        times, correct = [], 0
+        for (lat, lon), want in zip(points, expected):
+            t0 = time.perf_counter()
+            hit = idx.locate(lat, lon)
+            times.append(time.perf_counter() - t0)
+            correct += hit is not None and hit["code"] == want
+        ordered = sorted(times)
+        print(f"{label:<9} median {statistics.median(times) * 1e6:7.1f} µs   "
+              f"p95 {ordered[int(len(ordered) * 0.95)] * 1e6:7.1f} µs   benar {correct}/{QUERIES}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Ukuran dokumen weather_logs (BSON) untuk forecast Windy: raw vs encoding ringkas.
+
+Jalankan: python bench_windy_storage.py
+Response sintetis seukuran GFS point forecast (10 hari, step 3 jam).
+"""
+import math
+import random
+import bson
+
+from bot_modules.windy_codec import encode_windy, decode_windy, zstandard
+from bot_modules.utils import parse_windy_latest
+
+STEPS = 81 # GFS: 10 hari x 8 step + 1
+PARAMS = {
+    "wind_u-surface": "m*s-1", "wind_v-surface": "m*s-1", "gust-surface": "m*s-1",
+    "temp-surface": "K", "past3hprecip-surface": "m", "lclouds-surface": "%",
+    "mclouds-surface": "%", "hclouds-surface": "%", "rh-surface": "%", "pressure-surface": "Pa",
+}
+
+def synthetic_windy():
+    random.seed(1)
+    t0 = 1760000000000
+    windy = {"ts": [t0 + i * 3 * 3600 * 1000 for i in range(STEPS)], "units": dict(PARAMS), "warning": "Test API key"}
+    for k in PARAMS:
+        base = {"temp-surface": 300.0, "pressure-surface": 100900.0, "rh-surface": 80.0}.get(k, 5.0)
+        windy[k] = [base + math.sin(i / 4) * base * 0.01 + random.random() for i in range(STEPS)]
+    return windy
+
+def log_doc(forecast_raw, extra=None):
+    doc = {"chat_id": "SYSTEM", "location_id": "bench", "location_name": "Banda Aceh", "source": "windy", "forecast_raw": forecast_raw}
+    doc.update(extra or {})
+    return doc
+
+if __name__ == "__main__":
+    windy = synthetic_windy()
+    raw = len(bson.encode(log_doc(windy, {"raw_keys": list(windy.keys())})))
+    print(f"{'encoding':<12} | {'bytes/doc':>9} | {'vs raw':>7}")
+    print("-" * 36)
+    print(f"{'raw':<12} | {raw:>9} | {'100%':>7}")
+
+    for compress in (False, True):
+        enc = encode_windy(windy, compress=compress)
+        size = len(bson.encode(log_doc(enc)))
+        print(f"{enc['enc']:<12} | {size:>9} | {size / raw:>7.0%}")
+
+        # Pastikan decode menghasilkan struktur yang sama untuk parse_windy_latest
+        decoded = decode_windy(enc)
+        assert decoded["ts"] == windy["ts"] and set(decoded) == set(windy)
+        a, b = parse_windy_latest(windy), parse_windy_latest(decoded)
+        assert all(abs(a[k] - b[k]) < 1e-2 * max(1.0, abs(a[k])) for k in a if a[k] is not None)
+
+    if zstandard is None:
+        print("ℹ️ zstandard tidak terpasang, kompresi memakai zlib.")
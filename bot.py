@@ -1,3 +1,7 @@
+import asyncio
+import signal
+
+from telegram import Update
 from telegram.ext import (
     Application, 
     CommandHandler, 
@@ -9,22 +13,39 @@ from telegram.ext import (
 
 from bot_modules.config import TOKEN_BOT, MONGO_URI
 from bot_modules.handlers import (
-    start_with_jobs, menu_callback, handle_location_text, cancel, WAITING_LOCATION
+    start_with_jobs, job_status, menu_callback, handle_location_text, cancel, WAITING_LOCATION
 )
 
-from bot_modules.database import col_locations
+from bot_modules.database import db, col_locations, add_subscriber, remove_subscriber
 from bot_modules.services import geocode_location
 from bot_modules.jobs import ensure_system_jobs
+from bot_modules.broadcast import start_broadcaster, stop_broadcaster, set_broadcast_workers
+from bot_modules.http_clients import close_all as close_http_clients
 from bot_modules.utils import normalize_name
+from bot_modules.region_match import get_region_matcher
+from bot_modules import geocache, leader
 
 async def setup_system(app: Application):
     """
     Setup default locations for SYSTEM context if not exists.
     """
     print("⚙️ Checking System Configuration...")
+
+    # Cache geocoding (L2 & slot Nominatim bersama) memakai koneksi bot_modules.database
+    geocache.init_geocache(db)
+
+    # Antrian broadcast untuk semua notifikasi (rate limit Telegram)
+    start_broadcaster(app.bot, on_forbidden=remove_subscriber)
     
     # Ensure system jobs are running
     ensure_system_jobs(app)
+
+    # Index wilayah (base.csv + trigram) dibangun sekali di thread, bukan saat /add pertama
+    await asyncio.to_thread(get_region_matcher)
+
+    # Chat lama (sebelum ada koleksi subscribers) tetap menerima notifikasi gempa
+    for chat_id in col_locations.distinct("chat_id", {"chat_id": {"$ne": "SYSTEM"}}):
+        add_subscriber(chat_id)
     
     # Check if SYSTEM has locations
     if col_locations.count_documents({"chat_id": "SYSTEM"}) == 0:
@@ -51,6 +72,55 @@ async def setup_system(app: Application):
     else:
         print("✅ System locations ready.")
 
+async def shutdown_system(app: Application):
+    await stop_broadcaster()
+    await close_http_clients()
+
+async def sync_polling(app: Application):
+    """
+    Mode cluster: hanya worker pemegang lease polling yang memanggil getUpdates
+    (Telegram menolak dua poller untuk satu token).
+    """
+    should_poll = leader.holds(leader.POLL_LEASE)
+    if should_poll and not app.updater.running:
+        await app.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        print(f"📡 Polling Telegram aktif di {leader.WORKER_ID}")
+    elif not should_poll and app.updater.running:
+        await app.updater.stop()
+        print(f"📴 Polling Telegram dihentikan di {leader.WORKER_ID}")
+
+async def cluster_tick(app: Application):
+    """
+    Tiap putaran heartbeat: bagi rate broadcast ke worker hidup, lalu sinkronkan polling.
+    """
+    set_broadcast_workers(len(leader.live_workers))
+    await sync_polling(app)
+
+async def run_cluster(app: Application):
+    """
+    Pengganti run_polling() untuk BOT_CLUSTER=1: job berjalan di semua worker
+    (dijaga lease / partisi), polling hanya di satu worker.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    leader.manage(leader.POLL_LEASE)
+    async with app:
+        await setup_system(app)
+        await app.start()
+        try:
+            await leader.run(stop, on_tick=lambda: cluster_tick(app))
+        finally:
+            if app.updater.running:
+                await app.updater.stop()
+            await app.stop()
+            await shutdown_system(app)
+
 if __name__ == "__main__":
     print("🚀 MHEWS Bot berjalan (Modular)...")
 
@@ -72,11 +142,17 @@ if __name__ == "__main__":
     # Register handlers
     # override /start handler agar auto pasang job
     application.add_handler(CommandHandler("start", start_with_jobs))
+    application.add_handler(CommandHandler("status", job_status))
     application.add_handler(conv_handler)
     application.add_handler(CallbackQueryHandler(menu_callback))
 
     # Run system setup on startup
     # Note: post_init is the clean way to run async setup in PTB
     application.post_init = setup_system
+    application.post_shutdown = shutdown_system
 
-    application.run_polling()
+    if leader.CLUSTER_MODE:
+        print(f"🤝 Cluster mode, worker {leader.WORKER_ID}")
+        asyncio.run(run_cluster(application))
+    else:
+        application.run_polling()
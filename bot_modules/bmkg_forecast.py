@@ -0,0 +1,126 @@
+"""
+Parser BMKG point forecast (API v2) ke time series kolumnar.
+
+Response: data[0] = {"lokasi": {...}, "cuaca": [[item, ...], ...]} dengan item per 3 jam
+(utc_datetime "2025-10-12 08:00:00", t, hu, ws km/j, tp mm, weather_desc, ...).
+Diparse sekali per response (di ForecastCache), lalu:
+- times: array epoch UTC terurut
+- kolom angka: array double per field (field kosong -> NaN, di row() jadi None)
+- kolom teks: list per field
+current() / upcoming() memakai bisect atas times, tanpa strptime per pemanggilan.
+"""
+import array
+import bisect
+import math
+import time
+from datetime import datetime, timezone
+
+from .services import fetch_bmkg_point_forecast_json
+
+NUMERIC_FIELDS = ("t", "hu", "ws", "tp", "tcc", "wd_deg", "vs")
+TEXT_FIELDS = ("weather_desc", "weather", "wd", "local_datetime")
+
+def _epoch(value: str):
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+class BmkgForecast:
+    __slots__ = ("location", "times", "numbers", "texts")
+
+    def __init__(self, location: dict, times, numbers: dict, texts: dict):
+        self.location = location
+        self.times = times
+        self.numbers = numbers
+        self.texts = texts
+
+    @classmethod
+    def parse(cls, data_json: dict):
+        """
+        BmkgForecast dari response mentah; None jika tidak ada item cuaca.
+        """
+        raw_data = (data_json or {}).get("data") or []
+        if not raw_data:
+            return None
+
+        rows = []
+        for sublist in raw_data[0].get("cuaca") or []:
+            for item in sublist:
+                ts = _epoch(item.get("utc_datetime"))
+                if ts is not None:
+                    rows.append((ts, item))
+        if not rows:
+            return None
+        rows.sort(key=lambda r: r[0])
+
+        return cls(
+            location=raw_data[0].get("lokasi") or data_json.get("lokasi") or {},
+            times=array.array("d", (ts for ts, _ in rows)),
+            numbers={f: array.array("d", (_number(item.get(f)) for _, item in rows)) for f in NUMERIC_FIELDS},
+            texts={f: [str(item.get(f) or "") for _, item in rows] for f in TEXT_FIELDS},
+        )
+
+    def __len__(self):
+        return len(self.times)
+
+    def _ts(self, now) -> float:
+        if now is None:
+            return time.time()
+        return now.timestamp() if isinstance(now, datetime) else float(now)
+
+    def nearest_index(self, now=None) -> int:
+        """
+        Indeks item terdekat ke now (seri: item lebih awal).
+        """
+        ts = self._ts(now)
+        i = bisect.bisect_left(self.times, ts)
+        if i == 0:
+            return 0
+        if i == len(self.times) or ts - self.times[i - 1] <= self.times[i] - ts:
+            return i - 1
+        return i
+
+    def row(self, i: int) -> dict:
+        """
+        Satu item sebagai dict (field BMKG + "time" epoch, "utc_datetime" datetime).
+        ws dalam km/j seperti aslinya; "ws_ms" sudah dikonversi ke m/s.
+        Field angka yang kosong di response bernilai None.
+        """
+        row = {f: None if math.isnan(col[i]) else col[i] for f, col in self.numbers.items()}
+        row.update({f: col[i] for f, col in self.texts.items()})
+        row["time"] = self.times[i]
+        row["utc_datetime"] = datetime.fromtimestamp(self.times[i], timezone.utc)
+        row["ws_ms"] = row["ws"] / 3.6 if row["ws"] is not None else None
+        return row
+
+    def current(self, now=None) -> dict:
+        return self.row(self.nearest_index(now)) if len(self.times) else None
+
+    def upcoming(self, now=None, hours: float = 24) -> list:
+        """
+        Item setelah now sampai now + hours (3 jam sekali -> 8 item untuk 24 jam).
+        """
+        ts = self._ts(now)
+        lo = bisect.bisect_right(self.times, ts)
+        hi = bisect.bisect_right(self.times, ts + hours * 3600)
+        return [self.row(i) for i in range(lo, hi)]
+
+    def series(self, field: str):
+        """
+        Kolom mentah (array / list) untuk satu field, sejajar dengan times
+        (nilai kosong di kolom angka = NaN).
+        """
+        return self.numbers.get(field) if field in self.numbers else self.texts.get(field)
+
+async def fetch_bmkg_forecast(adm4_code: str):
+    """
+    Ambil & parse forecast BMKG untuk kode ADM4 (None jika response kosong).
+    """
+    return BmkgForecast.parse(await fetch_bmkg_point_forecast_json(adm4_code))
@@ -0,0 +1,242 @@
+"""
+Antrian broadcast Telegram dengan rate limit.
+
+- Token bucket global (default 25 pesan/detik, batas Telegram ~30/detik).
+  Mode cluster: batas itu dibagi rata ke worker hidup (set_broadcast_workers),
+  karena batas Telegram berlaku per token bot, bukan per proses
+- Jeda minimal per chat (default 1 detik)
+- Worker konkuren, DANGER dikirim lebih dulu dari pesan rutin
+- RetryAfter (HTTP 429) dihormati: semua pengiriman dijeda selama retry_after.
+  429 adalah instruksi throttle, bukan kegagalan, jadi tidak dihitung ke BROADCAST_MAX_RETRIES
+- Pesan DANGER tidak dibatasi BROADCAST_MAX_RETRIES (terus dicoba, jeda maks 30 detik)
+  sampai BROADCAST_DANGER_DEADLINE detik sejak masuk antrian, lalu dicatat gagal
+  supaya join() tetap selesai walaupun chat-nya tidak pernah bisa dijangkau
+"""
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut, NetworkError
+
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+BROADCAST_CHAT_INTERVAL = float(os.getenv("BROADCAST_CHAT_INTERVAL", "1.0"))
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "16"))
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "5"))
+BROADCAST_DANGER_DEADLINE = float(os.getenv("BROADCAST_DANGER_DEADLINE", "900"))
+
+PRIORITY = {"DANGER": 0, "WARNING": 1, "INFO": 2}
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        # Burst kecil (0.1 detik) supaya tidak melewati batas per detik Telegram
+        self.capacity = capacity or max(1.0, rate / 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        # Lock (FIFO) supaya worker yang menunggu lebih dulu dapat token lebih dulu
+        self.lock = asyncio.Lock()
+
+    def set_rate(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate / 10)
+        self.tokens = min(self.tokens, self.capacity)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class Broadcaster:
+    def __init__(self, bot, rate: float = BROADCAST_RATE, chat_interval: float = BROADCAST_CHAT_INTERVAL,
+                 workers: int = BROADCAST_WORKERS, on_forbidden=None):
+        self.bot = bot
+        self.rate = rate
+        self.bucket = TokenBucket(rate)
+        self.chat_interval = chat_interval
+        self.workers = workers
+        self.on_forbidden = on_forbidden
+
+        self.queue = asyncio.PriorityQueue()
+        self.seq = itertools.count()
+        self.chat_next = {} # chat_id -> waktu kirim berikutnya yang diizinkan
+        self.tasks = []
+        self.pending = 0 # pesan yang belum terkirim/gagal final (termasuk yang ditunda)
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+        self.stats = {"sent": 0, "failed": 0, "retries": 0, "throttled": 0}
+        self.latency = {level: deque(maxlen=1000) for level in PRIORITY}
+
+    def start(self):
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for t in self.tasks:
+            t.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def set_workers(self, workers: int):
+        """
+        Bagi rate ke sejumlah worker yang mengirim dengan token bot yang sama.
+        """
+        rate = self.rate / max(1, workers)
+        if rate != self.bucket.rate:
+            self.bucket.set_rate(rate)
+            print(f"📨 Broadcast rate {rate:.2f} pesan/detik ({max(1, workers)} worker)")
+
+    def send(self, chat_id, text: str, level: str = "INFO", parse_mode=ParseMode.MARKDOWN):
+        level = level if level in PRIORITY else "INFO"
+        msg = {
+            "chat_id": chat_id, "text": text, "level": level, "parse_mode": parse_mode,
+            "queued_at": time.monotonic(), "attempts": 0, "finished": False
+        }
+        self.pending += 1
+        self.idle.clear()
+        self._put(msg)
+
+    def send_many(self, chat_ids, text: str, level: str = "INFO"):
+        for chat_id in chat_ids:
+            self.send(chat_id, text, level)
+
+    async def join(self):
+        """
+        Tunggu sampai semua pesan terkirim atau gagal final.
+        """
+        await self.idle.wait()
+
+    def _put(self, msg: dict, delay: float = 0):
+        entry = (PRIORITY[msg["level"]], next(self.seq), msg)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self.queue.put_nowait, entry)
+        else:
+            self.queue.put_nowait(entry)
+
+    def _done(self, msg: dict, ok: bool):
+        # Satu pesan hanya boleh diselesaikan sekali (pending & idle tetap konsisten)
+        if msg["finished"]:
+            return
+        msg["finished"] = True
+        self.stats["sent" if ok else "failed"] += 1
+        self.pending -= 1
+        if self.pending == 0:
+            self.idle.set()
+
+    async def _worker(self):
+        while True:
+            _, _, msg = await self.queue.get()
+            try:
+                await self._deliver(msg)
+            except Exception as e:
+                print(f"⚠️ Broadcast Error {msg['chat_id']}: {e}")
+                self._done(msg, False)
+
+    async def _deliver(self, msg: dict):
+        chat_id = msg["chat_id"]
+
+        # Limit per chat: tunda tanpa menahan worker
+        wait = self.chat_next.get(chat_id, 0) - time.monotonic()
+        if wait > 0:
+            self._put(msg, delay=wait)
+            return
+        self.chat_next[chat_id] = time.monotonic() + self.chat_interval
+
+        await self.bucket.acquire()
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=msg["text"], parse_mode=msg["parse_mode"])
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            seconds = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+            self.bucket.pause(seconds)
+            self.stats["throttled"] += 1
+            self._put(msg, delay=seconds)
+            return
+        except Forbidden:
+            # Bot diblokir / dikeluarkan dari grup
+            self._done(msg, False)
+            if self.on_forbidden:
+                try:
+                    self.on_forbidden(chat_id)
+                except Exception as e:
+                    print(f"⚠️ Broadcast on_forbidden Error {chat_id}: {e}")
+            return
+        except BadRequest as e:
+            # Chat tidak ada / format pesan salah: tidak perlu retry
+            self._done(msg, False)
+            print(f"⚠️ Broadcast BadRequest {chat_id}: {e}")
+            return
+        except (TimedOut, NetworkError):
+            self._retry(msg, min(30.0, 2.0 ** msg["attempts"]))
+            return
+
+        self.latency[msg["level"]].append(time.monotonic() - msg["queued_at"])
+        self._done(msg, True)
+
+    def _retry(self, msg: dict, delay: float):
+        msg["attempts"] += 1
+        if msg["level"] == "DANGER":
+            age = time.monotonic() - msg["queued_at"]
+            if age + delay > BROADCAST_DANGER_DEADLINE:
+                self._done(msg, False)
+                print(f"🚨 Broadcast DANGER gagal setelah {msg['attempts']} percobaan "
+                      f"({age:.0f} detik, batas {BROADCAST_DANGER_DEADLINE:.0f}): {msg['chat_id']}")
+                return
+        elif msg["attempts"] > BROADCAST_MAX_RETRIES:
+            self._done(msg, False)
+            print(f"⚠️ Broadcast gagal setelah {BROADCAST_MAX_RETRIES} retry: {msg['chat_id']}")
+            return
+        self.stats["retries"] += 1
+        self._put(msg, delay=delay)
+
+    def metrics(self) -> dict:
+        """
+        Jumlah terkirim/gagal/retry, panjang antrian, latency (detik) per level.
+        """
+        latency = {}
+        for level, values in self.latency.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            latency[level] = {
+                "p50": ordered[len(ordered) // 2],
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "max": ordered[-1],
+            }
+        return {**self.stats, "pending": self.pending, "latency": latency}
+
+# Instance global, dibuat saat bot start (bot.setup_system)
+broadcaster = None
+
+def start_broadcaster(bot, on_forbidden=None) -> Broadcaster:
+    global broadcaster
+    if broadcaster is None:
+        broadcaster = Broadcaster(bot, on_forbidden=on_forbidden)
+        broadcaster.start()
+    return broadcaster
+
+def set_broadcast_workers(workers: int):
+    if broadcaster is not None:
+        broadcaster.set_workers(workers)
+
+async def stop_broadcaster():
+    global broadcaster
+    if broadcaster is not None:
+        await broadcaster.stop()
+        broadcaster = None
@@ -7,6 +7,8 @@ TOKEN_BOT = os.getenv("TELEGRAM_TOKEN")
 MONGO_URI = os.getenv("MONGO_URI")
 WINDY_API_KEY = os.getenv("WINDY_API_KEY")
 DEFAULT_WEATHER_MODE = (os.getenv("WEATHER_MODE", "both") or "both").lower().strip()
+# Format penyimpanan forecast Windy di weather_logs: raw | f32 | f32z (float32 + kompresi)
+WINDY_STORAGE_ENCODING = (os.getenv("WINDY_STORAGE_ENCODING", "f32z") or "f32z").lower().strip()
 
 # URLs
 BMKG_EQ_URL = "https://data.bmkg.go.id/DataMKG/TEWS/autogempa.json"
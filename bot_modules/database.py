@@ -1,6 +1,12 @@
-from pymongo import MongoClient, ASCENDING
+import os
+from pymongo import MongoClient
 from datetime import datetime, timezone
 from .config import MONGO_URI
+from .indexes import apply_indexes
+
+# Index dibuat saat deploy (Procfile release: python -m bot_modules.indexes apply).
+# MONGO_APPLY_INDEXES_ON_IMPORT=1 untuk membuatnya saat import (mis. dijalankan lokal tanpa release phase)
+MONGO_APPLY_INDEXES_ON_IMPORT = os.getenv("MONGO_APPLY_INDEXES_ON_IMPORT", "0") == "1"
 
 client = None
 db = None
@@ -24,6 +30,8 @@ if db is not None:
     col_weather_logs = db["weather_logs"]
     col_locations = db["locations"]
     col_settings = db["settings"]
+    col_latest_forecast = db["latest_forecast"]
+    col_subscribers = db["subscribers"]
 else:
     # Fallback to avoid ImportErrors, but operations will fail
     col_alerts = None
@@ -31,20 +39,14 @@ else:
     col_weather_logs = None
     col_locations = None
     col_settings = None
+    col_latest_forecast = None
+    col_subscribers = None
 
-# Indexes
-# Indexes
-try:
-    if col_locations is not None:
-        col_locations.create_index([("chat_id", ASCENDING), ("name_norm", ASCENDING)], unique=True)
-    if col_weather_logs is not None:
-        col_weather_logs.create_index([("chat_id", ASCENDING), ("location_id", ASCENDING), ("timestamp", ASCENDING)])
-    if col_alerts is not None:
-        col_alerts.create_index([("DateTime", ASCENDING)])
-    if col_weather_alerts is not None:
-        col_weather_alerts.create_index([("saved_at", ASCENDING)])
-except Exception as e:
-    print(f"⚠️ Index Creation Warning: {e}")
+if db is not None and MONGO_APPLY_INDEXES_ON_IMPORT:
+    try:
+        apply_indexes(db, verbose=False)
+    except Exception as e:
+        print(f"⚠️ Index Setup Warning: {e}")
 
 def get_setting(chat_id: int, key: str, default=None):
     doc = col_settings.find_one({"_id": f"{chat_id}:{key}"})
@@ -56,3 +58,16 @@ def set_setting(chat_id: int, key: str, value):
         {"$set": {"value": value, "updated_at": datetime.now(timezone.utc)}},
         upsert=True
     )
+
+def add_subscriber(chat_id: int):
+    col_subscribers.update_one(
+        {"_id": chat_id},
+        {"$setOnInsert": {"subscribed_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+def remove_subscriber(chat_id: int):
+    col_subscribers.delete_one({"_id": chat_id})
+
+def get_subscribers() -> list:
+    return [d["_id"] for d in col_subscribers.find({}, {"_id": 1})]
@@ -0,0 +1,110 @@
+"""
+Cache in-memory untuk BMKG point forecast, key = kode ADM4.
+Yang disimpan hasil parse (bmkg_forecast.BmkgForecast), bukan JSON mentah.
+
+- Data dianggap segar sampai batas slot publikasi BMKG berikutnya
+  (default tiap 3 jam UTC, sama dengan resolusi data prakiraan)
+- Setelah itu masih boleh dipakai (stale) selama BMKG_FORECAST_STALE_SECONDS
+  sambil di-refresh di background (stale-while-revalidate)
+- Miss bersamaan untuk kode yang sama digabung jadi satu request (single-flight)
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+from .bmkg_forecast import fetch_bmkg_forecast
+
+BMKG_FORECAST_SLOT_SECONDS = int(os.getenv("BMKG_FORECAST_SLOT_SECONDS", "10800"))
+BMKG_FORECAST_STALE_SECONDS = int(os.getenv("BMKG_FORECAST_STALE_SECONDS", "21600"))
+BMKG_FORECAST_CACHE_MAX = int(os.getenv("BMKG_FORECAST_CACHE_MAX", "5000"))
+
+class ForecastCache:
+    def __init__(self, fetch, slot_seconds: int = BMKG_FORECAST_SLOT_SECONDS,
+                 stale_seconds: int = BMKG_FORECAST_STALE_SECONDS, max_entries: int = BMKG_FORECAST_CACHE_MAX):
+        self.fetch = fetch
+        self.slot_seconds = slot_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+
+        self.entries = OrderedDict() # code -> {"data", "fetched_at", "expires_at"}
+        self.inflight = {} # code -> asyncio.Task
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    def _expires_at(self, now: float) -> float:
+        # Batas slot berikutnya (epoch, UTC), bukan sekadar now + TTL
+        return (now // self.slot_seconds + 1) * self.slot_seconds
+
+    async def get(self, code: str, allow_stale: bool = True):
+        """
+        Ambil forecast untuk kode ADM4. allow_stale=False menunggu data baru jika
+        entry sudah lewat slot (data lama tetap dipakai jika refresh gagal).
+        """
+        now = time.time()
+        entry = self.entries.get(code)
+
+        if entry is not None:
+            self.entries.move_to_end(code)
+            if now < entry["expires_at"]:
+                self.stats["hits"] += 1
+                return entry["data"]
+
+            if now < entry["expires_at"] + self.stale_seconds:
+                if allow_stale:
+                    self.stats["stale_hits"] += 1
+                    self._refresh(code)
+                    return entry["data"]
+                try:
+                    return await self._load(code)
+                except Exception:
+                    self.stats["stale_hits"] += 1
+                    return entry["data"]
+
+        self.stats["misses"] += 1
+        return await self._load(code)
+
+    def age(self, code: str):
+        """
+        Umur data (detik) di cache, None jika belum ada.
+        """
+        entry = self.entries.get(code)
+        return None if entry is None else time.time() - entry["fetched_at"]
+
+    async def _load(self, code: str):
+        task = self.inflight.get(code)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(code))
+            self.inflight[code] = task
+            task.add_done_callback(lambda _: self.inflight.pop(code, None))
+        else:
+            self.stats["coalesced"] += 1
+        # shield: pemanggil yang dibatalkan tidak ikut membatalkan request bersama
+        return await asyncio.shield(task)
+
+    def _refresh(self, code: str):
+        if code in self.inflight:
+            return
+        task = asyncio.ensure_future(self._load(code))
+        # Error sudah dihitung di _fetch, cukup diambil supaya tidak jadi warning asyncio
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _fetch(self, code: str):
+        try:
+            data = await self.fetch(code)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️ BMKG Forecast Fetch Error {code}: {e}")
+            raise
+
+        now = time.time()
+        self.entries[code] = {"data": data, "fetched_at": now, "expires_at": self._expires_at(now)}
+        self.entries.move_to_end(code)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return data
+
+    def metrics(self) -> dict:
+        return {**self.stats, "entries": len(self.entries), "inflight": len(self.inflight)}
+
+# Instance global yang dipakai job logger dan tombol cuaca
+bmkg_forecasts = ForecastCache(fetch_bmkg_forecast)
@@ -0,0 +1,235 @@
+"""
+Cache geocoding (Nominatim) dua tingkat + antrian request sesuai kebijakan Nominatim.
+
+- L1: LRU in-memory per proses
+- L2: koleksi MongoDB geocode_cache (dipakai bersama bot & API, tahan restart),
+      dokumen kadaluarsa dihapus index TTL pada expires_at
+- Key: "q:<query dinormalisasi>" untuk search, "r:<tile lat>:<tile lon>" untuk reverse
+  (koordinat dibulatkan ke tile GEOCODE_TILE_DEG, Nominatim ditanya titik tengah tile)
+- Miss lewat satu antrian global: maksimal 1 request per NOMINATIM_MIN_INTERVAL detik,
+  request yang sama dan sedang berjalan digabung (tidak dikirim dua kali).
+  Antar proses (API, bot, worker cluster) slot dipesan lewat dokumen nominatim_slot
+  di MongoDB, jadi batas 1 request/detik berlaku untuk gabungan semua proses
+- Hasil kosong (tidak ditemukan) ikut di-cache dengan TTL pendek; error tidak di-cache
+- Koneksi MongoDB tidak dibuka sendiri: tiap proses memanggil init_geocache(db, run)
+  dengan handle & thread pool miliknya; sebelum itu hanya L1 + jeda lokal yang aktif
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+
+GEOCODE_CACHE_MAX = int(os.getenv("GEOCODE_CACHE_MAX", "2048"))
+GEOCODE_CACHE_TTL_SECONDS = int(os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 86400)))
+GEOCODE_NEGATIVE_TTL_SECONDS = int(os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", "86400"))
+# 0.005 derajat ~ 550 m, masih di dalam satu desa untuk reverse zoom 14
+GEOCODE_TILE_DEG = float(os.getenv("GEOCODE_TILE_DEG", "0.005"))
+NOMINATIM_MIN_INTERVAL = float(os.getenv("NOMINATIM_MIN_INTERVAL", "1.0"))
+NOMINATIM_SHARED_SLOT = os.getenv("NOMINATIM_SHARED_SLOT", "1") != "0"
+
+def search_key(query: str) -> str:
+    return "q:" + " ".join((query or "").lower().split())
+
+def reverse_tile(lat: float, lon: float, deg: float = GEOCODE_TILE_DEG):
+    """
+    (key, lat_tengah, lon_tengah) tile untuk koordinat.
+    """
+    ty, tx = math.floor(lat / deg), math.floor(lon / deg)
+    return f"r:{ty}:{tx}", round((ty + 0.5) * deg, 6), round((tx + 0.5) * deg, 6)
+
+async def _to_thread(fn, *args):
+    return await asyncio.to_thread(fn, *args)
+
+class MongoSlot:
+    """
+    Jadwal request bersama antar proses: tiap request memesan slot berikutnya
+    (next_at) pada satu dokumen secara atomik. Waktu diambil dari server Mongo
+    ($$NOW) supaya selisih jam antar mesin tidak berpengaruh.
+    """
+    def __init__(self, collection, name: str = "nominatim", min_interval: float = NOMINATIM_MIN_INTERVAL):
+        """
+        collection: koleksi pymongo (mis. db.nominatim_slot) dari koneksi milik proses.
+        """
+        self.collection = collection
+        self.name = name
+        self.min_interval = min_interval
+
+    def reserve(self) -> float:
+        """
+        Pesan satu slot. Return detik yang harus ditunggu sebelum request dikirim.
+        """
+        from pymongo import ReturnDocument
+        doc = self.collection.find_one_and_update(
+            {"_id": self.name},
+            [
+                {"$set": {"slot_at": {"$max": [{"$ifNull": ["$next_at", "$$NOW"]}, "$$NOW"]},
+                          "reserved_at": "$$NOW"}},
+                {"$set": {"next_at": {"$add": ["$slot_at", int(self.min_interval * 1000)]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return max(0.0, (doc["slot_at"] - doc["reserved_at"]).total_seconds())
+
+class RequestScheduler:
+    """
+    Antrian request berurutan dengan jeda minimum antar request.
+    slot (opsional, MongoSlot): jeda yang sama diberlakukan juga antar proses.
+    run (opsional): async fn(fn, *args) untuk query blocking, mis. run_db API.
+    """
+    def __init__(self, min_interval: float = NOMINATIM_MIN_INTERVAL, slot: MongoSlot = None, run=None):
+        self.min_interval = min_interval
+        self.slot = slot
+        self.run = run or _to_thread
+        self.lock = asyncio.Lock() # FIFO: pemanggil dilayani sesuai urutan datang
+        self.next_at = 0.0
+        self.inflight = {} # key -> asyncio.Task
+        self.stats = {"requests": 0, "coalesced": 0, "waited_seconds": 0.0}
+
+    async def submit(self, key: str, fetch):
+        """
+        Jalankan fetch() (async) lewat antrian. Key yang sedang antre/berjalan
+        tidak dikirim lagi, pemanggil berikutnya menunggu hasil yang sama.
+        """
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(fetch))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _run(self, fetch):
+        async with self.lock:
+            wait = self.next_at - time.monotonic()
+            if wait > 0:
+                self.stats["waited_seconds"] += wait
+                await asyncio.sleep(wait)
+            await self._wait_shared_slot()
+            try:
+                self.stats["requests"] += 1
+                return await fetch()
+            finally:
+                # Jeda dihitung dari selesainya request (tidak pernah paralel)
+                self.next_at = time.monotonic() + self.min_interval
+
+    async def _wait_shared_slot(self):
+        if self.slot is None:
+            return
+        try:
+            wait = await self.run(self.slot.reserve)
+        except Exception as e:
+            # Mongo bermasalah: tetap jalan dengan jeda lokal saja
+            print(f"⚠️ Nominatim Slot Error: {e}")
+            return
+        if wait:
+            self.stats["waited_seconds"] += wait
+            await asyncio.sleep(wait)
+
+    def metrics(self) -> dict:
+        return {**self.stats, "queued": len(self.inflight)}
+
+class GeoCache:
+    def __init__(self, scheduler: RequestScheduler, collection=None, run=None,
+                 max_entries: int = GEOCODE_CACHE_MAX, ttl_seconds: int = GEOCODE_CACHE_TTL_SECONDS,
+                 negative_ttl_seconds: int = GEOCODE_NEGATIVE_TTL_SECONDS):
+        """
+        collection: koleksi pymongo L2 (mis. db.geocode_cache); None = tanpa L2.
+        run: async fn(fn, *args) untuk query blocking (default asyncio.to_thread).
+        """
+        self.scheduler = scheduler
+        self.collection = collection
+        self.run = run or _to_thread
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+
+        self.entries = OrderedDict() # key -> {"data", "expires_at" (epoch)}
+        self.stats = {"hits": 0, "mongo_hits": 0, "misses": 0, "errors": 0}
+
+    async def get(self, key: str, fetch):
+        """
+        Hasil untuk key: LRU -> MongoDB -> fetch() lewat antrian.
+        fetch (async) mengembalikan data atau None (tidak ditemukan); exception diteruskan.
+        """
+        entry = self.entries.get(key)
+        if entry is not None and time.time() < entry["expires_at"]:
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry["data"]
+
+        doc = await self.run(self._load_doc, key) if self.collection is not None else None
+        if doc is not None:
+            self.stats["mongo_hits"] += 1
+            self._remember(key, doc["data"], doc["expires_at"].replace(tzinfo=timezone.utc).timestamp())
+            return doc["data"]
+
+        self.stats["misses"] += 1
+        return await self.scheduler.submit(key, lambda: self._fetch(key, fetch))
+
+    async def _fetch(self, key: str, fetch):
+        # Dijalankan sekali per key walau banyak pemanggil (lihat RequestScheduler)
+        try:
+            data = await fetch()
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+
+        ttl = self.ttl_seconds if data is not None else self.negative_ttl_seconds
+        expires_at = time.time() + ttl
+        self._remember(key, data, expires_at)
+        if self.collection is not None:
+            await self.run(self._save_doc, key, data, expires_at)
+        return data
+
+    def _remember(self, key: str, data, expires_at: float):
+        self.entries[key] = {"data": data, "expires_at": expires_at}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _load_doc(self, key: str):
+        try:
+            # TTL monitor Mongo berjalan per menit, jadi expires_at tetap dicek di query
+            return self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+        except Exception as e:
+            print(f"⚠️ Geocode Cache Read Error {key}: {e}")
+            return None
+
+    def _save_doc(self, key: str, data, expires_at: float):
+        now = datetime.now(timezone.utc)
+        try:
+            self.collection.replace_one(
+                {"_id": key},
+                {"data": data, "saved_at": now,
+                 "expires_at": now + timedelta(seconds=expires_at - time.time())},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ Geocode Cache Write Error {key}: {e}")
+
+    def metrics(self) -> dict:
+        return {**self.stats, "entries": len(self.entries), "nominatim": self.scheduler.metrics()}
+
+# Satu antrian Nominatim per proses untuk semua search & reverse (tanpa MongoDB
+# sampai init_geocache dipanggil)
+nominatim_queue = RequestScheduler()
+geocode_cache = GeoCache(nominatim_queue)
+
+def init_geocache(db, run=None) -> GeoCache:
+    """
+    Pasang L2 & slot bersama memakai koneksi MongoDB milik proses pemanggil.
+    run: async fn(fn, *args) untuk query blocking (API: run_db, thread pool berukuran).
+    Slot Nominatim dibagi antar proses lewat db.nominatim_slot
+    (NOMINATIM_SHARED_SLOT=0 untuk jeda per proses saja).
+    """
+    global nominatim_queue, geocode_cache
+    if db is None:
+        return geocode_cache
+    slot = MongoSlot(db["nominatim_slot"]) if NOMINATIM_SHARED_SLOT else None
+    nominatim_queue = RequestScheduler(slot=slot, run=run)
+    geocode_cache = GeoCache(nominatim_queue, collection=db["geocode_cache"], run=run)
+    return geocode_cache
@@ -0,0 +1,14 @@
+"""
+Perhitungan geografis murni (tanpa MongoDB / jaringan), aman di-import dari mana saja.
+"""
+import math
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    R = 6371  # Radius bumi (km)
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) * math.sin(dlat / 2) + \
+        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * \
+        math.sin(dlon / 2) * math.sin(dlon / 2)
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
@@ -5,22 +5,22 @@ from datetime import datetime, timezone
 
 from .config import DEFAULT_WEATHER_MODE, WINDY_API_KEY
 from .database import (
-    col_locations, col_alerts, col_weather_alerts, 
+    col_locations, col_alerts, col_weather_alerts, col_latest_forecast,
     get_setting, set_setting
 )
-from .services import (
-    get_bmkg_eq, geocode_location, windy_point_forecast,
-    fetch_bmkg_point_forecast_json
-)
+from .services import get_bmkg_eq, geocode_location, windy_point_forecast
+from .forecast_cache import bmkg_forecasts
 from .utils import (
     get_alert_level, normalize_name, format_ts_ms, parse_windy_latest,
-    get_adm4_from_csv, get_bmkg_weather_text
+    get_adm4_from_csv, get_bmkg_weather_text, fmt_number
 )
 from .keyboards import (
     main_menu_keyboard, location_menu_keyboard, 
     settings_keyboard, back_keyboard
 )
-from .jobs import ensure_jobs_for_chat, LAST_EQ_TIME
+from . import broadcast, jobs
+from .scheduler import format_job_stats
+from .jobs import ensure_jobs_for_chat
 
 # Conversation states
 WAITING_LOCATION = 1
@@ -52,6 +52,20 @@ async def start_with_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ensure_jobs_for_chat(context.application, update.effective_chat.id)
     await start(update, context)
 
+async def job_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /status: statistik job terjadwal & antrian broadcast.
+    """
+    text = "⏱ *STATUS JOB*\n━━━━━━━━━━━━━━━━━━\n\n" + format_job_stats()
+
+    if broadcast.broadcaster is not None:
+        m = broadcast.broadcaster.metrics()
+        text += (
+            f"\n\n📨 *Broadcast:* terkirim {m['sent']}, gagal {m['failed']}, "
+            f"retry {m['retries']}, throttle {m['throttled']}, antrian {m['pending']}"
+        )
+    await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+
 async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -68,7 +82,7 @@ async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if query.data == "menu_status":
         mode = get_setting(chat_id, "weather_mode", DEFAULT_WEATHER_MODE)
         locs = list(col_locations.find({"chat_id": chat_id}))
-        gempa_count = col_alerts.count_documents({})
+        gempa_count = col_alerts.estimated_document_count()
         alert_count = col_weather_alerts.count_documents({"chat_id": chat_id})
 
         text = (
@@ -80,11 +94,13 @@ async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"🌍 *Total Gempa Tercatat:* {gempa_count}\n"
             f"⛈ *Alert Cuaca (chat ini):* {alert_count}\n\n"
             f"🕐 *Update Terakhir:*\n"
-            f"├ Gempa: {LAST_EQ_TIME or 'Belum ada'}\n"
+            f"├ Gempa: {jobs.LAST_EQ_TIME or 'Belum ada'}\n"
             f"└ RSS: {('Ada' if col_weather_alerts.find_one({'chat_id': 'SYSTEM'}) else 'Belum ada')}\n\n"
             f"⚙️ *API Status:*\n"
             f"├ BMKG Gempa: ✅\n"
-            f"└ BMKG Cuaca: ✅ (v2 JSON)"
+            f"└ BMKG Cuaca: ✅ (v2 JSON)\n\n"
+            f"⏱ *Job Terjadwal:*\n"
+            f"{format_job_stats()}"
         )
         await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN, reply_markup=back_keyboard())
         return
@@ -166,6 +182,8 @@ async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if query.data.startswith("del_"):
         loc_id = query.data[4:]
         res = col_locations.delete_one({"_id": loc_id, "chat_id": chat_id})
+        if res.deleted_count:
+            col_latest_forecast.delete_one({"_id": loc_id})
         await query.answer("✅ Dihapus" if res.deleted_count else "❌ Gagal menghapus")
         await query.edit_message_text(
             "📍 *KELOLA LOKASI*\n━━━━━━━━━━━━━━━━━━\n\nPilih aksi:",
@@ -231,62 +249,26 @@ async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         if adm4:
             try:
-                data_json = await fetch_bmkg_point_forecast_json(adm4)
-                # Parse logic (simplified from jobs.py)
-                raw_data = data_json.get("data", [])
-                if raw_data:
-                    cuaca_lists = raw_data[0].get("cuaca", [])
-                    forecast_flat = []
-                    for sublist in cuaca_lists:
-                        for item in sublist:
-                            forecast_flat.append(item)
-                    
-                    # Sort
-                    def parse_dt(d_str):
-                        try: return datetime.strptime(d_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-                        except: return datetime.min.replace(tzinfo=timezone.utc)
-                    
-                    forecast_flat.sort(key=lambda x: parse_dt(x.get("utc_datetime", "")))
-                    
-                    # Find current (closest)
-                    now_utc = datetime.now(timezone.utc)
-                    best_current = None
-                    min_diff = 999999999
-                    for item in forecast_flat:
-                        dt_obj = parse_dt(item.get("utc_datetime"))
-                        diff = abs((dt_obj - now_utc).total_seconds())
-                        if diff < min_diff:
-                            min_diff = diff
-                            best_current = item
-                    
-                    if best_current:
-                        lat_disp = f"{doc['lat']:.4f}"
-                        lon_disp = f"{doc['lon']:.4f}"
-                        
-                        t = best_current.get("t", "-")
-                        h = best_current.get("hu", "-")
-                        ws_kmh = float(best_current.get("ws", 0))
-                        ws_ms = ws_kmh / 3.6
-                        desc = best_current.get("weather_desc", "Berawan")
-                        
-                        text_parts += [
-                            "⛈ *BMKG Point Forecast*",
-                            f"📍 *Wilayah:* {doc['name']}",
-                            f"🆔 *Kode Wilayah:* {adm4}",
-                            f"🕐 *Waktu:* {best_current.get('local_datetime', '-')}",
-                            "",
-                            f"🌡 *Suhu:* {t}°C",
-                            f"💧 *Kelembapan:* {h}%",
-                            f"☁️ *Cuaca:* {desc}",
-                            f"🌬 *Angin:* {ws_ms:.1f} m/s",
-                            "",
-                            "ℹ️ *Sumber:* BMKG API v2",
-                            ""
-                        ]
-                    else:
-                        text_parts.append("⚠️ Data BMKG kosong untuk wilayah ini.")
+                # Dari cache (diisi job logger), request ke BMKG hanya jika belum ada / kadaluarsa
+                forecast = await bmkg_forecasts.get(adm4)
+                current = forecast.current() if forecast else None
+                if current:
+                    text_parts += [
+                        "⛈ *BMKG Point Forecast*",
+                        f"📍 *Wilayah:* {doc['name']}",
+                        f"🆔 *Kode Wilayah:* {adm4}",
+                        f"🕐 *Waktu:* {current['local_datetime'] or '-'}",
+                        "",
+                        f"🌡 *Suhu:* {fmt_number(current['t'])}°C",
+                        f"💧 *Kelembapan:* {fmt_number(current['hu'])}%",
+                        f"☁️ *Cuaca:* {current['weather_desc'] or 'Berawan'}",
+                        f"🌬 *Angin:* {fmt_number(current['ws_ms'], '.1f')} m/s",
+                        "",
+                        "ℹ️ *Sumber:* BMKG API v2",
+                        ""
+                    ]
                 else:
-                    text_parts.append("⚠️ Format Data BMKG tidak dikenali.")
+                    text_parts.append("⚠️ Data BMKG kosong untuk wilayah ini.")
 
             except Exception as bmkg_err:
                 text_parts.append(f"⚠️ Gagal mengambil data BMKG: {bmkg_err}")
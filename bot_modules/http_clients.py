@@ -0,0 +1,100 @@
+"""
+Registry httpx.AsyncClient yang dipakai ulang (satu per layanan eksternal).
+
+Setiap client punya pool koneksi sendiri (per host), keep-alive, timeout sesuai
+layanan, dan HTTP/2 jika paket h2 terpasang (pip install httpx[http2]).
+Client dibuat saat pertama dipakai dan ditutup lewat close_all() saat shutdown.
+"""
+import os
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP2_ENABLED = HTTP2_AVAILABLE and os.getenv("HTTP2_ENABLED", "1") != "0"
+
+# timeout (detik), batas koneksi, dan header default per layanan
+SERVICES = {
+    "bmkg": {
+        "timeout": 20, "max_connections": 20,
+        "headers": {"User-Agent": "MHEWS-Bot/3.0", "Accept": "application/json"},
+    },
+    "nominatim": {
+        # Nominatim membatasi 1 request/detik, koneksi banyak tidak ada gunanya
+        "timeout": 20, "max_connections": 2,
+        "headers": {"User-Agent": "MHEWS-Bot/3.0 (telegram; emergency-monitoring)"},
+    },
+    "windy": {"timeout": 25, "max_connections": 10},
+    "api": {"timeout": 30, "max_connections": 10},
+    "default": {"timeout": 15, "max_connections": 10},
+}
+
+_clients = {}
+_stats = {}
+
+def _new_stats() -> dict:
+    return {"requests": 0, "connections": 0}
+
+def _make_hook(stats: dict):
+    async def trace(event: str, info: dict):
+        # Koneksi TCP baru -> request ini tidak memakai ulang koneksi dari pool
+        if event == "connection.connect_tcp.complete":
+            stats["connections"] += 1
+
+    async def on_request(request: httpx.Request):
+        stats["requests"] += 1
+        request.extensions["trace"] = trace
+
+    return on_request
+
+def get_client(service: str = "default") -> httpx.AsyncClient:
+    """
+    Ambil client untuk layanan tertentu (dibuat saat pertama dipanggil).
+    """
+    client = _clients.get(service)
+    if client is not None and not client.is_closed:
+        return client
+
+    cfg = SERVICES.get(service, SERVICES["default"])
+    stats = _stats.setdefault(service, _new_stats())
+    max_conn = cfg["max_connections"]
+
+    client = httpx.AsyncClient(
+        timeout=httpx.Timeout(cfg["timeout"], connect=min(10, cfg["timeout"])),
+        limits=httpx.Limits(
+            max_connections=max_conn,
+            max_keepalive_connections=max_conn,
+            keepalive_expiry=HTTP_KEEPALIVE_SECONDS
+        ),
+        headers=cfg.get("headers"),
+        http2=HTTP2_ENABLED,
+        follow_redirects=True,
+        event_hooks={"request": [_make_hook(stats)]}
+    )
+    _clients[service] = client
+    return client
+
+def get_stats() -> dict:
+    """
+    Jumlah request vs koneksi baru per layanan. reuse_ratio = porsi request
+    yang memakai koneksi yang sudah terbuka (keep-alive / HTTP/2 multiplex).
+    """
+    result = {}
+    for service, s in _stats.items():
+        requests = s["requests"]
+        reused = max(0, requests - s["connections"])
+        result[service] = {
+            **s,
+            "reuse_ratio": round(reused / requests, 3) if requests else None,
+            "open": service in _clients and not _clients[service].is_closed,
+        }
+    return {"http2": HTTP2_ENABLED, "services": result}
+
+async def close_all():
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
@@ -0,0 +1,150 @@
+"""
+Registry index MongoDB untuk semua query shape di FastApi.py & bot_modules.
+
+Dijalankan saat deploy (lihat Procfile) dan juga saat bot_modules.database di-import
+(create_index idempotent, jadi aman diulang):
+    python -m bot_modules.indexes apply
+Verifikasi (exit code 1 jika ada query shape yang COLLSCAN):
+    python -m bot_modules.indexes verify
+"""
+import sys
+from datetime import datetime, timezone, timedelta
+from pymongo import ASCENDING, DESCENDING
+
+from .timeseries import ensure_weather_timeseries, ROLLUP_HOURLY, ROLLUP_DAILY
+
+# (koleksi, keys, options)
+INDEXES = [
+    ("locations", [("chat_id", ASCENDING), ("name_norm", ASCENDING)], {"unique": True}),
+    ("weather_logs", [("chat_id", ASCENDING), ("location_id", ASCENDING), ("timestamp", ASCENDING)], {}),
+    ("weather_logs", [("location_id", ASCENDING), ("source", ASCENDING), ("timestamp", ASCENDING)], {}),
+    ("weather_logs", [("location_id", ASCENDING), ("timestamp", DESCENDING)], {}),
+    # Export tanpa location_id: urut waktu saja
+    ("weather_logs", [("timestamp", ASCENDING)], {}),
+    ("alerts", [("DateTime", ASCENDING)], {}),
+    ("alerts", [("is_aceh", ASCENDING), ("DateTime", DESCENDING)], {}),
+    ("weather_alerts", [("saved_at", ASCENDING)], {}),
+    ("weather_alerts", [("chat_id", ASCENDING)], {}),
+    ("storm_monitor", [("location_id", ASCENDING), ("last_check", ASCENDING)], {}),
+    ("storm_monitor", [("last_check", ASCENDING)], {}),
+    (ROLLUP_HOURLY, [("location_id", ASCENDING), ("bucket", ASCENDING)], {}),
+    (ROLLUP_DAILY, [("location_id", ASCENDING), ("bucket", ASCENDING)], {}),
+    # Cache geocoding (geocache.py), dokumen dihapus saat expires_at lewat
+    ("geocode_cache", [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    # Heartbeat worker (leader.py); dokumen worker yang sudah lama mati dibuang otomatis
+    ("workers", [("heartbeat_at", ASCENDING)], {"expireAfterSeconds": 86400}),
+]
+
+# Koleksi yang memang dibaca utuh (COLLSCAN disengaja, ukurannya = jumlah lokasi)
+FULL_READ_OK = {"latest_forecast"}
+
+def query_shapes():
+    """
+    Query shape yang dipakai aplikasi: (nama, koleksi, filter, sort).
+    Nilai filter hanya contoh, yang dicek adalah bentuk query-nya.
+    """
+    since = datetime.now(timezone.utc) - timedelta(hours=24)
+    return [
+        # FastApi.py
+        ("precip 24h (cuaca/precip)", "weather_logs",
+         {"location_id": "X", "source": "BMKG", "timestamp": {"$gte": since}}, None),
+        ("cuaca terakhir (cuaca/precip)", "weather_logs",
+         {"location_id": "X"}, [("timestamp", DESCENDING)]),
+        ("export weather_logs", "weather_logs",
+         {"location_id": {"$in": ["X"]}, "source": "BMKG", "timestamp": {"$gte": since}}, [("timestamp", ASCENDING)]),
+        ("export storm_monitor", "storm_monitor",
+         {"location_id": {"$in": ["X"]}, "last_check": {"$gte": since}}, [("last_check", ASCENDING)]),
+        ("export weather_logs (semua lokasi)", "weather_logs",
+         {"timestamp": {"$gte": since}}, [("timestamp", ASCENDING)]),
+        ("export storm_monitor (semua lokasi)", "storm_monitor",
+         {"last_check": {"$gte": since}}, [("last_check", ASCENDING)]),
+        ("point forecast (semua lokasi)", "latest_forecast", {}, None),
+        ("gempa terkini", "alerts", {}, [("DateTime", DESCENDING)]),
+        ("history gempa aceh", "alerts", {"is_aceh": True}, [("DateTime", DESCENDING)]),
+        ("rollup per jam", ROLLUP_HOURLY,
+         {"location_id": {"$in": ["X"]}, "bucket": {"$gte": since}}, [("bucket", ASCENDING)]),
+        ("rollup per hari", ROLLUP_DAILY,
+         {"location_id": {"$in": ["X"]}, "bucket": {"$gte": since}}, [("bucket", ASCENDING)]),
+        # bot_modules
+        ("lokasi per chat", "locations", {"chat_id": 1}, None),
+        ("lokasi per nama", "locations", {"chat_id": 1, "name_norm": "x"}, None),
+        ("alert cuaca per chat", "weather_alerts", {"chat_id": 1}, None),
+        ("worker hidup (leader)", "workers", {"heartbeat_at": {"$gte": since}}, None),
+        ("hujan 24h (utils)", "weather_logs",
+         {"location_id": "X", "timestamp": {"$gte": since}}, None),
+    ]
+
+def apply_indexes(db, verbose: bool = True):
+    ensure_weather_timeseries(db)
+    for coll, keys, options in INDEXES:
+        name = db[coll].create_index(keys, **options)
+        if verbose:
+            print(f"✅ {coll}: {name}")
+
+def _winning_plans(explain, found):
+    """
+    Semua winningPlan di output explain (bisa lebih dari satu: shard, atau
+    $cursor di pipeline time-series). rejectedPlans tidak ikut.
+    """
+    if isinstance(explain, dict):
+        if "winningPlan" in explain:
+            found.append(explain["winningPlan"])
+        for k, v in explain.items():
+            if k not in ("winningPlan", "rejectedPlans"):
+                _winning_plans(v, found)
+    elif isinstance(explain, list):
+        for v in explain:
+            _winning_plans(v, found)
+    return found
+
+def _find_stages(plan, found):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            found.add(plan["stage"])
+        for k, v in plan.items():
+            if k != "rejectedPlans":
+                _find_stages(v, found)
+    elif isinstance(plan, list):
+        for v in plan:
+            _find_stages(v, found)
+    return found
+
+def verify_indexes(db) -> bool:
+    """
+    explain() setiap query shape, cek winning plan-nya saja.
+    Return False jika ada yang COLLSCAN (kecuali koleksi di FULL_READ_OK).
+    """
+    ok = True
+    for name, coll, query, sort in query_shapes():
+        cursor = db[coll].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = cursor.explain()
+        stages = set()
+        # Tanpa winningPlan (format explain lain): periksa seluruh output
+        for plan in _winning_plans(explain, []) or [explain]:
+            _find_stages(plan, stages)
+
+        if "COLLSCAN" in stages and coll in FULL_READ_OK:
+            print(f"➖ COLLSCAN  {coll:<24} {name} (dibaca utuh, disengaja)")
+        elif "COLLSCAN" in stages:
+            ok = False
+            print(f"❌ COLLSCAN  {coll:<24} {name}")
+        else:
+            print(f"✅ {'/'.join(sorted(stages)):<9} {coll:<24} {name}")
+    return ok
+
+if __name__ == "__main__":
+    from .database import db
+
+    if db is None:
+        raise SystemExit("❌ MONGO_URI tidak ditemukan di .env")
+
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "apply"
+    if cmd == "apply":
+        apply_indexes(db)
+    elif cmd == "verify":
+        if not verify_indexes(db):
+            raise SystemExit(1)
+    else:
+        raise SystemExit("Usage: python -m bot_modules.indexes [apply|verify]")
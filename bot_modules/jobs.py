@@ -1,19 +1,27 @@
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
+import asyncio
 import os
-import httpx
-from telegram.constants import ParseMode
+import time
+from pymongo import UpdateOne
 from telegram.ext import ContextTypes, Application
 
-from .config import BMKG_NOWCAST_RSS, DEFAULT_WEATHER_MODE
+from .config import BMKG_NOWCAST_RSS, DEFAULT_WEATHER_MODE, WINDY_STORAGE_ENCODING
 from .database import (
-    col_alerts, col_weather_alerts, col_weather_logs, 
-    col_locations, get_setting
+    db, col_alerts, col_weather_alerts, col_weather_logs, 
+    col_locations, get_setting, add_subscriber, get_subscribers
 )
+from . import broadcast, leader
 from .services import (
-    get_bmkg_eq, fetch_bytes, windy_point_forecast, get_bmkg_forecast_xml,
-    fetch_bmkg_point_forecast_json
+    get_bmkg_eq, fetch_conditional, get_bmkg_forecast_xml
 )
+from .forecast_cache import bmkg_forecasts
+from .windy_cache import windy_forecasts
+from .log_sink import log_sink
+from .scheduler import run_repeating
+from .timeseries import apply_rollups
+from .windy_codec import encode_windy
+from .keyword_matcher import KeywordMatcher
 from .utils import (
     get_alert_level, normalize_name, parse_windy_latest, calculate_24h_precipitation,
     haversine_distance, get_bmkg_weather_text, get_weather_score, get_adm4_from_csv
@@ -22,8 +30,25 @@ from .utils import (
 # Global State
 LAST_EQ_TIME = None
 # LAST_WEATHER_LINK removed
+# Validator HTTP terakhir untuk RSS nowcast (If-None-Match / If-Modified-Since).
+# "keywords" = keyword yang dipakai saat validator disimpan, "backlog" = masih ada
+# item cocok yang belum terkirim; keduanya memaksa GET penuh di siklus berikutnya.
+RSS_STATE = {"etag": None, "last_modified": None, "keywords": None, "backlog": False}
+# Jumlah request BMKG point forecast yang berjalan bersamaan per siklus
+BMKG_FETCH_CONCURRENCY = int(os.getenv("BMKG_FETCH_CONCURRENCY", "8"))
+SYSTEM_RSS_KEYWORDS = ["Aceh", "Banda Aceh", "Lhokseumawe", "Meulaboh", "Sabang"]
+
+def notify(chat_ids, text: str, level: str = "INFO"):
+    """
+    Masukkan pesan ke antrian broadcast (rate limit & prioritas di broadcast.py).
+    """
+    broadcast.broadcaster.send_many(chat_ids, text, level)
 
 async def check_gempa(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Poller gempa tunggal (system job): deteksi sekali, simpan sekali,
+    lalu kirim ke semua chat yang berlangganan.
+    """
     global LAST_EQ_TIME
     try:
         gempa = await get_bmkg_eq()
@@ -35,84 +60,157 @@ async def check_gempa(context: ContextTypes.DEFAULT_TYPE):
             gempa["alert_level"] = alert["level"]
             gempa["saved_at"] = datetime.now(timezone.utc)
 
-            col_alerts.update_one({"_id": gempa["_id"]}, {"$set": gempa}, upsert=True)
+            res = col_alerts.update_one({"_id": gempa["_id"]}, {"$set": gempa}, upsert=True)
+            if res.upserted_id is None:
+                # Gempa ini sudah tercatat (mis. bot baru restart), jangan kirim ulang
+                return
 
             if alert["level"] in ["DANGER", "WARNING"]:
-                chat_id = context.job.data.get("chat_id") if context.job and context.job.data else None
-                if chat_id:
-                    msg = (
-                        f"{alert['emoji']} *{alert['label']}*\n"
-                        f"━━━━━━━━━━━━━━━━━━\n"
-                        f"📍 *Wilayah:* {gempa.get('Wilayah')}\n"
-                        f"📏 *Magnitudo:* {gempa.get('Magnitude')} SR\n"
-                        f"📉 *Kedalaman:* {gempa.get('Kedalaman')}\n"
-                        f"🌊 *Potensi:* {gempa.get('Potensi')}\n"
-                        f"⏱ *Waktu:* {gempa.get('DateTime')}\n"
-                        f"━━━━━━━━━━━━━━━━━━\n"
-                        f"⚠️ _Cek informasi resmi BMKG_"
-                    )
-                    await context.bot.send_message(chat_id=chat_id, text=msg, parse_mode=ParseMode.MARKDOWN)
+                msg = (
+                    f"{alert['emoji']} *{alert['label']}*\n"
+                    f"━━━━━━━━━━━━━━━━━━\n"
+                    f"📍 *Wilayah:* {gempa.get('Wilayah')}\n"
+                    f"📏 *Magnitudo:* {gempa.get('Magnitude')} SR\n"
+                    f"📉 *Kedalaman:* {gempa.get('Kedalaman')}\n"
+                    f"🌊 *Potensi:* {gempa.get('Potensi')}\n"
+                    f"⏱ *Waktu:* {gempa.get('DateTime')}\n"
+                    f"━━━━━━━━━━━━━━━━━━\n"
+                    f"⚠️ _Cek informasi resmi BMKG_"
+                )
+                notify(get_subscribers(), msg, alert["level"])
 
     except Exception as e:
         print(f"⚠️ EQ Error: {e}")
+        raise # dicatat scheduler sebagai error (/status)
+
+def rss_keywords_by_chat() -> dict:
+    """
+    Keyword RSS per chat: nama lokasi yang dipantau (default "Aceh"),
+    ditambah keyword bawaan untuk SYSTEM.
+    """
+    keywords_by_chat = {chat_id: [] for chat_id in get_subscribers()}
+    for d in col_locations.find({"chat_id": {"$in": list(keywords_by_chat)}}, {"chat_id": 1, "name": 1}):
+        if d.get("name"):
+            keywords_by_chat[d["chat_id"]].append(d["name"])
+
+    for chat_id, keywords in keywords_by_chat.items():
+        if not keywords:
+            keywords.append("Aceh")
+
+    keywords_by_chat["SYSTEM"] = list(SYSTEM_RSS_KEYWORDS)
+    return keywords_by_chat
 
 async def check_weather_rss(context: ContextTypes.DEFAULT_TYPE):
+    """
+    RSS nowcast BMKG (system job): feed diambil sekali per siklus (conditional GET),
+    diparse sekali, lalu dicocokkan dengan keyword semua chat dalam satu scan.
+    """
     try:
-        chat_id = context.job.data.get("chat_id") if context.job and context.job.data else None
-        if not chat_id:
-            return
+        keywords_by_chat = rss_keywords_by_chat()
+        keywords_sig = {chat_id: sorted(set(k)) for chat_id, k in keywords_by_chat.items()}
+
+        # Validator hanya dipakai jika feed terakhir sudah tuntas diproses untuk
+        # keyword yang sama; subscriber/lokasi baru harus dicocokkan dengan feed saat ini
+        use_validators = RSS_STATE["keywords"] == keywords_sig and not RSS_STATE["backlog"]
+        status, xml_bytes, headers = await fetch_conditional(
+            BMKG_NOWCAST_RSS,
+            etag=RSS_STATE["etag"] if use_validators else None,
+            last_modified=RSS_STATE["last_modified"] if use_validators else None
+        )
+        if status == 304:
+            return # Feed tidak berubah
+
+        def commit_validators(backlog: bool = False):
+            # Dipanggil setelah alert tersimpan & masuk antrian broadcast
+            RSS_STATE["etag"] = headers.get("etag")
+            RSS_STATE["last_modified"] = headers.get("last-modified")
+            RSS_STATE["keywords"] = keywords_sig
+            RSS_STATE["backlog"] = backlog
 
-        xml_bytes = await fetch_bytes(BMKG_NOWCAST_RSS)
         root = ET.fromstring(xml_bytes)
 
-        loc_docs = list(col_locations.find({"chat_id": chat_id}))
-        keywords = [d.get("name", "") for d in loc_docs if d.get("name")] or ["Aceh"]
-        keywords_norm = [normalize_name(k) for k in keywords]
+        owners = {} # keyword (normalized) -> set(chat_id)
+        for chat_id, keywords in keywords_by_chat.items():
+            for k in keywords:
+                k_norm = normalize_name(k)
+                if k_norm:
+                    owners.setdefault(k_norm, set()).add(chat_id)
+        matcher = KeywordMatcher(owners)
 
+        matches = []
         for item in root.findall(".//item"):
             title = (item.findtext("title") or "").strip()
             link = (item.findtext("link") or "").strip()
             desc = (item.findtext("description") or "").strip()
             pub_date = (item.findtext("pubDate") or "").strip()
+            if not link:
+                continue
 
             hay = normalize_name(f"{title} {desc}")
-            match = any(k and k in hay for k in keywords_norm)
+            chats = set()
+            for k in matcher.find(hay):
+                chats |= owners[k]
+            if chats:
+                matches.append(({"title": title, "link": link, "desc": desc, "date": pub_date}, chats))
+
+        if not matches:
+            commit_validators()
+            return
 
-            if match and link:
-                # Unique ID for this user + alert link
-                alert_id = f"{chat_id}:{link}"
-                
-                # Check if already sent
-                if col_weather_alerts.find_one({"_id": alert_id}):
+        # Check if already sent (satu query untuk semua kandidat)
+        candidate_ids = [f"{chat_id}:{item['link']}" for item, chats in matches for chat_id in chats]
+        sent_ids = {d["_id"] for d in col_weather_alerts.find({"_id": {"$in": candidate_ids}}, {"_id": 1})}
+
+        # Sama seperti sebelumnya: maksimal satu alert baru per chat per siklus
+        # Sisanya dikirim di siklus berikutnya (backlog -> GET tanpa validator)
+        new_alerts = {}
+        backlog = False
+        for item, chats in matches:
+            for chat_id in chats:
+                alert_id = f"{chat_id}:{item['link']}"
+                if alert_id in sent_ids:
                     continue
-
-                data = {
+                if chat_id in new_alerts:
+                    backlog = True
+                    continue
+                new_alerts[chat_id] = {
                     "_id": alert_id,
                     "chat_id": chat_id,
                     "type": "bmkg_nowcast",
-                    "title": title,
-                    "desc": desc,
-                    "link": link,
-                    "date": pub_date,
-                    "matched_keywords": keywords,
+                    **item,
+                    "matched_keywords": keywords_by_chat[chat_id],
                     "saved_at": datetime.now(timezone.utc)
                 }
-                col_weather_alerts.update_one({"_id": data["_id"]}, {"$set": data}, upsert=True)
 
-                msg = (
-                    f"⛈ *PERINGATAN CUACA BMKG*\n"
-                    f"━━━━━━━━━━━━━━━━━━\n"
-                    f"*{title}*\n\n"
-                    f"{desc[:300]}...\n\n"
-                    f"🔗 [Baca Selengkapnya]({link})\n"
-                    f"━━━━━━━━━━━━━━━━━━\n"
-                    f"📅 {pub_date}"
-                )
-                await context.bot.send_message(chat_id=chat_id, text=msg, parse_mode=ParseMode.MARKDOWN)
-                break
+        if not new_alerts:
+            commit_validators()
+            return
+
+        col_weather_alerts.bulk_write(
+            [UpdateOne({"_id": d["_id"]}, {"$set": d}, upsert=True) for d in new_alerts.values()],
+            ordered=False
+        )
+
+        for chat_id, data in new_alerts.items():
+            if chat_id == "SYSTEM":
+                print(f"✅ System Weather Alert: {data['title']}")
+                continue
+            msg = (
+                f"⛈ *PERINGATAN CUACA BMKG*\n"
+                f"━━━━━━━━━━━━━━━━━━\n"
+                f"*{data['title']}*\n\n"
+                f"{data['desc'][:300]}...\n\n"
+                f"🔗 [Baca Selengkapnya]({data['link']})\n"
+                f"━━━━━━━━━━━━━━━━━━\n"
+                f"📅 {data['date']}"
+            )
+            notify([chat_id], msg, "WARNING")
+
+        commit_validators(backlog)
 
     except Exception as e:
         print(f"⚠️ Weather RSS Error: {e}")
+        raise # dicatat scheduler sebagai error (/status)
 
 async def storm_monitor(context: ContextTypes.DEFAULT_TYPE):
     """
@@ -125,14 +223,10 @@ async def storm_monitor(context: ContextTypes.DEFAULT_TYPE):
         locs = list(col_locations.find({"chat_id": chat_id}))
         if not locs: return
 
-        # API Key & URL
-        api_key = os.getenv("API_KEY", "RAHASIA_KUNCI_API_ANDA")
-        api_url = os.getenv("API_BASE_URL", "http://127.0.0.1:8000") # Default local
-
         for loc in locs:
             try:
                 # 1. Fetch Windy Data
-                windy = await windy_point_forecast(loc["lat"], loc["lon"])
+                windy = await windy_forecasts.get(loc["lat"], loc["lon"])
                 latest = parse_windy_latest(windy)
                 
                 if not latest: continue
@@ -152,7 +246,7 @@ async def storm_monitor(context: ContextTypes.DEFAULT_TYPE):
                     is_alert = True
                     alert_msg = f"🌀 *TEKANAN RENDAH EKSTRIM*\nTekanan: {pressure:.1f} hPa"
 
-                # 3. Log to Storm Monitor via API
+                # 3. Log to Storm Monitor (dikirim batch setelah loop)
                 payload = {
                     "location_id": str(loc["_id"]),
                     "last_check": datetime.now(timezone.utc).isoformat(),
@@ -166,10 +260,7 @@ async def storm_monitor(context: ContextTypes.DEFAULT_TYPE):
                     "alert_message": alert_msg
                 }
 
-                # Post to API (Fire and forget, or log error)
-                headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
-                async with httpx.AsyncClient(timeout=10) as client:
-                    await client.post(f"{api_url}/api/v1/storm/log", json=payload, headers=headers)
+                await log_sink.add("storm", payload)
 
                 # 4. Telegram Alert
                 if is_alert:
@@ -181,216 +272,158 @@ async def storm_monitor(context: ContextTypes.DEFAULT_TYPE):
                         f"{alert_msg}\n\n"
                         f"Tetap waspada dan pantau peta badai."
                     )
-                    await context.bot.send_message(chat_id=chat_id, text=msg, parse_mode=ParseMode.MARKDOWN)
+                    notify([chat_id], msg, "WARNING")
 
             except Exception as e:
                 print(f"⚠️ Storm Monitor Error {loc['name']}: {e}")
 
+        # Tulis sisa buffer (API batch atau langsung ke Mongo, lihat LOG_SINK_MODE)
+        await log_sink.flush()
+
     except Exception as e:
         print(f"⚠️ Storm Loop Error: {e}")
 
-async def weather_logger(context: ContextTypes.DEFAULT_TYPE):
+def resolve_adm4(loc: dict):
     """
-    Log data cuaca BMKG via API.
+    Kode ADM4 lokasi; jika belum ada dicari dari CSV lalu disimpan ke DB.
     """
-    try:
-        chat_id = context.job.data.get("chat_id")
-        if not chat_id: return
-
-        locs = list(col_locations.find({"chat_id": chat_id}))
-        if not locs: return
-
-        api_key = os.getenv("API_KEY", "RAHASIA_KUNCI_API_ANDA")
-        api_url = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
-
-        now_utc = datetime.now(timezone.utc)
+    adm4_code = loc.get("adm4")
+    if adm4_code:
+        return adm4_code
+
+    found_code = get_adm4_from_csv(loc["name"])
+    if found_code:
+        print(f"✅ Auto-resolved ADM4 for {loc['name']}: {found_code}")
+        col_locations.update_one({"_id": loc["_id"]}, {"$set": {"adm4": found_code}})
+        loc["adm4"] = found_code
+    return found_code
+
+def build_bmkg_payload(loc: dict, forecast, now_utc: datetime):
+    """
+    Ubah forecast BMKG (BmkgForecast) jadi payload /weather/log untuk satu lokasi.
+    """
+    if not forecast:
+        return None
+
+    # Current = item terdekat ke now; forecast 24 jam = item setelah now (3 jam sekali -> 8 item)
+    # Field kosong (None) dicatat 0 seperti parsing lama
+    current = {k: 0.0 if v is None else v for k, v in forecast.current(now_utc).items()}
+    final_forecast = []
+    for f in forecast.upcoming(now_utc, hours=24):
+        f = {k: 0.0 if v is None else v for k, v in f.items()}
+        time_diff = int((f["utc_datetime"] - now_utc).total_seconds() / 3600)
+        final_forecast.append({
+            "time": f"+{time_diff}h",
+            "temp": int(f["t"]),
+            "desc": f["weather_desc"],
+            "humidity": int(f["hu"]),
+            "wind_speed": float(f"{f['ws_ms']:.1f}"),
+            "precip": f["tp"]
+        })
+
+    return {
+        "location_id": str(loc["_id"]),
+        "timestamp": now_utc.isoformat(),
+        "source": "BMKG_API",
+        "data": {
+            "temp": int(current["t"]),
+            "humidity": int(current["hu"]),
+            "weather_desc": current["weather_desc"] or "Berawan",
+            "precip_mm": current["tp"],
+            "wind_speed": current["ws_ms"]
+        },
+        "forecast_3h": final_forecast
+    }
+
+async def fetch_bmkg_many(codes, concurrency: int = BMKG_FETCH_CONCURRENCY) -> dict:
+    """
+    Ambil forecast BMKG untuk banyak kode ADM4 secara paralel (dibatasi semaphore).
+    Return {adm4: BmkgForecast}; kode yang gagal tidak ada di hasil.
+    """
+    sem = asyncio.Semaphore(concurrency)
 
-        for loc in locs:
+    async def fetch_one(code):
+        async with sem:
             try:
-                # 2. Resolve ADM4 Code (Dynamic from CSV / DB)
-                adm4_code = loc.get("adm4")
-                if not adm4_code:
-                    # Try lookup from CSV
-                    found_code = get_adm4_from_csv(loc["name"])
-                    if found_code:
-                        print(f"✅ Auto-resolved ADM4 for {loc['name']}: {found_code}")
-                        # Persist to DB
-                        col_locations.update_one({"_id": loc["_id"]}, {"$set": {"adm4": found_code}})
-                        adm4_code = found_code
-                    else:
-                        print(f"⚠️ ADM4 Code not found for {loc['name']}, skipping BMKG log.")
-                        continue # Skip if no code found
-
-                # 3. Fetch Data JSON
-                data_json = await fetch_bmkg_point_forecast_json(adm4_code)
-                if not data_json or "data" not in data_json: 
-                    continue
-                
-                # Structure: data[0] -> cuaca[][]
-                # Usually data[0] is the location
-                # cuaca is list of list? Or list of objects?
-                # Sample: "cuaca": [[{"datetime":...}, ...]]
-                # Flatten the list of lists
-                
-                forecast_flat = []
-                # Check data structure deeply
-                raw_data = data_json.get("data", [])
-                if not raw_data: continue
-                
-                cuaca_lists = raw_data[0].get("cuaca", [])
-                for sublist in cuaca_lists:
-                    for item in sublist:
-                        forecast_flat.append(item)
-                
-                # Sort by datetime just in case
-                # Format: "2025-10-12 08:00:00" (utc_datetime)
-                def parse_dt(d_str):
-                    try:
-                        return datetime.strptime(d_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-                    except:
-                        return datetime.min.replace(tzinfo=timezone.utc)
-
-                forecast_flat.sort(key=lambda x: parse_dt(x.get("utc_datetime", "")))
-                
-                # 4. Find Current & Forecast
-                # Current = item closest to now_utc
-                # Simple logic: first item in future OR very last item if all past?
-                # Better: item with smallest abs(delta) to now
-                
-                best_current = None
-                min_diff = 999999999
-                
-                # Forecast 24h = items > now
-                forecast_24h_items = []
-                
-                for item in forecast_flat:
-                    dt_obj = parse_dt(item.get("utc_datetime"))
-                    diff = abs((dt_obj - now_utc).total_seconds())
-                    
-                    if diff < min_diff:
-                        min_diff = diff
-                        best_current = item
-                        
-                    if dt_obj > now_utc and len(forecast_24h_items) < 8: # Next 24h (3h intervals -> 8 items)
-                        forecast_24h_items.append(item)
-                
-                if not best_current: continue
-
-                # 5. Extract Current Values
-                # Keys: t (temp), hu (humid), ws (wind km/h?), weather_desc, weather (code)
-                cur_temp = float(best_current.get("t", 0))
-                cur_hu = float(best_current.get("hu", 0))
-                cur_desc = best_current.get("weather_desc", "Berawan")
-                cur_ws_kmh = float(best_current.get("ws", 0))
-                cur_ws_ms = cur_ws_kmh / 3.6 # Km/h to m/s
-                
-                # Precip Logic (Estimate from Code/Desc)
-                # BMKG JSON sometimes has 'tp' (Rain Potential?) or just weather code
-                # Sample had "tp": 0.1 (mm?)
-                precip_mm = float(best_current.get("tp", 0.0)) # Try reading tp direct
-                
-                # 6. Build Forecast Array
-                final_forecast = []
-                for f in forecast_24h_items:
-                    f_dt = parse_dt(f.get("utc_datetime"))
-                    time_diff = int((f_dt - now_utc).total_seconds() / 3600)
-                    
-                    ws_ms_item = float(f.get("ws", 0)) / 3.6
-                    
-                    final_forecast.append({
-                        "time": f"+{time_diff}h",
-                        "temp": int(f.get("t", 0)),
-                        "desc": f.get("weather_desc", ""),
-                        "humidity": int(f.get("hu", 0)),
-                        "wind_speed": float(f"{ws_ms_item:.1f}"),
-                        "precip": float(f.get("tp", 0.0))
-                    })
-
-                # 7. Construct Payload
-                payload = {
-                    "location_id": str(loc["_id"]),
-                    "timestamp": now_utc.isoformat(),
-                    "source": "BMKG_API",
-                    "data": {
-                        "temp": int(cur_temp),
-                        "humidity": int(cur_hu),
-                        "weather_desc": cur_desc,
-                        "precip_mm": precip_mm,
-                        "wind_speed": cur_ws_ms
-                    },
-                    "forecast_3h": final_forecast
-                }
-                
-                # --- AUTO ALERT: Curah Hujan > 50mm ---
-                if precip_mm > 50:
-                     msg_alert = (
-                        f"🌧 *PERINGATAN CUACA EKSTRIM*\n"
-                        f"━━━━━━━━━━━━━━━━━━\n"
-                        f"📍 *{loc['name']}*\n"
-                        f"⚠️ Terdeteksi curah hujan tinggi: *{precip_mm} mm*\n"
-                        f"Waspada potensi banjir!"
-                     )
-                     await context.bot.send_message(chat_id=chat_id, text=msg_alert, parse_mode=ParseMode.MARKDOWN)
-                # --------------------------------------
+                # Lewat cache: tombol cuaca di chat ikut memakai hasil siklus ini
+                return code, await bmkg_forecasts.get(code, allow_stale=False)
+            except Exception:
+                # Error sudah dicatat di forecast_cache
+                return code, None
 
-                # 8. Send to API
-                headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
-                async with httpx.AsyncClient(timeout=10) as client:
-                    await client.post(f"{api_url}/api/v1/weather/log", json=payload, headers=headers)
-
-            except Exception as e:
-                print(f"⚠️ Weather Log Error {loc['name']}: {e}")
-
-    except Exception as e:
-        print(f"⚠️ Weather Logger Error: {e}")
+    results = await asyncio.gather(*(fetch_one(c) for c in codes))
+    return {code: data for code, data in results if data}
 
-async def check_weather_rss_system(context: ContextTypes.DEFAULT_TYPE):
+async def weather_logger(context: ContextTypes.DEFAULT_TYPE):
     """
-    System-level RSS check for default keywords (Aceh).
-    Ensures dashboard has data even without active users.
+    Log data cuaca BMKG via API (system job).
+    Setiap kode ADM4 diambil sekali per siklus walaupun dipantau banyak chat,
+    lalu hasilnya dibagikan ke semua lokasi dengan kode tersebut.
     """
     try:
-        xml_bytes = await fetch_bytes(BMKG_NOWCAST_RSS)
-        root = ET.fromstring(xml_bytes)
-
-        # Default keywords for system
-        keywords = ["Aceh", "Banda Aceh", "Lhokseumawe", "Meulaboh", "Sabang"]
-        keywords_norm = [normalize_name(k) for k in keywords]
-
-        for item in root.findall(".//item"):
-            title = (item.findtext("title") or "").strip()
-            link = (item.findtext("link") or "").strip()
-            desc = (item.findtext("description") or "").strip()
-            pub_date = (item.findtext("pubDate") or "").strip()
-
-            hay = normalize_name(f"{title} {desc}")
-            match = any(k and k in hay for k in keywords_norm)
+        t0 = time.monotonic()
+        locs_by_code = {}
+        for loc in col_locations.find({}):
+            try:
+                adm4_code = resolve_adm4(loc)
+            except Exception as e:
+                print(f"⚠️ ADM4 Resolve Error {loc.get('name')}: {e}")
+                continue
+            if not adm4_code:
+                print(f"⚠️ ADM4 Code not found for {loc['name']}, skipping BMKG log.")
+                continue
+            # Mode cluster: tiap kode (beserta semua chat-nya) dikerjakan satu worker
+            if not leader.owns(adm4_code):
+                continue
+            locs_by_code.setdefault(adm4_code, []).append(loc)
+
+        if not locs_by_code:
+            return
 
-            if match and link:
-                # Unique ID for system + link
-                alert_id = f"SYSTEM:{link}"
-                
-                # Check if already processed
-                if col_weather_alerts.find_one({"_id": alert_id}):
-                    continue
+        forecasts = await fetch_bmkg_many(locs_by_code.keys())
 
-                data = {
-                    "_id": alert_id,
-                    "chat_id": "SYSTEM",
-                    "type": "bmkg_nowcast",
-                    "title": title,
-                    "desc": desc,
-                    "link": link,
-                    "date": pub_date,
-                    "matched_keywords": keywords,
-                    "saved_at": datetime.now(timezone.utc)
-                }
-                col_weather_alerts.update_one({"_id": data["_id"]}, {"$set": data}, upsert=True)
-                print(f"✅ System Weather Alert: {title}")
-                break
+        logged = 0
+        failed = 0
+        now_utc = datetime.now(timezone.utc)
+        for adm4_code, forecast in forecasts.items():
+            for loc in locs_by_code[adm4_code]:
+                try:
+                    payload = build_bmkg_payload(loc, forecast, now_utc)
+                    if not payload:
+                        continue
+                    await log_sink.add("weather", payload)
+                    logged += 1
+
+                    # --- AUTO ALERT: Curah Hujan > 50mm ---
+                    precip_mm = payload["data"]["precip_mm"]
+                    if precip_mm > 50 and loc["chat_id"] != "SYSTEM":
+                        msg_alert = (
+                            f"🌧 *PERINGATAN CUACA EKSTRIM*\n"
+                            f"━━━━━━━━━━━━━━━━━━\n"
+                            f"📍 *{loc['name']}*\n"
+                            f"⚠️ Terdeteksi curah hujan tinggi: *{precip_mm} mm*\n"
+                            f"Waspada potensi banjir!"
+                        )
+                        notify([loc["chat_id"]], msg_alert, "WARNING")
+                except Exception as e:
+                    failed += 1
+                    print(f"⚠️ Weather Log Error {loc['name']}: {e}")
+
+        # Tulis sisa buffer (API batch atau langsung ke Mongo, lihat LOG_SINK_MODE)
+        await log_sink.flush()
+
+        print(f"✅ BMKG Logged: {len(forecasts)}/{len(locs_by_code)} kode ADM4, "
+              f"{logged} lokasi, {time.monotonic() - t0:.1f}s")
+
+        # Kegagalan sebagian tetap dilaporkan supaya /status tidak menampilkan ✅
+        failed_codes = len(locs_by_code) - len(forecasts)
+        if failed_codes or failed:
+            raise RuntimeError(f"{failed_codes}/{len(locs_by_code)} kode ADM4 gagal diambil, "
+                               f"{failed} lokasi gagal dicatat")
 
     except Exception as e:
-        print(f"⚠️ System RSS Error: {e}")
+        print(f"⚠️ Weather Logger Error: {e}")
+        raise # dicatat scheduler sebagai error (/status)
 
 async def weather_logger_system(context: ContextTypes.DEFAULT_TYPE):
     """
@@ -403,9 +436,11 @@ async def weather_logger_system(context: ContextTypes.DEFAULT_TYPE):
             return
 
         now_utc = datetime.now(timezone.utc)
+        failed = 0
         for loc in system_locs:
             try:
-                windy = await windy_point_forecast(loc["lat"], loc["lon"])
+                # Lokasi dalam satu sel grid berbagi satu request Windy
+                windy = await windy_forecasts.get(loc["lat"], loc["lon"])
                 latest = parse_windy_latest(windy) or {}
 
                 log_data = {
@@ -414,30 +449,37 @@ async def weather_logger_system(context: ContextTypes.DEFAULT_TYPE):
                     "location_name": loc["name"],
                     "timestamp": now_utc,
                     "source": "windy",
-                    "latest": latest,
-                    "forecast_raw": windy,
-                    "raw_keys": list(windy.keys())
+                    "latest": latest
                 }
+                if WINDY_STORAGE_ENCODING == "raw":
+                    log_data["forecast_raw"] = windy
+                    log_data["raw_keys"] = list(windy.keys())
+                else:
+                    # Baca kembali dengan windy_codec.decode_windy(doc["forecast_raw"])
+                    log_data["forecast_raw"] = encode_windy(windy, compress=WINDY_STORAGE_ENCODING == "f32z")
                 col_weather_logs.insert_one(log_data)
+                apply_rollups(db, [log_data])
                 print(f"✅ System Logged: {loc['name']}")
                 
             except Exception as e:
+                failed += 1
                 print(f"⚠️ Error logging system {loc.get('name')}: {e}")
 
+        m = windy_forecasts.metrics()
+        print(f"📊 Windy cache: {m['upstream_calls']} call untuk {m['requests']} request "
+              f"(hemat {m['saved_calls']}, geser rata-rata {m['displacement_km']['mean']} km)")
+
+        if failed:
+            raise RuntimeError(f"{failed}/{len(system_locs)} lokasi SYSTEM gagal dicatat")
+
     except Exception as e:
         print(f"⚠️ System Logger Error: {e}")
+        raise # dicatat scheduler sebagai error (/status)
 
 def ensure_jobs_for_chat(app: Application, chat_id: int):
-    jq = app.job_queue
-    name_prefix = f"mhews:{chat_id}:"
-
-    for j in jq.jobs():
-        if j.name and j.name.startswith(name_prefix):
-            return
-
-    jq.run_repeating(check_gempa, interval=60, first=5, name=name_prefix + "eq", data={"chat_id": chat_id})
-    jq.run_repeating(check_weather_rss, interval=300, first=10, name=name_prefix + "rss", data={"chat_id": chat_id})
-    jq.run_repeating(weather_logger, interval=3600, first=2, name=name_prefix + "wlog", data={"chat_id": chat_id})
+    # Notifikasi gempa, RSS & log cuaca BMKG dijalankan oleh job system
+    # untuk semua subscriber, jadi per chat cukup didaftarkan.
+    add_subscriber(chat_id)
 
 def ensure_system_jobs(app: Application):
     jq = app.job_queue
@@ -452,5 +494,18 @@ def ensure_system_jobs(app: Application):
         if j.name and j.name.startswith(name_prefix):
             return
 
-    jq.run_repeating(check_weather_rss_system, interval=300, first=5, name=name_prefix + "rss")
-    jq.run_repeating(weather_logger_system, interval=3600, first=2, name=name_prefix + "wlog")
+    # Statistik, overlap guard & jitter waktu mulai: lihat scheduler.py (/status)
+    # Poller tunggal hanya jalan di worker pemegang lease-nya (leader.py, BOT_CLUSTER=1)
+    def leased(name):
+        leader.manage(name)
+        return lambda: leader.holds(name)
+
+    # Gempa: run yang tertahan digabung & langsung dijalankan supaya tidak telat
+    run_repeating(jq, check_gempa, interval=60, first=5, name=name_prefix + "eq",
+                  overlap="coalesce", jitter=0.1, guard=leased(name_prefix + "eq"))
+    run_repeating(jq, check_weather_rss, interval=300, first=10, name=name_prefix + "rss",
+                  jitter=0.2, guard=leased(name_prefix + "rss"))
+    run_repeating(jq, weather_logger_system, interval=3600, first=2, name=name_prefix + "wlog",
+                  jitter=0.25, guard=leased(name_prefix + "wlog"))
+    # BMKG logger jalan di semua worker, kode ADM4 dibagi dengan leader.owns()
+    run_repeating(jq, weather_logger, interval=3600, first=3, name=name_prefix + "bmkg", jitter=0.25)
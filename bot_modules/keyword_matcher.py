@@ -0,0 +1,49 @@
+from collections import deque
+
+class KeywordMatcher:
+    """
+    Aho-Corasick: cari semua keyword (substring) di dalam teks dengan satu kali scan,
+    berapapun jumlah keyword-nya. Hasil sama dengan [k for k in keywords if k in text].
+    """
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [set()]
+
+        for kw in keywords:
+            if not kw:
+                continue
+            node = 0
+            for ch in kw:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(set())
+                node = nxt
+            self.out[node].add(kw)
+
+        # Bangun failure link (BFS dari root)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] |= self.out[self.fail[nxt]]
+
+    def find(self, text: str) -> set:
+        node = 0
+        found = set()
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            if self.out[node]:
+                found |= self.out[node]
+        return found
@@ -0,0 +1,175 @@
+"""
+Koordinasi beberapa worker bot lewat MongoDB (BOT_CLUSTER=1).
+
+- workers : heartbeat tiap worker, worker dianggap hidup selama heartbeat < LEASE_TTL_SECONDS
+- leases  : satu dokumen per tugas tunggal (poller sistem, polling Telegram).
+            Pemegang lease memperpanjang tiap HEARTBEAT_SECONDS; jika worker mati,
+            lease kadaluarsa dan diambil worker lain (failover).
+- Pembagian tugas memakai rendezvous hashing atas daftar worker hidup:
+  lease dipegang oleh "pemilik" namanya.
+- Kerja per kunci (mis. kode ADM4) dibagi ke LEADER_PARTITIONS partisi, tiap partisi
+  juga sebuah lease. Kunci hanya dikerjakan worker yang sedang memegang lease
+  partisinya, jadi walaupun daftar worker hidup sempat berbeda antar worker saat
+  ada yang masuk/keluar, satu kunci tidak pernah dikerjakan dua worker sekaligus
+  (paling lama satu heartbeat tidak dikerjakan siapa pun saat serah terima).
+
+Tanpa BOT_CLUSTER semua fungsi mengembalikan True (satu worker mengerjakan semuanya).
+"""
+import asyncio
+import hashlib
+import os
+import socket
+from datetime import datetime, timezone, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from .database import db
+
+CLUSTER_MODE = os.getenv("BOT_CLUSTER", "0") == "1"
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+LEASE_TTL_SECONDS = int(os.getenv("LEASE_TTL_SECONDS", "30"))
+HEARTBEAT_SECONDS = int(os.getenv("HEARTBEAT_SECONDS", "10"))
+LEADER_PARTITIONS = int(os.getenv("LEADER_PARTITIONS", "32"))
+
+# Hanya satu proses yang boleh getUpdates untuk satu token bot
+POLL_LEASE = "telegram-poll"
+PARTITION_PREFIX = "partition:"
+
+# nama lease yang diperebutkan worker ini (partisi kunci selalu ikut)
+managed = {f"{PARTITION_PREFIX}{n}" for n in range(LEADER_PARTITIONS)}
+held = {} # nama lease -> expires_at (UTC)
+live_workers = [WORKER_ID]
+
+def rendezvous_owner(key: str, workers: list) -> str:
+    """
+    Worker dengan skor hash (worker, key) tertinggi. Jika satu worker keluar/masuk,
+    hanya kunci milik worker itu yang berpindah.
+    """
+    return max(workers, key=lambda w: hashlib.blake2b(f"{w}|{key}".encode(), digest_size=8).digest())
+
+def partition_of(key) -> str:
+    """
+    Nama lease partisi untuk kunci (stabil antar proses, tidak bergantung worker hidup).
+    """
+    n = int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), "big")
+    return f"{PARTITION_PREFIX}{n % LEADER_PARTITIONS}"
+
+def owns(key) -> bool:
+    """
+    Apakah kerja untuk kunci ini (kode ADM4, chat, dll) milik worker ini,
+    yaitu worker ini memegang lease partisi kunci tersebut.
+    """
+    if not CLUSTER_MODE:
+        return True
+    return holds(partition_of(key))
+
+def holds(name: str) -> bool:
+    """
+    Apakah worker ini memegang lease yang masih berlaku.
+    """
+    if not CLUSTER_MODE:
+        return True
+    expires_at = held.get(name)
+    return expires_at is not None and datetime.now(timezone.utc) < expires_at
+
+def manage(*names):
+    managed.update(names)
+
+def heartbeat():
+    global live_workers
+    now = datetime.now(timezone.utc)
+    db.workers.update_one(
+        {"_id": WORKER_ID},
+        {"$set": {"heartbeat_at": now, "host": socket.gethostname(), "pid": os.getpid(),
+                  "leases": sorted(held)}},
+        upsert=True
+    )
+    since = now - timedelta(seconds=LEASE_TTL_SECONDS)
+    workers = [d["_id"] for d in db.workers.find({"heartbeat_at": {"$gte": since}}, {"_id": 1})]
+    live_workers = sorted(set(workers) | {WORKER_ID})
+
+def try_acquire(name: str) -> bool:
+    """
+    Ambil / perpanjang lease. Gagal jika dipegang worker lain yang belum kadaluarsa.
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=LEASE_TTL_SECONDS)
+    try:
+        db.leases.find_one_and_update(
+            {"_id": name, "$or": [{"holder": WORKER_ID}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"holder": WORKER_ID, "expires_at": expires_at, "renewed_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Dokumen ada dan dipegang worker lain -> upsert bentrok di _id
+        held.pop(name, None)
+        return False
+
+    if name not in held and not name.startswith(PARTITION_PREFIX):
+        print(f"👑 Lease {name} diambil oleh {WORKER_ID}")
+    held[name] = expires_at
+    return True
+
+def release(name: str):
+    if held.pop(name, None) is None:
+        return
+    db.leases.update_one(
+        {"_id": name, "holder": WORKER_ID},
+        {"$set": {"expires_at": datetime.now(timezone.utc)}}
+    )
+    if not name.startswith(PARTITION_PREFIX):
+        print(f"↪️ Lease {name} dilepas oleh {WORKER_ID}")
+
+def tick():
+    """
+    Satu putaran: heartbeat, lalu ambil lease milik worker ini dan lepas yang bukan.
+    """
+    heartbeat()
+    partitions = partitions_held()
+    for name in sorted(managed):
+        if rendezvous_owner(name, live_workers) == WORKER_ID:
+            try_acquire(name)
+        elif name in held:
+            # Ada worker baru yang lebih berhak -> serahkan supaya beban merata
+            release(name)
+    if partitions_held() != partitions:
+        print(f"🧩 {WORKER_ID} memegang {partitions_held()}/{LEADER_PARTITIONS} partisi")
+
+def partitions_held() -> int:
+    return sum(1 for name in held if name.startswith(PARTITION_PREFIX))
+
+def release_all():
+    for name in list(held):
+        release(name)
+    db.workers.delete_one({"_id": WORKER_ID})
+
+async def run(stop: asyncio.Event, on_tick=None):
+    """
+    Loop heartbeat sampai stop di-set. on_tick (async) dipanggil tiap putaran,
+    mis. untuk menyalakan/mematikan polling Telegram.
+    """
+    while not stop.is_set():
+        try:
+            await asyncio.to_thread(tick)
+        except Exception as e:
+            # Tidak bisa memperpanjang (Mongo down, dll): anggap lease hilang supaya
+            # tidak dobel kerja, lalu coba lagi di putaran berikutnya
+            print(f"⚠️ Leader Heartbeat Error: {e}")
+            held.clear()
+        if on_tick is not None:
+            try:
+                await on_tick()
+            except Exception as e:
+                # Mis. NetworkError Telegram saat start/stop polling: jangan matikan worker
+                print(f"⚠️ Leader on_tick Error: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    try:
+        await asyncio.to_thread(release_all)
+    except PyMongoError as e:
+        # Lease tetap kadaluarsa sendiri setelah LEASE_TTL_SECONDS
+        print(f"⚠️ Leader Release Error: {e}")
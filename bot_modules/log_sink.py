@@ -0,0 +1,91 @@
+"""
+Tujuan penulisan log cuaca & badai dari job bot.
+
+LOG_SINK_MODE:
+- http  : kirim batch ke endpoint /api/v1/{weather,storm}/log/batch (API terpisah)
+- mongo : validasi dengan skema yang sama lalu bulk write langsung ke MongoDB
+          (bot & API satu deployment, tanpa loopback HTTP)
+
+Record ditampung di buffer dan ditulis per LOG_SINK_BATCH_SIZE atau saat flush().
+"""
+import asyncio
+import os
+
+from .http_clients import get_client
+from .schemas import WeatherLog, StormLog
+
+LOG_SINK_MODE = (os.getenv("LOG_SINK_MODE", "http") or "http").lower().strip()
+LOG_SINK_BATCH_SIZE = int(os.getenv("LOG_SINK_BATCH_SIZE", "500"))
+
+KINDS = {
+    "weather": {"path": "/api/v1/weather/log/batch", "model": WeatherLog},
+    "storm": {"path": "/api/v1/storm/log/batch", "model": StormLog},
+}
+
+async def post_logs_batch(path: str, payloads: list):
+    """
+    Kirim banyak log sekaligus ke endpoint batch API (satu request per batch).
+    """
+    if not payloads:
+        return
+
+    api_key = os.getenv("API_KEY", "RAHASIA_KUNCI_API_ANDA")
+    api_url = os.getenv("API_BASE_URL", "http://127.0.0.1:8000") # Default local
+    headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
+
+    r = await get_client("api").post(f"{api_url}{path}", json=payloads, headers=headers)
+    r.raise_for_status()
+    result = r.json()
+    for err in result.get("errors", []):
+        print(f"⚠️ Batch Log Error {path} [{err.get('index')}]: {err.get('error')}")
+    for err in result.get("rollup_errors", []):
+        print(f"⚠️ Batch Log {err.get('stage')} Error {path}: {err.get('error')}")
+
+def write_logs_mongo(kind: str, payloads: list):
+    """
+    Validasi + simpan langsung (blocking, jalankan di thread).
+    """
+    # Import di sini supaya mode http tidak perlu koneksi DB dari modul ini
+    from .database import db
+    from .log_store import validate_logs, store_weather_logs, store_storm_logs
+
+    docs, errors = validate_logs(KINDS[kind]["model"], payloads)
+    store = store_weather_logs if kind == "weather" else store_storm_logs
+    store(db, docs, errors)
+    for err in sorted(errors, key=lambda e: e["index"]):
+        print(f"⚠️ Batch Log Error {kind} [{err['index']}]: {err['error']}")
+
+class LogSink:
+    def __init__(self, mode: str = LOG_SINK_MODE, batch_size: int = LOG_SINK_BATCH_SIZE):
+        if mode not in ("http", "mongo"):
+            raise ValueError(f"LOG_SINK_MODE tidak dikenal: {mode}")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.buffers = {kind: [] for kind in KINDS}
+
+    async def add(self, kind: str, payload: dict):
+        buf = self.buffers[kind]
+        buf.append(payload)
+        if len(buf) >= self.batch_size:
+            await self._flush_kind(kind)
+
+    async def flush(self):
+        for kind in KINDS:
+            await self._flush_kind(kind)
+
+    async def _flush_kind(self, kind: str):
+        buf = self.buffers[kind]
+        if not buf:
+            return
+        self.buffers[kind] = []
+
+        try:
+            if self.mode == "mongo":
+                await asyncio.to_thread(write_logs_mongo, kind, buf)
+            else:
+                await post_logs_batch(KINDS[kind]["path"], buf)
+        except Exception as e:
+            print(f"⚠️ Log Sink Error ({self.mode}/{kind}, {len(buf)} record): {e}")
+
+# Instance global yang dipakai job logger
+log_sink = LogSink()
@@ -0,0 +1,140 @@
+"""
+Jalur tulis log cuaca & badai ke MongoDB.
+
+Dipakai endpoint API (FastApi.py) dan log sink bot mode "mongo" (log_sink.py),
+jadi validasi, insert, view latest_forecast dan rollup selalu sama.
+"""
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from .timeseries import apply_rollups
+
+# Label sumber BMKG: API/skema memakai "BMKG", payload bot (jobs.build_bmkg_payload) "BMKG_API".
+# Disimpan sebagai "BMKG" supaya semua query (latest_forecast, precip, index) sama.
+BMKG_SOURCE = "BMKG"
+BMKG_SOURCES = ("BMKG", "BMKG_API")
+
+def normalize_source(doc: dict) -> dict:
+    if doc.get("source") in BMKG_SOURCES:
+        doc["source"] = BMKG_SOURCE
+    return doc
+
+def location_view_fields(loc: dict) -> dict:
+    return {
+        "location_name": loc["name"],
+        "coords": loc.get("coordinates") or {"lat": loc.get("lat"), "lon": loc.get("lon")}
+    }
+
+def upsert_latest_forecast(db, docs: list):
+    docs = [d for d in docs if d.get("source") in BMKG_SOURCES]
+    if not docs:
+        return
+
+    # Bot mengirim location_id = str(ObjectId) lokasi, API bisa memakai _id string
+    loc_ids = {d["location_id"] for d in docs}
+    lookup = list(loc_ids) + [ObjectId(i) for i in loc_ids if ObjectId.is_valid(i)]
+    locs = {
+        str(loc["_id"]): loc
+        for loc in db.locations.find({"_id": {"$in": lookup}}, {"name": 1, "coordinates": 1, "lat": 1, "lon": 1})
+    }
+
+    ops = []
+    for doc in docs:
+        loc = locs.get(doc["location_id"])
+        if not loc:
+            continue
+        view = normalize_source({k: v for k, v in doc.items() if k != "_id"})
+        view.update(location_view_fields(loc))
+        # Hanya timpa jika log ini lebih baru dari yang tersimpan
+        ops.append(ReplaceOne(
+            {"_id": doc["location_id"], "timestamp": {"$lte": doc["timestamp"]}},
+            view,
+            upsert=True
+        ))
+
+    if not ops:
+        return
+    try:
+        db.latest_forecast.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        # 11000 (duplicate key) = sudah ada log yang lebih baru, abaikan
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+
+def rebuild_latest_forecast(db):
+    """
+    Bangun ulang latest_forecast dari weather_logs (untuk deploy pertama).
+    """
+    db.weather_logs.aggregate([
+        {"$match": {"source": {"$in": list(BMKG_SOURCES)}}},
+        {"$sort": {"location_id": 1, "timestamp": -1}},
+        {"$group": {"_id": "$location_id", "doc": {"$first": "$$ROOT"}}},
+        # location_id bisa string _id lokasi atau str(ObjectId) dari bot
+        {"$lookup": {"from": "locations", "let": {"loc_id": "$_id"}, "as": "loc", "pipeline": [
+            {"$match": {"$expr": {"$eq": [{"$toString": "$_id"}, {"$toString": "$$loc_id"}]}}}
+        ]}},
+        {"$unwind": "$loc"},
+        {"$replaceWith": {"$mergeObjects": ["$doc", {
+            "_id": "$_id",
+            "source": BMKG_SOURCE,
+            "location_name": "$loc.name",
+            "coords": {"$ifNull": ["$loc.coordinates", {"lat": "$loc.lat", "lon": "$loc.lon"}]}
+        }]}},
+        {"$merge": {"into": "latest_forecast", "whenMatched": "replace"}}
+    ])
+
+def validate_logs(model, items: list):
+    """
+    Validasi tiap item dengan model log (schemas.py).
+    Return (docs, errors), docs berisi pasangan (index, doc).
+    """
+    docs, errors = [], []
+    for i, item in enumerate(items):
+        try:
+            docs.append((i, model.parse_obj(item).dict()))
+        except ValidationError as e:
+            errors.append({
+                "index": i,
+                "error": [{"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()]
+            })
+    return docs, errors
+
+def insert_batch(collection, docs: list, errors: list):
+    """
+    Unordered bulk insert. Item yang gagal ditulis masuk ke errors.
+    Return list doc yang berhasil disimpan.
+    """
+    if not docs:
+        return []
+    try:
+        collection.insert_many([doc for _, doc in docs], ordered=False)
+        return [doc for _, doc in docs]
+    except BulkWriteError as e:
+        failed = set()
+        for err in e.details.get("writeErrors", []):
+            failed.add(err["index"])
+            errors.append({"index": docs[err["index"]][0], "error": err.get("errmsg")})
+        return [doc for pos, (_, doc) in enumerate(docs) if pos not in failed]
+
+def store_weather_logs(db, docs: list, errors: list, rollup_errors: list = None):
+    """
+    Simpan log cuaca, lalu perbarui latest_forecast & rollup untuk yang berhasil.
+    Log yang sudah tersimpan tidak digagalkan oleh view/rollup (retry klien akan
+    menduplikasi data): kegagalannya dicatat ke rollup_errors, bukan dilempar.
+    """
+    for _, doc in docs:
+        normalize_source(doc)
+    inserted = insert_batch(db.weather_logs, docs, errors)
+    for stage, update in (("latest_forecast", upsert_latest_forecast), ("rollup", apply_rollups)):
+        try:
+            update(db, inserted)
+        except Exception as e:
+            print(f"⚠️ Weather Log {stage} Error ({len(inserted)} log): {e}")
+            if rollup_errors is not None:
+                rollup_errors.append({"stage": stage, "error": str(e)})
+    return inserted
+
+def store_storm_logs(db, docs: list, errors: list):
+    return insert_batch(db.storm_monitor, docs, errors)
@@ -0,0 +1,295 @@
+"""
+Index wilayah (base.csv) untuk resolve nama -> kode ADM4 tanpa scan file per panggilan.
+
+Dimuat sekali per proses:
+- hash nama (dinormalisasi) -> id record, untuk exact match
+- array terurut suffix nama (mulai di batas kata), untuk pencarian prefix /
+  "nama mengandung query" dengan bisect
+- kode -> id, untuk naik ke kecamatan / kabupaten
+
+Opsional: index dibangun sekali ke file biner lalu di-mmap (tanpa parsing CSV):
+    python -m bot_modules.region_index build [base.csv] [base.idx]
+File dipakai otomatis jika ada di REGION_INDEX_PATH (default base.idx di samping base.csv).
+"""
+import array
+import bisect
+import csv
+import mmap
+import os
+import re
+import struct
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGION_CSV_PATH = os.getenv("REGION_CSV_PATH", os.path.join(BASE_DIR, "base.csv"))
+REGION_INDEX_PATH = os.getenv("REGION_INDEX_PATH", os.path.join(BASE_DIR, "base.idx"))
+
+# Panjang kode per level: 11 | 11.01 | 11.01.01 | 11.01.01.2001
+LEVEL_CODE_LEN = {1: 2, 2: 5, 3: 8, 4: 13}
+# Query panjang (display_name geocoder) dipecah jadi potongan maksimal sekian kata
+MAX_SPAN_TOKENS = 6
+
+_MAGIC = b"MHEWRIX1"
+_SECTIONS = ("codes_off", "codes", "names_off", "names", "keys_off", "keys", "suf_id", "suf_off", "by_code")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def name_key(s: str) -> str:
+    """
+    Normalisasi untuk index: huruf kecil, tanda baca jadi spasi.
+    "Kp. Belakang" dan "kp belakang" menghasilkan key yang sama.
+    """
+    return " ".join(_TOKEN_RE.findall((s or "").lower()))
+
+def _word_starts(key: str):
+    yield 0
+    for i, ch in enumerate(key):
+        if ch == " ":
+            yield i + 1
+
+class _Suffixes:
+    """
+    Sequence suffix key (terurut) yang dibentuk dari (id, offset) tanpa menyimpan string baru.
+    """
+    def __init__(self, keys, ids, offs):
+        self.keys, self.ids, self.offs = keys, ids, offs
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        return self.keys[self.ids[i]][self.offs[i]:]
+
+class _MappedStrings:
+    """
+    Tabel string di file mmap: offsets (n+1 x uint32) + blob UTF-8.
+    """
+    def __init__(self, blob, offsets):
+        self.blob, self.offsets = blob, offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+class RegionIndex:
+    def __init__(self, codes, names, keys, suf_id, suf_off, by_code, exact=None):
+        self.codes = codes
+        self.names = names
+        self.keys = keys
+        self.suf_id = suf_id
+        self.suf_off = suf_off
+        self.suffixes = _Suffixes(keys, suf_id, suf_off)
+        self.by_code = by_code # id terurut menurut kode
+        self.exact = exact # dict key -> [id]; None pada mode mmap (pakai bisect)
+
+    # --- BUILD / LOAD ---
+
+    @classmethod
+    def from_csv(cls, path: str = REGION_CSV_PATH):
+        codes, names, keys = [], [], []
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                if len(row) < 2 or not row[0].strip():
+                    continue
+                codes.append(row[0].strip())
+                names.append(row[1].strip())
+                keys.append(name_key(row[1]))
+
+        exact = {}
+        for i, key in enumerate(keys):
+            exact.setdefault(key, []).append(i)
+
+        entries = sorted(
+            ((keys[i][off:], i, off) for i in range(len(keys)) if keys[i] for off in _word_starts(keys[i]))
+        )
+        suf_id = array.array("I", (e[1] for e in entries))
+        suf_off = array.array("I", (e[2] for e in entries))
+        by_code = array.array("I", sorted(range(len(codes)), key=codes.__getitem__))
+        return cls(codes, names, keys, suf_id, suf_off, by_code, exact)
+
+    def save(self, path: str = REGION_INDEX_PATH):
+        def string_table(values):
+            blob = bytearray()
+            offsets = array.array("I", [0])
+            for v in values:
+                blob += v.encode("utf-8")
+                offsets.append(len(blob))
+            return offsets.tobytes(), bytes(blob)
+
+        codes_off, codes = string_table(self.codes)
+        names_off, names = string_table(self.names)
+        keys_off, keys = string_table(self.keys)
+        parts = [codes_off, codes, names_off, names, keys_off, keys,
+                 array.array("I", self.suf_id).tobytes(), array.array("I", self.suf_off).tobytes(),
+                 array.array("I", self.by_code).tobytes()]
+
+        # Header: magic, byteorder, lalu (start, length) tiap section; section dirata 4 byte
+        header_len = len(_MAGIC) + 1 + 16 * len(parts)
+        pos, layout = header_len, []
+        for p in parts:
+            pos += -pos % 4
+            layout.append((pos, len(p)))
+            pos += len(p)
+
+        with open(path, "wb") as f:
+            f.write(_MAGIC + (b"L" if sys.byteorder == "little" else b"B"))
+            for start, length in layout:
+                f.write(struct.pack("<QQ", start, length))
+            for (start, _), p in zip(layout, parts):
+                f.write(b"\0" * (start - f.tell()))
+                f.write(p)
+
+    @classmethod
+    def from_file(cls, path: str = REGION_INDEX_PATH):
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if mm[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} bukan file region index")
+        if mm[len(_MAGIC):len(_MAGIC) + 1] != (b"L" if sys.byteorder == "little" else b"B"):
+            raise ValueError(f"{path} dibangun di mesin dengan byte order berbeda")
+
+        view = memoryview(mm)
+        sec, pos = {}, len(_MAGIC) + 1
+        for name in _SECTIONS:
+            start, length = struct.unpack_from("<QQ", mm, pos)
+            pos += 16
+            sec[name] = view[start:start + length]
+
+        u32 = lambda name: sec[name].cast("I")
+        return cls(
+            codes=_MappedStrings(sec["codes"], u32("codes_off")),
+            names=_MappedStrings(sec["names"], u32("names_off")),
+            keys=_MappedStrings(sec["keys"], u32("keys_off")),
+            suf_id=u32("suf_id"), suf_off=u32("suf_off"), by_code=u32("by_code"),
+        )
+
+    # --- LOOKUP ---
+
+    def __len__(self):
+        return len(self.codes)
+
+    def find_code(self, code: str):
+        """
+        id record untuk kode wilayah, None jika tidak ada.
+        """
+        codes, by_code = self.codes, self.by_code
+        lo, hi = 0, len(by_code)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if codes[by_code[mid]] < code:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(by_code) and codes[by_code[lo]] == code:
+            return by_code[lo]
+        return None
+
+    def name_of(self, code: str):
+        i = self.find_code(code)
+        return None if i is None else self.names[i]
+
+    def exact_ids(self, key: str) -> list:
+        if self.exact is not None:
+            return self.exact.get(key, [])
+        # Mode mmap: exact = suffix offset 0 yang sama persis
+        ids = []
+        i = bisect.bisect_left(self.suffixes, key)
+        while i < len(self.suffixes) and self.suffixes[i] == key:
+            if self.suf_off[i] == 0:
+                ids.append(self.suf_id[i])
+            i += 1
+        return ids
+
+    def prefix_ids(self, prefix: str, limit: int = 50) -> list:
+        """
+        Pasangan (id, offset) untuk record yang salah satu katanya diawali prefix
+        (offset 0 = awal nama).
+        """
+        ids = []
+        i = bisect.bisect_left(self.suffixes, prefix)
+        while i < len(self.suffixes) and len(ids) < limit and self.suffixes[i].startswith(prefix):
+            ids.append((self.suf_id[i], self.suf_off[i]))
+            i += 1
+        return ids
+
+    def lookup(self, query: str, limit: int = 10, level: int = 4) -> list:
+        """
+        Kandidat kode untuk nama / alamat bebas, urut dari yang paling cocok:
+        1. nama sama persis dengan query
+        2. nama diawali query
+        3. nama muncul sebagai potongan kata di query (mis. display_name geocoder),
+           potongan yang lebih awal & lebih panjang didahulukan
+        4. query muncul di awal kata lain pada nama
+        Return list dict {code, name, score, match}.
+        """
+        key = name_key(query)
+        if not key:
+            return []
+        code_len = LEVEL_CODE_LEN.get(level)
+        found = {}
+
+        def add(i, score, match):
+            if code_len and len(self.codes[i]) != code_len:
+                return
+            if i not in found or found[i][0] < score:
+                found[i] = (score, match)
+
+        for i in self.exact_ids(key):
+            add(i, 1.0, "exact")
+
+        tokens = key.split(" ")
+        n = len(tokens)
+        if n > 1:
+            for start in range(n):
+                for end in range(min(n, start + MAX_SPAN_TOKENS), start, -1):
+                    if end - start == n:
+                        continue
+                    span = " ".join(tokens[start:end])
+                    # Potongan awal & panjang lebih dipercaya (desa biasanya di depan display_name)
+                    score = 0.8 - 0.05 * start + 0.01 * (end - start)
+                    for i in self.exact_ids(span):
+                        add(i, score, "in_query")
+
+        for i, off in self.prefix_ids(key, limit=limit * 20):
+            # Nama diawali query ("lubuk pakam" -> "Lubuk Pakam I,II") lebih dekat dari
+            # potongan query; nama yang lebih pendek (lebih mirip query) didahulukan
+            extra = 0.001 * (len(self.keys[i]) - len(key))
+            add(i, (0.9 if off == 0 else 0.5) - extra, "prefix")
+
+        ranked = sorted(found.items(), key=lambda kv: (-kv[1][0], self.codes[kv[0]]))[:limit]
+        return [
+            {"code": self.codes[i], "name": self.names[i], "score": round(score, 3), "match": match}
+            for i, (score, match) in ranked
+        ]
+
+_index = None
+
+def get_region_index():
+    """
+    Index global (lazy). Pakai file mmap jika ada, jika tidak bangun dari CSV.
+    Return None jika base.csv juga tidak ada.
+    """
+    global _index
+    if _index is None:
+        if os.path.exists(REGION_INDEX_PATH):
+            try:
+                _index = RegionIndex.from_file(REGION_INDEX_PATH)
+                return _index
+            except Exception as e:
+                print(f"⚠️ Region Index File Error ({REGION_INDEX_PATH}): {e}, memakai CSV")
+        if not os.path.exists(REGION_CSV_PATH):
+            return None
+        _index = RegionIndex.from_csv(REGION_CSV_PATH)
+    return _index
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        raise SystemExit("Usage: python -m bot_modules.region_index build [base.csv] [base.idx]")
+    src = sys.argv[2] if len(sys.argv) > 2 else REGION_CSV_PATH
+    dst = sys.argv[3] if len(sys.argv) > 3 else REGION_INDEX_PATH
+    idx = RegionIndex.from_csv(src)
+    idx.save(dst)
+    print(f"✅ Region index: {len(idx)} wilayah, {len(idx.suf_id)} suffix -> {dst} ({os.path.getsize(dst) // 1024} KB)")
@@ -0,0 +1,286 @@
+"""
+Fuzzy matching nama desa/kelurahan dengan konteks hierarki wilayah.
+
+- Index trigram atas nama level desa (region_index / base.csv), kandidat diambil
+  dari posting list trigram yang paling jarang lalu dinilai ulang dengan
+  kemiripan trigram + edit distance (tahan typo & ejaan beda: "Lamteumen"/"Lamteumeun")
+- Nama desa yang sama di banyak kabupaten dibedakan lewat rantai induknya:
+  kecamatan = kode[:8] dicocokkan dengan district, kabupaten/kota = kode[:5]
+  dengan city dari geocoder (atau bagian berikutnya di display_name)
+"""
+import array
+import bisect
+import math
+from collections import Counter
+
+from .region_index import get_region_index, name_key, LEVEL_CODE_LEN
+
+# Kata administratif yang tidak ikut dicocokkan
+ADMIN_WORDS = {
+    "desa", "kelurahan", "kel", "kecamatan", "kec", "kabupaten", "kab", "kota",
+    "provinsi", "prov", "district", "regency", "city", "subdistrict"
+}
+MIN_NAME_SIMILARITY = 0.5
+# Jumlah kandidat (urut Dice) yang dinilai ulang dengan edit distance
+EDIT_DISTANCE_TOP = 5
+# Kandidat fuzzy hanya dari nama dengan selisih panjang <= max(MIN, panjang * FRACTION)
+LENGTH_WINDOW_MIN = 2
+LENGTH_WINDOW_FRACTION = 0.25
+# Bobot kecocokan kecamatan & kabupaten/kota terhadap skor akhir
+DISTRICT_WEIGHT = 0.3
+CITY_WEIGHT = 0.2
+
+def strip_admin(key: str) -> str:
+    return " ".join(t for t in key.split(" ") if t not in ADMIN_WORDS)
+
+def trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def levenshtein(a: str, b: str, max_dist: int = None) -> int:
+    """
+    Edit distance. Dengan max_dist hanya pita diagonal selebar max_dist yang
+    dihitung, dan hasilnya max_dist + 1 begitu jaraknya pasti melebihi batas.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    n, m = len(a), len(b)
+    band = n if max_dist is None else max_dist
+    if n - m > band:
+        return band + 1
+    big = n + 1
+    prev = list(range(m + 1))
+    for i in range(1, n + 1):
+        ca = a[i - 1]
+        lo, hi = max(1, i - band), min(m, i + band)
+        cur = [big] * (m + 1)
+        cur[0] = i if i <= band else big
+        best = cur[0]
+        for j in range(lo, hi + 1):
+            d = prev[j - 1] + (ca != b[j - 1])
+            x = prev[j] + 1
+            if x < d:
+                d = x
+            x = cur[j - 1] + 1
+            if x < d:
+                d = x
+            cur[j] = d
+            if d < best:
+                best = d
+        if best > band:
+            return band + 1
+        prev = cur
+    return prev[m] if prev[m] <= band else band + 1
+
+def dice(ta: set, tb: set) -> float:
+    return 2 * len(ta & tb) / (len(ta) + len(tb)) if ta and tb else 0.0
+
+def similarity(a: str, b: str, floor: float = 0.0) -> float:
+    """
+    Kemiripan 0..1: maksimum dari Dice trigram dan (1 - edit distance relatif).
+    floor: skor yang sudah diketahui; edit distance dihentikan jika tidak bisa melewatinya.
+    """
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    longest = max(len(a), len(b))
+    score = max(floor, dice(trigrams(a), trigrams(b)))
+    max_dist = math.ceil((1 - score) * longest) - 1
+    if max_dist < 0:
+        return score
+    return max(score, 1 - levenshtein(a, b, max_dist) / longest)
+
+class RegionMatcher:
+    def __init__(self, index):
+        self.index = index
+        code_len = LEVEL_CODE_LEN[4]
+
+        entries = []
+        for i in range(len(index)):
+            if len(index.codes[i]) != code_len:
+                continue
+            key = strip_admin(index.keys[i])
+            if key:
+                entries.append((len(key), key, i))
+        # Posisi urut panjang nama -> tiap posting list juga urut panjang, sehingga
+        # kandidat dengan panjang mirip cukup diambil dengan bisect
+        entries.sort()
+
+        self.ids = array.array("I", (i for _, _, i in entries))
+        self.keys = [key for _, key, _ in entries]
+        max_len = entries[-1][0] if entries else 0
+        # length_start[n] = posisi pertama dengan panjang >= n
+        self.length_start = array.array("I", (0 for _ in range(max_len + 2)))
+        for n in range(max_len + 1, -1, -1):
+            self.length_start[n] = self.length_start[n + 1] if n <= max_len else len(entries)
+        for pos in range(len(entries) - 1, -1, -1):
+            self.length_start[entries[pos][0]] = pos
+
+        postings = {}
+        for pos, key in enumerate(self.keys):
+            for tri in trigrams(key):
+                postings.setdefault(tri, array.array("I")).append(pos)
+        self.postings = postings
+        self.exact = {}
+        for pos, key in enumerate(self.keys):
+            self.exact.setdefault(key, []).append(pos)
+        self._parent_trigrams = {}
+
+    def parent_trigrams(self, code: str) -> set:
+        tris = self._parent_trigrams.get(code)
+        if tris is None:
+            key = strip_admin(name_key(self.index.name_of(code) or ""))
+            tris = trigrams(key) if key else set()
+            self._parent_trigrams[code] = tris
+        return tris
+
+    def length_range(self, key: str):
+        """
+        (lo, hi, bound): rentang posisi nama yang panjangnya dekat dengan key, dan
+        batas atas skor nama (Dice / edit) untuk nama di luar rentang itu.
+        """
+        n = len(key)
+        window = max(LENGTH_WINDOW_MIN, int(n * LENGTH_WINDOW_FRACTION))
+        last = len(self.length_start) - 1
+        lo = self.length_start[min(last, max(0, n - window))]
+        hi = self.length_start[min(last, n + window + 1)]
+        # Nama terdekat di luar rentang: panjang n + window + 1 (atau n - window - 1);
+        # trigram nama sepanjang m paling banyak m + 1
+        longer = n + window + 1
+        bound = max(2 * (n + 1) / (n + longer + 2), n / longer)
+        shorter = n - window - 1
+        if shorter > 0:
+            bound = max(bound, 2 * (shorter + 1) / (n + shorter + 2), shorter / n)
+        return lo, hi, bound
+
+    def candidates(self, key: str, lo: int = 0, hi: int = None, max_candidates: int = 40) -> list:
+        """
+        Posisi kandidat fuzzy di rentang [lo, hi), diambil dari trigram paling
+        jarang (pigeonhole: nama yang berbagi cukup banyak trigram pasti
+        mengandung salah satunya).
+        """
+        if hi is None:
+            hi = len(self.keys)
+        slices = []
+        for tri in trigrams(key):
+            posting = self.postings.get(tri, ())
+            a, b = bisect.bisect_left(posting, lo), bisect.bisect_left(posting, hi)
+            slices.append((b - a, posting, a, b))
+        slices.sort(key=lambda s: s[0])
+        need = max(1, math.ceil(len(slices) * 0.4))
+        counts = Counter()
+        for _, posting, a, b in slices[:len(slices) - need + 1]:
+            counts.update(posting[a:b])
+        return [pos for pos, _ in counts.most_common(max_candidates)]
+
+    def match(self, village: str, district=None, city=None, limit: int = 5) -> list:
+        """
+        Kandidat kode desa untuk nama village. district: nama kecamatan, city: nama
+        kabupaten/kota dari geocoder; masing-masing string atau list string.
+        Kecamatan hanya dinilai terhadap district dan kabupaten hanya terhadap city,
+        supaya kecamatan yang namanya sama dengan kabupatennya tidak ikut cocok.
+        Return list dict {code, name, score, name_score, kecamatan, kabupaten}.
+        """
+        key = strip_admin(name_key(village))
+        if not key:
+            return []
+
+        def context(names) -> list:
+            if isinstance(names, str):
+                names = [names]
+            return [trigrams(k) for k in (strip_admin(name_key(c)) for c in names or () if c) if k]
+
+        roles = {8: context(district), 5: context(city)} # panjang kode induk -> konteks
+        has_ctx = any(roles.values())
+        parent_scores = {}
+
+        def parent_score(code: str) -> float:
+            # Induk cukup dinilai dengan Dice trigram (murah, dihitung sekali per kode)
+            if code not in parent_scores:
+                parent = self.parent_trigrams(code)
+                parent_scores[code] = max((dice(c, parent) for c in roles[len(code)]), default=0.0)
+            return parent_scores[code]
+
+        key_tris = trigrams(key)
+
+        def score_all(positions) -> list:
+            # Saring dengan Dice trigram dulu, edit distance hanya untuk kandidat teratas
+            scored = sorted(
+                ((dice(key_tris, trigrams(self.keys[pos])), pos) for pos in positions),
+                reverse=True
+            )
+            results = []
+            for rank, (name_score, pos) in enumerate(scored):
+                other = self.keys[pos]
+                # Batas atas skor edit dari selisih panjang; lewati Levenshtein jika tidak mungkin menang
+                edit_bound = 1 - abs(len(key) - len(other)) / max(len(key), len(other))
+                if rank < EDIT_DISTANCE_TOP and name_score < edit_bound:
+                    name_score = similarity(key, other, floor=name_score)
+                if name_score < MIN_NAME_SIMILARITY:
+                    continue
+                code = self.index.codes[self.ids[pos]]
+                score = name_score
+                if has_ctx:
+                    score += DISTRICT_WEIGHT * parent_score(code[:8]) + CITY_WEIGHT * parent_score(code[:5])
+                results.append((score, name_score, code, self.ids[pos]))
+            return results
+
+        # Nama yang sama persis cukup jika tanpa konteks atau induknya cocok;
+        # jika tidak, ikutkan kandidat fuzzy (ejaan beda di wilayah yang benar)
+        positions = self.exact.get(key, [])
+        if positions and not (has_ctx and max(
+            max(parent_score(code[:8]), parent_score(code[:5]))
+            for code in (self.index.codes[self.ids[pos]] for pos in positions)
+        ) < 0.5):
+            results = score_all(positions)
+        else:
+            # Kandidat dengan panjang mirip dulu; rentang penuh (mis. nama + "Timur")
+            # hanya jika nama di luar rentang masih mungkin mengalahkan hasil terbaik
+            lo, hi, bound = self.length_range(key)
+            near = list(dict.fromkeys(positions + self.candidates(key, lo, hi)))
+            results = score_all(near)
+            ctx_max = DISTRICT_WEIGHT * bool(roles[8]) + CITY_WEIGHT * bool(roles[5])
+            if max((r[0] for r in results), default=0.0) < bound + ctx_max:
+                results = score_all(list(dict.fromkeys(near + self.candidates(key))))
+
+        results.sort(key=lambda r: (-r[0], r[2]))
+        return [
+            {
+                "code": code,
+                "name": self.index.names[i],
+                "score": round(score, 3),
+                "name_score": round(name_score, 3),
+                "kecamatan": self.index.name_of(code[:8]),
+                "kabupaten": self.index.name_of(code[:5]),
+            }
+            for score, name_score, code, i in results[:limit]
+        ]
+
+    def match_address(self, address: str, limit: int = 5) -> list:
+        """
+        Untuk display_name geocoder ("Desa, Kecamatan, Kota, Provinsi, ..."):
+        tiap bagian awal dicoba sebagai nama desa; bagian sesudahnya = kecamatan,
+        bagian-bagian setelah itu = kabupaten/kota (bagian sebelumnya diabaikan).
+        """
+        parts = [p.strip() for p in (address or "").split(",") if p.strip()]
+        best = {}
+        for n, part in enumerate(parts[:3]):
+            for cand in self.match(part, district=parts[n + 1:n + 2], city=parts[n + 2:], limit=limit):
+                if cand["code"] not in best or best[cand["code"]]["score"] < cand["score"]:
+                    best[cand["code"]] = cand
+        return sorted(best.values(), key=lambda c: (-c["score"], c["code"]))[:limit]
+
+_matcher = None
+
+def get_region_matcher():
+    """
+    Matcher global (dibangun saat pertama dipakai). None jika base.csv tidak ada.
+    """
+    global _matcher
+    if _matcher is None:
+        index = get_region_index()
+        if index is None:
+            return None
+        _matcher = RegionMatcher(index)
+    return _matcher
@@ -0,0 +1,138 @@
+"""
+Pembungkus JobQueue untuk job berulang.
+
+- Statistik per job: jumlah run, durasi (terakhir / rata-rata / p95 / maks), hasil & error terakhir
+- Overlap guard: jika run sebelumnya belum selesai, run baru di-"skip" atau di-"coalesce"
+  (digabung jadi satu run tambahan tepat setelah run yang sedang berjalan selesai)
+- Jitter: waktu mulai pertama diacak dalam sebagian interval supaya job tidak
+  menembak di detik yang sama
+- Guard (opsional): run dilewati jika guard() False, mis. worker ini tidak
+  memegang lease job tersebut (leader.py)
+"""
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+# Porsi interval yang dipakai untuk mengacak waktu mulai (0 = tanpa jitter)
+JOB_JITTER_FRACTION = float(os.getenv("JOB_JITTER_FRACTION", "1.0"))
+
+JOB_STATS = {}
+
+def _new_stats(interval: float, overlap: str) -> dict:
+    return {
+        "interval": interval, "overlap": overlap,
+        "runs": 0, "errors": 0, "skipped": 0, "coalesced": 0, "standby": 0, "running": False,
+        "last_start": None, "last_duration": None, "last_outcome": None, "last_error": None,
+        "total_duration": 0.0, "max_duration": 0.0,
+        "durations": deque(maxlen=100),
+    }
+
+def instrument(callback, name: str, interval: float = None, overlap: str = "skip", guard=None):
+    """
+    Bungkus callback job (async fn(context)) dengan statistik & overlap guard.
+    """
+    if overlap not in ("skip", "coalesce"):
+        raise ValueError(f"overlap harus 'skip' atau 'coalesce', bukan {overlap!r}")
+    stats = JOB_STATS.setdefault(name, _new_stats(interval, overlap))
+    state = {"pending": False}
+
+    async def run_once(context):
+        stats["last_start"] = datetime.now(timezone.utc)
+        t0 = time.monotonic()
+        try:
+            await callback(context)
+            stats["last_outcome"] = "ok"
+        except Exception as e:
+            stats["errors"] += 1
+            stats["last_outcome"] = "error"
+            stats["last_error"] = str(e)[:200]
+            print(f"⚠️ Job {name} Error: {e}")
+        finally:
+            duration = time.monotonic() - t0
+            stats["runs"] += 1
+            stats["last_duration"] = duration
+            stats["total_duration"] += duration
+            stats["max_duration"] = max(stats["max_duration"], duration)
+            stats["durations"].append(duration)
+
+    async def wrapper(context):
+        if guard is not None and not guard():
+            stats["standby"] += 1
+            return
+
+        if stats["running"]:
+            if overlap == "coalesce":
+                state["pending"] = True
+                stats["coalesced"] += 1
+            else:
+                stats["skipped"] += 1
+            return
+
+        stats["running"] = True
+        try:
+            await run_once(context)
+            # Semua run yang tertahan selama ini cukup dijalankan sekali
+            while state["pending"]:
+                state["pending"] = False
+                await run_once(context)
+        finally:
+            stats["running"] = False
+
+    wrapper.__name__ = getattr(callback, "__name__", name)
+    return wrapper
+
+def run_repeating(jq, callback, interval: float, name: str, first: float = 0, data=None,
+                  overlap: str = "skip", jitter: float = JOB_JITTER_FRACTION, guard=None):
+    """
+    Seperti jq.run_repeating, tapi lewat instrument() dan dengan jitter:
+    run pertama = first + acak(0, interval * jitter).
+    """
+    start = first + random.uniform(0, interval * max(0.0, jitter))
+    return jq.run_repeating(
+        instrument(callback, name, interval, overlap, guard),
+        interval=interval, first=start, name=name, data=data,
+        # Overlap ditangani wrapper; APScheduler default (1 instance) akan
+        # membuang run tanpa tercatat di statistik
+        job_kwargs={"max_instances": 3}
+    )
+
+def job_stats() -> dict:
+    """
+    Ringkasan statistik per job (durasi dalam detik).
+    """
+    result = {}
+    for name, s in JOB_STATS.items():
+        ordered = sorted(s["durations"])
+        result[name] = {
+            k: v for k, v in s.items() if k not in ("durations", "total_duration")
+        }
+        result[name]["avg_duration"] = s["total_duration"] / s["runs"] if s["runs"] else None
+        result[name]["p95_duration"] = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else None
+    return result
+
+def format_job_stats() -> str:
+    """
+    Teks Markdown untuk /status.
+    """
+    stats = job_stats()
+    if not stats:
+        return "Belum ada job terjadwal."
+
+    lines = []
+    for name, s in sorted(stats.items()):
+        short = name.split(":")[-1]
+        if s["standby"] and not s["runs"]:
+            lines.append(f"💤 `{short}` standby (dijalankan worker lain)")
+        elif s["runs"]:
+            icon = "🔄" if s["running"] else ("✅" if s["last_outcome"] == "ok" else "❌")
+            lines.append(
+                f"{icon} `{short}` {s['runs']}x, terakhir {s['last_duration']:.1f}s, "
+                f"rata2 {s['avg_duration']:.1f}s, p95 {s['p95_duration']:.1f}s"
+            )
+        else:
+            lines.append(f"⏳ `{short}` belum jalan")
+        if s["errors"] or s["skipped"] or s["coalesced"]:
+            lines.append(f"   error {s['errors']}, skip {s['skipped']}, gabung {s['coalesced']}")
+    return "\n".join(lines)
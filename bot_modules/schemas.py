@@ -0,0 +1,40 @@
+"""
+Skema log yang ditulis ke weather_logs / storm_monitor.
+Dipakai endpoint API dan log sink bot supaya dokumen yang tersimpan sama persis.
+"""
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+class ForecastItem(BaseModel):
+    time: str
+    temp: int
+    desc: str
+    humidity: int
+    wind_speed: float
+    precip: float
+    precip_mm: Optional[float] = None
+    humidity: Optional[int] = None
+    wind_speed: Optional[float] = None
+
+class WeatherLogData(BaseModel):
+    temp: float
+    humidity: int
+    weather_desc: str
+    precip_mm: float
+    wind_speed: float
+
+class WeatherLog(BaseModel):
+    location_id: str
+    timestamp: datetime
+    source: str = "BMKG"
+    data: WeatherLogData
+    forecast_3h: List[ForecastItem]
+
+class StormLog(BaseModel):
+    location_id: str
+    last_check: datetime
+    source: str = "Windy"
+    parameters: dict
+    is_alert: bool
+    alert_message: Optional[str] = None
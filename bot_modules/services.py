@@ -1,4 +1,6 @@
-import httpx
+from .http_clients import get_client
+from . import geocache
+from .geocache import search_key, reverse_tile
 from .config import (
     WINDY_API_KEY, 
     WINDY_POINT_FORECAST_URL, 
@@ -7,48 +9,55 @@ from .config import (
 )
 
 async def fetch_json(url: str, timeout: int = 15):
-    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as c:
-        r = await c.get(url)
-        r.raise_for_status()
-        return r.json()
+    r = await get_client().get(url, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
 
 async def fetch_bytes(url: str, timeout: int = 15):
-    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as c:
-        r = await c.get(url)
-        r.raise_for_status()
-        return r.content
+    r = await get_client().get(url, timeout=timeout)
+    r.raise_for_status()
+    return r.content
 
-async def geocode_location(query: str):
-    q = (query or "").strip()
-    if not q:
-        return None
+async def fetch_conditional(url: str, etag: str = None, last_modified: str = None, timeout: int = 15):
+    """
+    GET dengan If-None-Match / If-Modified-Since.
+    Return (status_code, content, headers). Status 304 -> content kosong.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    r = await get_client().get(url, headers=headers, timeout=timeout)
+    if r.status_code == 304:
+        return 304, b"", r.headers
+    r.raise_for_status()
+    return r.status_code, r.content, r.headers
 
+async def nominatim_search(q: str):
+    """
+    Request langsung ke Nominatim search. None jika tidak ditemukan, exception jika gagal.
+    """
     url = "https://nominatim.openstreetmap.org/search"
     params = {"q": q, "format": "json", "limit": 1}
-    headers = {"User-Agent": "MHEWS-Bot/2.1 (telegram; emergency-monitoring)"}
 
-    try:
-        async with httpx.AsyncClient(timeout=20, headers=headers) as c:
-            r = await c.get(url, params=params)
-            r.raise_for_status()
-            data = r.json()
-            if not data:
-                return None
-
-            item = data[0]
-            return {
-                "display_name": item.get("display_name", q),
-                "lat": float(item["lat"]),
-                "lon": float(item["lon"]),
-            }
-    except Exception as e:
-        print(f"Geocoding error: {e}")
+    r = await get_client("nominatim").get(url, params=params)
+    r.raise_for_status()
+    data = r.json()
+    if not data:
         return None
 
-async def reverse_geocode(lat: float, lon: float):
+    item = data[0]
+    return {
+        "display_name": item.get("display_name", q),
+        "lat": float(item["lat"]),
+        "lon": float(item["lon"]),
+    }
+
+async def nominatim_reverse(lat: float, lon: float):
     """
-    Mengubah lat, lon menjadi detail alamat (Desa, Kecamatan, Kota)
-    Menggunakan OSM Nominatim.
+    Request langsung ke Nominatim reverse (zoom desa).
     """
     url = "https://nominatim.openstreetmap.org/reverse"
     params = {
@@ -57,26 +66,47 @@ async def reverse_geocode(lat: float, lon: float):
         "format": "json", 
         "zoom": 14 # Level Desa
     }
-    headers = {"User-Agent": "MHEWS-Bot/3.0 (weather-system)"}
     
+    r = await get_client("nominatim").get(url, params=params, timeout=10)
+    r.raise_for_status()
+    data = r.json()
+    if "error" in data:
+        # Mis. koordinat di laut: "Unable to geocode"
+        return None
+    addr = data.get("address", {})
+    
+    # Prioritize Village (Desa/Kelurahan)
+    village = addr.get("village") or addr.get("suburb") or addr.get("neighbourhood")
+    district = addr.get("subdistrict") or addr.get("county")
+    city = addr.get("city") or addr.get("town") or addr.get("regency")
+    
+    return {
+        "village": village,
+        "district": district,
+        "city": city,
+        "full_address": data.get("display_name")
+    }
+
+async def geocode_location(query: str):
+    q = (query or "").strip()
+    if not q:
+        return None
+
+    # Cache (LRU + MongoDB) & antrian 1 request/detik, lihat geocache.py
+    try:
+        return await geocache.geocode_cache.get(search_key(q), lambda: nominatim_search(q))
+    except Exception as e:
+        print(f"Geocoding error: {e}")
+        return None
+
+async def reverse_geocode(lat: float, lon: float):
+    """
+    Mengubah lat, lon menjadi detail alamat (Desa, Kecamatan, Kota)
+    Menggunakan OSM Nominatim, di-cache per tile koordinat.
+    """
+    key, tile_lat, tile_lon = reverse_tile(lat, lon)
     try:
-        async with httpx.AsyncClient(timeout=10, headers=headers) as c:
-            r = await c.get(url, params=params)
-            r.raise_for_status()
-            data = r.json()
-            addr = data.get("address", {})
-            
-            # Prioritize Village (Desa/Kelurahan)
-            village = addr.get("village") or addr.get("suburb") or addr.get("neighbourhood")
-            district = addr.get("subdistrict") or addr.get("county")
-            city = addr.get("city") or addr.get("town") or addr.get("regency")
-            
-            return {
-                "village": village,
-                "district": district,
-                "city": city,
-                "full_address": data.get("display_name")
-            }
+        return await geocache.geocode_cache.get(key, lambda: nominatim_reverse(tile_lat, tile_lon))
     except Exception as e:
         print(f"Reverse Geo Error: {e}")
         return None
@@ -99,11 +129,10 @@ async def windy_point_forecast(lat: float, lon: float, model: str = "gfs", param
         "key": WINDY_API_KEY
     }
 
-    async with httpx.AsyncClient(timeout=25) as c:
-        r = await c.post(WINDY_POINT_FORECAST_URL, json=payload)
-        if r.status_code >= 400:
-            raise RuntimeError(f"Windy HTTP {r.status_code}: {r.text[:300]}")
-        return r.json()
+    r = await get_client("windy").post(WINDY_POINT_FORECAST_URL, json=payload)
+    if r.status_code >= 400:
+        raise RuntimeError(f"Windy HTTP {r.status_code}: {r.text[:300]}")
+    return r.json()
 
 async def get_bmkg_eq():
     data = await fetch_json(BMKG_EQ_URL)
@@ -140,13 +169,7 @@ async def fetch_bmkg_point_forecast_json(adm4_code: str):
     url = "https://api.bmkg.go.id/publik/prakiraan-cuaca"
     params = {"adm4": adm4_code}
     
-    # Header minimal supaya tidak diblok
-    headers = {
-        "User-Agent": "MHEWS-Bot/3.0",
-        "Accept": "application/json"
-    }
-    
-    async with httpx.AsyncClient(timeout=20, headers=headers, follow_redirects=True) as c:
-        r = await c.get(url, params=params)
-        r.raise_for_status()
-        return r.json()
+    # Header minimal supaya tidak diblok sudah dipasang di client "bmkg"
+    r = await get_client("bmkg").get(url, params=params)
+    r.raise_for_status()
+    return r.json()
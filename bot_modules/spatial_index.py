@@ -0,0 +1,311 @@
+"""
+Reverse geocoding offline: titik (lat, lon) -> kode ADM4 tanpa Nominatim.
+
+- KD-tree atas centroid desa/kelurahan (proyeksi equirectangular, cukup untuk
+  mencari tetangga terdekat di lintang Indonesia)
+- Jika poligon batas desa tersedia: R-tree statis (STR packing) atas bbox poligon,
+  semua poligon yang bbox-nya memuat titik dicek point-in-polygon (ray casting),
+  berapapun luas desanya; tanpa poligon / titik di luar semua poligon:
+  centroid terdekat dalam LOCAL_MAX_DISTANCE_KM
+- Sumber data: koleksi wilayah_geo (diisi import_wilayah_geo.py) atau langsung
+  file GeoJSON / CSV (code,lat,lon) lewat WILAYAH_GEO_PATH
+
+Dipakai /api/v1/auto-detect jika AUTO_DETECT_MODE=local.
+"""
+import csv
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+
+from .geomath import haversine_distance
+
+AUTO_DETECT_MODE = (os.getenv("AUTO_DETECT_MODE", "nominatim") or "nominatim").lower().strip()
+WILAYAH_GEO_PATH = os.getenv("WILAYAH_GEO_PATH", "")
+LOCAL_MAX_DISTANCE_KM = float(os.getenv("LOCAL_MAX_DISTANCE_KM", "5"))
+# Jeda sebelum mencoba memuat ulang data jika sebelumnya kosong / gagal
+SPATIAL_RETRY_SECONDS = float(os.getenv("SPATIAL_RETRY_SECONDS", "600"))
+# Jumlah anak per node R-tree
+RTREE_NODE_CAPACITY = 16
+
+# Nama properti kode wilayah yang umum di dataset batas desa
+CODE_FIELDS = ("adm4", "kode", "kode_desa", "kdepum", "code", "id")
+
+def normalize_code(value) -> str:
+    """
+    "1101012001" (format BPS tanpa titik) -> "11.01.01.2001".
+    """
+    code = str(value or "").strip()
+    if re.fullmatch(r"\d{10}", code):
+        return f"{code[:2]}.{code[2:4]}.{code[4:6]}.{code[6:]}"
+    return code
+
+def geometry_polygons(geometry) -> list:
+    """
+    GeoJSON Polygon / MultiPolygon -> list poligon, poligon = list ring [(lon, lat), ...]
+    (ring pertama batas luar, sisanya lubang).
+    """
+    if not geometry:
+        return []
+    if geometry["type"] == "Polygon":
+        polys = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polys = geometry["coordinates"]
+    else:
+        return []
+    return [[[(float(p[0]), float(p[1])) for p in ring] for ring in poly] for poly in polys]
+
+def point_in_ring(lon: float, lat: float, ring) -> bool:
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > lat) != (y2 > lat) and lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1:
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+def point_in_polygons(lon: float, lat: float, polygons) -> bool:
+    return any(
+        point_in_ring(lon, lat, poly[0]) and not any(point_in_ring(lon, lat, hole) for hole in poly[1:])
+        for poly in polygons
+    )
+
+def polygons_bbox(polygons):
+    xs = [x for poly in polygons for x, _ in poly[0]]
+    ys = [y for poly in polygons for _, y in poly[0]]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def polygons_centroid(polygons):
+    """
+    Centroid (lat, lon) berbobot luas dari batas luar (rumus shoelace).
+    """
+    area_sum = cx = cy = 0.0
+    for poly in polygons:
+        ring = poly[0]
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+            cross = x1 * y2 - x2 * y1
+            area_sum += cross
+            cx += (x1 + x2) * cross
+            cy += (y1 + y2) * cross
+    if abs(area_sum) < 1e-15:
+        x0, y0, x1, y1 = polygons_bbox(polygons)
+        return (y0 + y1) / 2, (x0 + x1) / 2
+    return cy / (3 * area_sum), cx / (3 * area_sum)
+
+def _project(lat: float, lon: float):
+    # Equirectangular (derajat): jarak euclid ~ jarak sebenarnya untuk tetangga dekat
+    return lon * math.cos(math.radians(lat)), lat
+
+class KDTree:
+    """
+    KD-tree 2D statis: node = median dari rentang indeks (tanpa objek node).
+    """
+    def __init__(self, points):
+        self.points = points
+        self.order = list(range(len(points)))
+        self._build(0, len(points), 0)
+
+    def _build(self, lo: int, hi: int, axis: int):
+        if hi - lo <= 1:
+            return
+        self.order[lo:hi] = sorted(self.order[lo:hi], key=lambda i: self.points[i][axis])
+        mid = (lo + hi) // 2
+        self._build(lo, mid, 1 - axis)
+        self._build(mid + 1, hi, 1 - axis)
+
+    def nearest(self, point, k: int = 1) -> list:
+        """
+        k titik terdekat: list (jarak kuadrat, indeks) urut dari yang terdekat.
+        """
+        heap = [] # max-heap (-d2, i) berisi k terbaik
+        points, order = self.points, self.order
+        stack = [(0, len(order), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            i = order[mid]
+            px, py = points[i]
+            d2 = (px - point[0]) ** 2 + (py - point[1]) ** 2
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, i))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, i))
+
+            diff = point[axis] - points[i][axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            # Sisi jauh hanya dikunjungi jika bidang pemisah lebih dekat dari kandidat terjauh
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                stack.append((far[0], far[1], 1 - axis))
+            stack.append((near[0], near[1], 1 - axis))
+        return sorted((-d2, i) for d2, i in heap)
+
+def _bbox_union(entries):
+    return (min(b[0] for b, _ in entries), min(b[1] for b, _ in entries),
+            max(b[2] for b, _ in entries), max(b[3] for b, _ in entries))
+
+class RTree:
+    """
+    R-tree statis atas bbox (x0, y0, x1, y1), dibangun sekali dengan STR packing
+    (Sort-Tile-Recursive). Entry = (bbox, payload): payload int untuk item,
+    list entry anak untuk node.
+    """
+    def __init__(self, items, capacity: int = RTREE_NODE_CAPACITY):
+        """
+        items: iterable (payload, bbox).
+        """
+        self.capacity = capacity
+        entries = [(bbox, payload) for payload, bbox in items]
+        while len(entries) > capacity:
+            entries = [(_bbox_union(group), group) for group in self._pack(entries)]
+        self.root = (_bbox_union(entries), entries) if entries else None
+
+    def _pack(self, entries) -> list:
+        cap = self.capacity
+        leaves = math.ceil(len(entries) / cap)
+        slice_size = cap * math.ceil(math.sqrt(leaves))
+        by_x = sorted(entries, key=lambda e: e[0][0] + e[0][2])
+        groups = []
+        for s in range(0, len(by_x), slice_size):
+            by_y = sorted(by_x[s:s + slice_size], key=lambda e: e[0][1] + e[0][3])
+            groups.extend(by_y[g:g + cap] for g in range(0, len(by_y), cap))
+        return groups
+
+    def query(self, x: float, y: float) -> list:
+        """
+        Payload semua item yang bbox-nya memuat titik (x, y).
+        """
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            bbox, payload = stack.pop()
+            if not (bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]):
+                continue
+            if isinstance(payload, list):
+                stack.extend(payload)
+            else:
+                found.append(payload)
+        return found
+
+class SpatialIndex:
+    def __init__(self, records):
+        """
+        records: iterable dict {code, lat, lon, polygons (opsional)}.
+        """
+        self.codes, self.lats, self.lons = [], [], []
+        self.polygons = {} # indeks -> list poligon
+        bboxes = {}
+        for rec in records:
+            i = len(self.codes)
+            self.codes.append(rec["code"])
+            self.lats.append(rec["lat"])
+            self.lons.append(rec["lon"])
+            if rec.get("polygons"):
+                self.polygons[i] = rec["polygons"]
+                bboxes[i] = polygons_bbox(rec["polygons"])
+        self.tree = KDTree([_project(lat, lon) for lat, lon in zip(self.lats, self.lons)])
+        self.rtree = RTree(bboxes.items())
+
+    def __len__(self):
+        return len(self.codes)
+
+    def locate(self, lat: float, lon: float, max_distance_km: float = LOCAL_MAX_DISTANCE_KM):
+        """
+        Kode wilayah untuk titik. Return dict {code, method, distance_km} atau None
+        (di luar cakupan data).
+        method: "polygon" (titik di dalam batas desa) / "nearest" (centroid terdekat).
+        """
+        if not self.codes:
+            return None
+
+        # Semua poligon yang bbox-nya memuat titik; jika tumpang tindih (data tidak
+        # rapi) pilih yang centroid-nya paling dekat
+        hits = [i for i in self.rtree.query(lon, lat) if point_in_polygons(lon, lat, self.polygons[i])]
+        if hits:
+            distances = {i: haversine_distance(lat, lon, self.lats[i], self.lons[i]) for i in hits}
+            i = min(hits, key=lambda i: (distances[i], self.codes[i]))
+            return {"code": self.codes[i], "method": "polygon", "distance_km": round(distances[i], 3)}
+
+        i = self.tree.nearest(_project(lat, lon), k=1)[0][1]
+        distance = haversine_distance(lat, lon, self.lats[i], self.lons[i])
+        if distance > max_distance_km:
+            return None
+        return {"code": self.codes[i], "method": "nearest", "distance_km": round(distance, 3)}
+
+    # --- SUMBER DATA ---
+
+    @classmethod
+    def from_file(cls, path: str):
+        return cls(read_geo_file(path))
+
+    @classmethod
+    def from_mongo(cls, db, collection: str = "wilayah_geo"):
+        def records():
+            for doc in db[collection].find({}, {"centroid": 1, "geometry": 1}):
+                lon, lat = doc["centroid"]["coordinates"]
+                yield {"code": doc["_id"], "lat": lat, "lon": lon,
+                       "polygons": geometry_polygons(doc.get("geometry"))}
+        return cls(records())
+
+def read_geo_file(path: str, code_field: str = None, with_polygons: bool = True):
+    """
+    Record {code, lat, lon, polygons} dari GeoJSON FeatureCollection atau CSV code,lat,lon.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                try:
+                    yield {"code": normalize_code(row[0]), "lat": float(row[1]), "lon": float(row[2])}
+                except (IndexError, ValueError):
+                    continue # header / baris rusak
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        collection = json.load(f)
+    for feature in collection.get("features", []):
+        props = {k.lower(): v for k, v in (feature.get("properties") or {}).items()}
+        fields = [code_field.lower()] if code_field else CODE_FIELDS
+        code = next((normalize_code(props[k]) for k in fields if props.get(k)), None)
+        polygons = geometry_polygons(feature.get("geometry"))
+        if not code or not polygons:
+            continue
+        lat, lon = polygons_centroid(polygons)
+        yield {"code": code, "lat": lat, "lon": lon, "polygons": polygons if with_polygons else None}
+
+_spatial = None
+_spatial_missing_at = None # waktu (monotonic) terakhir data kosong / gagal dimuat
+_spatial_lock = threading.Lock()
+
+def get_spatial_index(db=None):
+    """
+    Index global (lazy): dari WILAYAH_GEO_PATH jika di-set, jika tidak dari koleksi
+    wilayah_geo. None jika data belum di-import.
+    Kondisi "tidak ada data" (atau error saat memuat) diingat selama SPATIAL_RETRY_SECONDS
+    supaya tiap request tidak memindai ulang wilayah_geo.
+    """
+    global _spatial, _spatial_missing_at
+    if _spatial is not None:
+        return _spatial
+    with _spatial_lock:
+        if _spatial is not None:
+            return _spatial
+        if _spatial_missing_at is not None and time.monotonic() - _spatial_missing_at < SPATIAL_RETRY_SECONDS:
+            return None
+        if not WILAYAH_GEO_PATH and db is None:
+            return None
+        try:
+            index = SpatialIndex.from_file(WILAYAH_GEO_PATH) if WILAYAH_GEO_PATH else SpatialIndex.from_mongo(db)
+        except Exception:
+            _spatial_missing_at = time.monotonic()
+            raise
+        if not len(index):
+            _spatial_missing_at = time.monotonic()
+            return None
+        _spatial = index
+        _spatial_missing_at = None
+        print(f"🗺️ Spatial Index: {len(index)} wilayah, {len(index.polygons)} dengan poligon")
+    return _spatial
@@ -0,0 +1,81 @@
+import os
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+
+# Data mentah weather_logs dihapus otomatis setelah TTL ini (rollup tetap disimpan)
+WEATHER_LOG_TTL_DAYS = int(os.getenv("WEATHER_LOG_TTL_DAYS", "90"))
+
+ROLLUP_HOURLY = "weather_rollups_hourly"
+ROLLUP_DAILY = "weather_rollups_daily"
+
+def ensure_weather_timeseries(db):
+    """
+    Pastikan weather_logs berupa koleksi time-series (meta: location_id, time: timestamp).
+    Koleksi lama (biasa) tidak disentuh, migrasi lewat migrate_weather_logs.py.
+    """
+    ttl = WEATHER_LOG_TTL_DAYS * 86400
+    info = next(db.list_collections(filter={"name": "weather_logs"}), None)
+
+    if info is None:
+        db.create_collection(
+            "weather_logs",
+            timeseries={"timeField": "timestamp", "metaField": "location_id", "granularity": "hours"},
+            expireAfterSeconds=ttl
+        )
+        print(f"✅ Created time-series collection weather_logs (TTL {WEATHER_LOG_TTL_DAYS} hari)")
+    elif info.get("type") == "timeseries" and info.get("options", {}).get("expireAfterSeconds") != ttl:
+        db.command("collMod", "weather_logs", expireAfterSeconds=ttl)
+
+def rollup_values(doc: dict) -> dict:
+    """
+    Ambil nilai yang di-rollup dari log BMKG (data.*) atau Windy (latest.*).
+    """
+    data = doc.get("data") or {}
+    latest = doc.get("latest") or {}
+
+    temp = data.get("temp", latest.get("temp_c"))
+    gust = latest.get("gust_ms")
+    precip = data.get("precip_mm")
+    if precip is None and latest.get("precip_3h_mm") is not None:
+        # Windy memberi akumulasi 3 jam dan di-log tiap jam -> bagi 3
+        # (sama dengan calculate_24h_precipitation)
+        precip = latest["precip_3h_mm"] / 3.0
+
+    return {"temp": temp, "precip": precip, "gust": gust}
+
+def _rollup_op(doc: dict, bucket: datetime) -> UpdateOne:
+    values = rollup_values(doc)
+    key = {"location_id": doc["location_id"], "source": doc.get("source"), "bucket": bucket}
+
+    update = {
+        "$setOnInsert": key,
+        "$inc": {"count": 1, "precip_sum": values["precip"] or 0.0},
+        "$set": {"updated_at": datetime.now(timezone.utc)}
+    }
+    # $min/$max dengan null akan menimpa angka, jadi hanya diisi jika ada nilainya
+    if values["temp"] is not None:
+        update["$min"] = {"temp_min": values["temp"]}
+        update["$max"] = {"temp_max": values["temp"]}
+    if values["gust"] is not None:
+        update.setdefault("$max", {})["gust_max"] = values["gust"]
+
+    return UpdateOne({"_id": key}, update, upsert=True)
+
+def apply_rollups(db, docs: list):
+    """
+    Update rollup per jam & per hari secara inkremental untuk log yang baru disimpan.
+    """
+    hourly, daily = [], []
+    for doc in docs:
+        ts = doc.get("timestamp")
+        if not isinstance(ts, datetime):
+            continue
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        ts = ts.astimezone(timezone.utc)
+        hourly.append(_rollup_op(doc, ts.replace(minute=0, second=0, microsecond=0)))
+        daily.append(_rollup_op(doc, ts.replace(hour=0, minute=0, second=0, microsecond=0)))
+
+    if hourly:
+        db[ROLLUP_HOURLY].bulk_write(hourly, ordered=False)
+        db[ROLLUP_DAILY].bulk_write(daily, ordered=False)
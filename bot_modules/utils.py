@@ -1,8 +1,10 @@
 import re
 import math
 from datetime import datetime, timezone, timedelta
-import os
 from .database import col_weather_logs
+from .geomath import haversine_distance # noqa: F401 (dipakai modul lain lewat utils)
+from .region_index import get_region_index, REGION_CSV_PATH
+from .region_match import get_region_matcher
 
 def normalize_name(s: str) -> str:
     s = (s or "").strip().lower()
@@ -24,6 +26,12 @@ def format_ts_ms(ts_ms: int) -> str:
     except Exception:
         return str(ts_ms)
 
+def fmt_number(value, spec: str = "g") -> str:
+    """
+    Angka untuk teks pesan; nilai kosong (None) ditampilkan "-".
+    """
+    return "-" if value is None else format(value, spec)
+
 def _first(arr):
     return arr[0] if isinstance(arr, list) and arr else None
 
@@ -152,16 +160,6 @@ def get_weather_score(weather_text: str) -> int:
         return 50 # SIAGA
     return 0 # AMAN
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    R = 6371  # Radius bumi (km)
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat / 2) * math.sin(dlat / 2) + \
-        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * \
-        math.sin(dlon / 2) * math.sin(dlon / 2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
 def get_adm4_from_csv(query_name: str) -> str:
     """
     Mencari kode ADM4 (10 digit) dari file backend/base.csv.
@@ -169,78 +167,35 @@ def get_adm4_from_csv(query_name: str) -> str:
     Contoh: 11.71.01.2005,Peuniti
     
     Strategi:
-    1. Cari exact match pada nama kelurahan/gampong (kolom 2).
-    2. Jika ada multiple, ambil yang pertama (atau bisa ditambah logika parent).
-    3. Return kode (kolom 1).
+    1. Kota utama pakai fallback manual (lebih akurat untuk kota besar).
+    2. Sisanya lewat region_match: nama desa (fuzzy) + kecamatan/kota dari
+       bagian lain display_name, lalu region_index.lookup jika tidak ada kandidat.
+    3. Return kode kandidat teratas.
     """
     if not query_name: return None
-    
-    # Path relative to this file (bot_modules/utils.py -> backend/base.csv)
-    # utils.py is in backend/bot_modules, so up one level is backend.
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    csv_path = os.path.join(base_dir, "base.csv")
-    
-    if not os.path.exists(csv_path):
-        print(f"⚠️ CSV not found: {csv_path}")
-        # FALLBACK MANUAL untuk kota-kota utama jika CSV tidak ada/gagal
-        CITY_FALLBACKS = {
-            "banda aceh": "11.71.01.2005", # Peuniti
-            "lhokseumawe": "11.73.02.2004", # Gampong Jawa
-            "meulaboh": "11.05.01.2002",    # Kp. Belakang
-            "sigli": "11.07.03.2001",       # Blok Sawah
-            "takengon": "11.04.01.2001",    # Takengon Timur
-            "sabang": "11.72.02.2002",      # Kota Atas
-            "langsa": "11.74.02.2004",      # Gampong Jawa
-        }
-        target_simple = normalize_name(query_name).replace("kota ", "").strip()
-        for k, v in CITY_FALLBACKS.items():
-            if k in target_simple:
-                print(f"✅ Fallback Used for {query_name}: {v}")
-                return v
-        return None
 
-    target = normalize_name(query_name)
-    best_code = None
-    
-    # Pre-check fallback SEBELUM CSV (untuk speed & akurasi kota besar)
+    # FALLBACK MANUAL untuk kota-kota utama (juga dipakai jika CSV tidak ada)
     CITY_FALLBACKS = {
-        "banda aceh": "11.71.01.2005",
-        "lhokseumawe": "11.73.02.2004",
-        "meulaboh": "11.05.01.2002",
-        "sigli": "11.07.03.2001",
-        "takengon": "11.04.01.2001",
-        "sabang": "11.72.02.2002",
-        "langsa": "11.74.02.2004"
+        "banda aceh": "11.71.01.2005", # Peuniti
+        "lhokseumawe": "11.73.02.2004", # Gampong Jawa
+        "meulaboh": "11.05.01.2002",    # Kp. Belakang
+        "sigli": "11.07.03.2001",       # Blok Sawah
+        "takengon": "11.04.01.2001",    # Takengon Timur
+        "sabang": "11.72.02.2002",      # Kota Atas
+        "langsa": "11.74.02.2004",      # Gampong Jawa
     }
-    
-    # Cek exact match atau contains pada fallback keys
-    target_simple = target.replace("kota ", "")
+    target_simple = normalize_name(query_name).replace("kota ", "").strip()
     for k, v in CITY_FALLBACKS.items():
-        if k == target_simple or k in target_simple:
-             # Logic: if user says "Banda Aceh", return Peuniti code
+        if k in target_simple:
             return v
-    
-    try:
-        with open(csv_path, "r", encoding="utf-8") as f:
-            for line in f:
-                parts = line.strip().split(",")
-                if len(parts) < 2: continue
-                
-                code = parts[0].strip()
-                name = normalize_name(parts[1])
-                
-                # Kita cari level 4 (Kelurahan/Desa) -> 10 digit (xx.xx.xx.xxxx)
-                # Filter hanya kode panjang > 7 (biar gak match provinsi/kabupaten)
-                if len(code) > 8: 
-                    # Exact match name
-                    if name == target:
-                        return code
-                    # Partial match (jika user input "gampong peuniti" tapi csv "peuniti")
-                    if target in name or name in target:
-                        best_code = code # Simpan kandidat, tapi lanjut cari exact
-                        
-    except Exception as e:
-        print(f"⚠️ CSV Read Error: {e}")
+
+    index = get_region_index()
+    if index is None:
+        print(f"⚠️ CSV not found: {REGION_CSV_PATH}")
         return None
-        
-    return best_code
+
+    # Nama desa + konteks kecamatan/kota dari display_name (tahan typo & nama kembar)
+    candidates = get_region_matcher().match_address(query_name, limit=1)
+    if not candidates:
+        candidates = index.lookup(query_name, limit=1)
+    return candidates[0]["code"] if candidates else None
@@ -0,0 +1,167 @@
+"""
+Cache Windy Point Forecast per sel grid model.
+
+Lokasi yang jatuh di sel yang sama (default 0.25°, resolusi GFS) memakai satu
+request ke Windy. Key cache: (sel, model, parameter, level, run model).
+Run model berganti tiap WINDY_RUN_HOURS (GFS: 00/06/12/18 UTC) setelah jeda
+publikasi WINDY_RUN_DELAY_HOURS, jadi data baru otomatis diambil setelah run baru keluar.
+
+Mode sel:
+- grid    : lat/lon dibulatkan ke kelipatan WINDY_GRID_DEG
+- geohash : pusat cell geohash dengan presisi WINDY_GEOHASH_PRECISION
+"""
+import asyncio
+import os
+import random
+import time
+
+from .services import windy_point_forecast
+from .utils import haversine_distance, parse_windy_latest
+
+WINDY_CELL_MODE = (os.getenv("WINDY_CELL_MODE", "grid") or "grid").lower().strip()
+WINDY_GRID_DEG = float(os.getenv("WINDY_GRID_DEG", "0.25"))
+WINDY_GEOHASH_PRECISION = int(os.getenv("WINDY_GEOHASH_PRECISION", "5"))
+WINDY_RUN_HOURS = int(os.getenv("WINDY_RUN_HOURS", "6"))
+WINDY_RUN_DELAY_HOURS = float(os.getenv("WINDY_RUN_DELAY_HOURS", "5"))
+# Porsi request yang juga diambil di titik asli untuk mengukur error (0 = mati, memakan kuota API)
+WINDY_CACHE_AUDIT_RATE = float(os.getenv("WINDY_CACHE_AUDIT_RATE", "0"))
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_cell(lat: float, lon: float, precision: int):
+    """
+    Return (geohash, lat pusat, lon pusat).
+    """
+    lat_rng, lon_rng = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, val = (lon_rng, lon) if even else (lat_rng, lat)
+        mid = (rng[0] + rng[1]) / 2
+        ch <<= 1
+        if val >= mid:
+            ch |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(chars), (lat_rng[0] + lat_rng[1]) / 2, (lon_rng[0] + lon_rng[1]) / 2
+
+def snap(lat: float, lon: float):
+    """
+    Return (cell_id, lat pusat sel, lon pusat sel) sesuai WINDY_CELL_MODE.
+    """
+    if WINDY_CELL_MODE == "geohash":
+        return geohash_cell(lat, lon, WINDY_GEOHASH_PRECISION)
+
+    g = WINDY_GRID_DEG
+    i, j = round(lat / g), round(lon / g)
+    return f"{i}:{j}@{g}", round(i * g, 6), round(j * g, 6)
+
+def current_run(now: float = None) -> int:
+    """
+    Nomor run model terakhir yang sudah tersedia (epoch / WINDY_RUN_HOURS).
+    """
+    now = time.time() if now is None else now
+    return int((now - WINDY_RUN_DELAY_HOURS * 3600) // (WINDY_RUN_HOURS * 3600))
+
+class WindyCache:
+    def __init__(self, fetch=windy_point_forecast):
+        self.fetch = fetch
+        self.entries = {} # key -> response Windy
+        self.inflight = {} # key -> asyncio.Task
+        self.stats = {"requests": 0, "upstream_calls": 0, "errors": 0, "audits": 0}
+        self.displacement = {"sum_km": 0.0, "max_km": 0.0}
+        self.audit_error = {} # field -> {"sum": .., "max": .., "n": ..}
+
+    async def get(self, lat: float, lon: float, model: str = "gfs", parameters=None, levels=None) -> dict:
+        """
+        Pengganti windy_point_forecast(lat, lon, ...) yang berbagi hasil per sel grid.
+        """
+        cell_id, cell_lat, cell_lon = snap(lat, lon)
+        run = current_run()
+        key = (cell_id, model, tuple(parameters or ()), tuple(levels or ()), run)
+
+        self.stats["requests"] += 1
+        d = haversine_distance(lat, lon, cell_lat, cell_lon)
+        self.displacement["sum_km"] += d
+        self.displacement["max_km"] = max(self.displacement["max_km"], d)
+
+        data = self.entries.get(key)
+        if data is None:
+            task = self.inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._fetch(key, cell_lat, cell_lon, model, parameters, levels))
+                self.inflight[key] = task
+                task.add_done_callback(lambda _: self.inflight.pop(key, None))
+            data = await asyncio.shield(task)
+
+        if WINDY_CACHE_AUDIT_RATE > 0 and random.random() < WINDY_CACHE_AUDIT_RATE:
+            await self._audit(data, lat, lon, model, parameters, levels)
+        return data
+
+    async def _fetch(self, key, lat, lon, model, parameters, levels):
+        self.stats["upstream_calls"] += 1
+        try:
+            data = await self.fetch(lat, lon, model=model, parameters=parameters, levels=levels)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+
+        # Buang entry dari run model sebelumnya
+        run = key[-1]
+        for old in [k for k in self.entries if k[-1] < run]:
+            del self.entries[old]
+        self.entries[key] = data
+        return data
+
+    async def _audit(self, cell_data, lat, lon, model, parameters, levels):
+        """
+        Bandingkan nilai terbaru di pusat sel dengan nilai di titik asli.
+        """
+        try:
+            exact = await self.fetch(lat, lon, model=model, parameters=parameters, levels=levels)
+        except Exception as e:
+            print(f"⚠️ Windy Audit Error: {e}")
+            return
+        self.stats["audits"] += 1
+
+        cell_latest = parse_windy_latest(cell_data) or {}
+        exact_latest = parse_windy_latest(exact) or {}
+        for field in ("temp_c", "gust_ms", "wind_speed_ms", "pressure_pa", "precip_3h_mm"):
+            a, b = cell_latest.get(field), exact_latest.get(field)
+            if a is None or b is None:
+                continue
+            err = abs(a - b)
+            s = self.audit_error.setdefault(field, {"sum": 0.0, "max": 0.0, "n": 0})
+            s["sum"] += err
+            s["max"] = max(s["max"], err)
+            s["n"] += 1
+
+    def metrics(self) -> dict:
+        """
+        Penghematan API (request vs upstream call) dan error karena titik digeser ke pusat sel.
+        """
+        requests = self.stats["requests"]
+        calls = self.stats["upstream_calls"]
+        return {
+            **self.stats,
+            "mode": WINDY_CELL_MODE,
+            "cell": WINDY_GEOHASH_PRECISION if WINDY_CELL_MODE == "geohash" else WINDY_GRID_DEG,
+            "saved_calls": max(0, requests - calls),
+            "saved_ratio": round(1 - calls / requests, 3) if requests else None,
+            "displacement_km": {
+                "mean": round(self.displacement["sum_km"] / requests, 2) if requests else None,
+                "max": round(self.displacement["max_km"], 2),
+            },
+            "audit_error": {
+                f: {"mean": round(s["sum"] / s["n"], 3), "max": round(s["max"], 3), "n": s["n"]}
+                for f, s in self.audit_error.items()
+            },
+        }
+
+# Instance global untuk storm_monitor & weather_logger_system
+windy_forecasts = WindyCache()
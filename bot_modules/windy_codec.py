@@ -0,0 +1,92 @@
+"""
+Encoding ringkas untuk response Windy Point Forecast yang disimpan di weather_logs.
+
+Semua array parameter (panjang sama dengan ts) dipack sebagai float32 little-endian,
+ts sebagai int64, lalu digabung jadi satu blob (opsional dikompres zstd / zlib).
+"""
+import array
+import sys
+import zlib
+from bson import Binary
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def _pack(typecode: str, values) -> bytes:
+    arr = array.array(typecode, values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+def _unpack(typecode: str, raw: bytes) -> list:
+    arr = array.array(typecode)
+    arr.frombytes(raw)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tolist()
+
+def _is_number_list(v) -> bool:
+    return isinstance(v, list) and all(x is None or isinstance(x, (int, float)) for x in v)
+
+def encode_windy(windy: dict, compress: bool = True) -> dict:
+    """
+    Ubah response Windy jadi dokumen ringkas. Field yang bukan array angka
+    (units, warning, dll) disimpan apa adanya di "meta".
+    """
+    ts = windy.get("ts") or []
+    n = len(ts)
+
+    keys, meta = [], {}
+    for k, v in windy.items():
+        if k == "ts":
+            continue
+        if _is_number_list(v) and len(v) == n:
+            keys.append(k)
+        else:
+            meta[k] = v
+
+    # None (data kosong) disimpan sebagai NaN
+    blob = _pack("q", ts) + b"".join(
+        _pack("f", [float("nan") if x is None else x for x in windy[k]]) for k in keys
+    )
+
+    enc = "f32"
+    if compress:
+        if zstandard is not None:
+            blob = zstandard.ZstdCompressor(level=9).compress(blob)
+            enc = "f32+zstd"
+        else:
+            blob = zlib.compress(blob, 9)
+            enc = "f32+zlib"
+
+    return {"enc": enc, "n": n, "keys": keys, "meta": meta, "blob": Binary(blob)}
+
+def decode_windy(stored) -> dict:
+    """
+    Kembalikan struktur response Windy asli (yang dipakai parse_windy_latest).
+    Dokumen lama (raw) dikembalikan apa adanya.
+    """
+    if not isinstance(stored, dict) or "enc" not in stored:
+        return stored
+
+    blob = bytes(stored["blob"])
+    enc = stored["enc"]
+    if enc == "f32+zstd":
+        if zstandard is None:
+            raise RuntimeError("Paket zstandard dibutuhkan untuk decode forecast_raw (f32+zstd)")
+        blob = zstandard.ZstdDecompressor().decompress(blob)
+    elif enc == "f32+zlib":
+        blob = zlib.decompress(blob)
+
+    n = stored["n"]
+    windy = dict(stored.get("meta") or {})
+    windy["ts"] = _unpack("q", blob[:n * 8])
+
+    offset = n * 8
+    for k in stored["keys"]:
+        values = _unpack("f", blob[offset:offset + n * 4])
+        windy[k] = [None if v != v else v for v in values] # NaN -> None
+        offset += n * 4
+    return windy
@@ -0,0 +1,69 @@
+"""
+Demo leader election & partisi (bot_modules/leader.py) dengan beberapa proses lokal.
+
+Butuh mongod lokal, tidak butuh token Telegram:
+    MONGO_URI=mongodb://localhost:27017 python demo_leader.py --workers 3 --duration 90
+
+Setiap worker memperebutkan lease poller sistem + polling Telegram, dan membagi
+daftar kode ADM4 contoh. Di tengah demo worker pertama dimatikan (SIGKILL, tanpa
+melepas lease) untuk melihat failover setelah LEASE_TTL_SECONDS.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+SAMPLE_KEYS = [f"11.71.01.20{i:02d}" for i in range(12)]
+LEASES = ["mhews:SYSTEM:eq", "mhews:SYSTEM:rss", "mhews:SYSTEM:wlog", "telegram-poll"]
+
+async def worker():
+    from bot_modules import leader
+
+    leader.manage(*LEASES)
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+
+    async def report():
+        mine = [k for k in SAMPLE_KEYS if leader.owns(k)]
+        leases = sorted(n.split(":")[-1] for n in leader.held)
+        print(f"[{leader.WORKER_ID}] hidup={len(leader.live_workers)} lease={leases} adm4={len(mine)}", flush=True)
+
+    await leader.run(stop, on_tick=report)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--duration", type=int, default=90)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(worker())
+        return
+
+    env = dict(os.environ, BOT_CLUSTER="1", HEARTBEAT_SECONDS=os.getenv("HEARTBEAT_SECONDS", "3"),
+               LEASE_TTL_SECONDS=os.getenv("LEASE_TTL_SECONDS", "10"))
+    procs = []
+    for i in range(args.workers):
+        name = f"demo-{i + 1}"
+        procs.append(subprocess.Popen(
+            [sys.executable, __file__, "--worker", name], env=dict(env, WORKER_ID=name)
+        ))
+        time.sleep(1)
+
+    try:
+        time.sleep(args.duration / 2)
+        print("💥 Mematikan demo-1 (tanpa melepas lease)", flush=True)
+        procs[0].kill()
+        time.sleep(args.duration / 2)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+
+if __name__ == "__main__":
+    main()
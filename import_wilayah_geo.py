@@ -0,0 +1,83 @@
+"""
+Import centroid / batas desa ke koleksi wilayah_geo (untuk AUTO_DETECT_MODE=local).
+
+Sumber:
+- GeoJSON FeatureCollection Polygon/MultiPolygon dengan properti kode desa
+  (adm4 / kode / kode_desa / KDEPUM / code / id, format "11.01.01.2001" atau "1101012001")
+- CSV code,lat,lon (hanya centroid)
+
+Jalankan:
+    python import_wilayah_geo.py batas_desa.geojson [nama_properti_kode] [--no-polygons]
+"""
+import os
+import sys
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+from bot_modules.spatial_index import read_geo_file
+
+# Load Env
+load_dotenv()
+MONGO_URI = os.getenv("MONGO_URI")
+
+if not MONGO_URI:
+    print("❌ MONGO_URI missing in .env")
+    exit(1)
+
+# Connect DB
+try:
+    client = MongoClient(MONGO_URI)
+    db = client["emergency_db"]
+    col = db["wilayah_geo"]
+    print("✅ Connected to MongoDB")
+except Exception as e:
+    print(f"❌ DB Connection Error: {e}")
+    exit(1)
+
+def run_import(path, code_field=None, with_polygons=True):
+    if not os.path.exists(path):
+        print(f"❌ File {path} not found!")
+        return
+
+    print("🚀 Starting Import...")
+    col.drop()
+    print("🗑️ Dropped existing 'wilayah_geo' collection.")
+
+    docs = []
+    batch_size = 2000
+    total = 0
+
+    for rec in read_geo_file(path, code_field=code_field, with_polygons=with_polygons):
+        doc = {
+            "_id": rec["code"],
+            "centroid": {"type": "Point", "coordinates": [rec["lon"], rec["lat"]]},
+        }
+        if rec.get("polygons"):
+            doc["geometry"] = {
+                "type": "MultiPolygon",
+                "coordinates": [[[list(p) for p in ring] for ring in poly] for poly in rec["polygons"]]
+            }
+        docs.append(doc)
+
+        if len(docs) >= batch_size:
+            col.insert_many(docs)
+            total += len(docs)
+            print(f"📦 Imported {total} rows...")
+            docs = []
+
+    if docs:
+        col.insert_many(docs)
+        total += len(docs)
+
+    print(f"🎉 Import Finished: {total} wilayah.")
+
+    # Centroid 2dsphere untuk query $near dari luar aplikasi; lookup bot/API memakai KD-tree di memori
+    col.create_index([("centroid", "2dsphere")])
+    print("✅ Indexes Created (centroid: 2dsphere).")
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print("Usage: python import_wilayah_geo.py <file.geojson|file.csv> [code_field] [--no-polygons]")
+        exit(1)
+    run_import(args[0], args[1] if len(args) > 1 else None, "--no-polygons" not in sys.argv)
@@ -0,0 +1,68 @@
+import os
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+from bot_modules.timeseries import ensure_weather_timeseries, apply_rollups, WEATHER_LOG_TTL_DAYS
+
+# Load Env
+load_dotenv()
+MONGO_URI = os.getenv("MONGO_URI")
+
+if not MONGO_URI:
+    print("❌ MONGO_URI missing in .env")
+    exit(1)
+
+client = MongoClient(MONGO_URI)
+db = client["emergency_db"]
+
+LEGACY = "weather_logs_legacy"
+BATCH_SIZE = 2000
+
+def run_migration():
+    """
+    Pindahkan weather_logs (koleksi biasa) ke koleksi time-series + isi rollup.
+    Koleksi lama disimpan sebagai weather_logs_legacy (hapus manual setelah dicek).
+    """
+    info = next(db.list_collections(filter={"name": "weather_logs"}), None)
+    if info and info.get("type") == "timeseries":
+        print("✅ weather_logs sudah time-series, tidak ada yang dimigrasi.")
+        return
+
+    if info:
+        db.weather_logs.rename(LEGACY)
+        print(f"📦 weather_logs -> {LEGACY}")
+
+    ensure_weather_timeseries(db)
+    print(f"⏱ TTL data mentah: {WEATHER_LOG_TTL_DAYS} hari")
+
+    if LEGACY not in db.list_collection_names():
+        print("🎉 Tidak ada data lama.")
+        return
+
+    copied = skipped = 0
+    docs = []
+
+    def flush():
+        nonlocal copied
+        db.weather_logs.insert_many(docs, ordered=False)
+        apply_rollups(db, docs)
+        copied += len(docs)
+        print(f"📦 Copied {copied} logs...")
+        docs.clear()
+
+    for doc in db[LEGACY].find({}).sort("timestamp", 1):
+        # Time-series wajib punya timestamp bertipe date
+        if "timestamp" not in doc or not hasattr(doc["timestamp"], "year"):
+            skipped += 1
+            continue
+        docs.append(doc)
+        if len(docs) >= BATCH_SIZE:
+            flush()
+
+    if docs:
+        flush()
+
+    print(f"🎉 Migration Finished. Copied: {copied}, skipped (tanpa timestamp): {skipped}")
+
+if __name__ == "__main__":
+    run_migration()
@@ -62,5 +62,47 @@ def test_precip_calculation():
     db.locations.delete_one({"_id": loc_id})
     db.weather_logs.delete_many({"location_id": loc_id})
 
+def test_bot_payload_latest_forecast():
+    print("🧪 Testing latest_forecast dari payload bot (source BMKG_API)...")
+    from bot_modules.log_store import validate_logs, store_weather_logs
+    from bot_modules.schemas import WeatherLog
+
+    # Lokasi bot: _id ObjectId, location_id di payload = str(_id)
+    loc_id = db.locations.insert_one({"name": "Test Bot Location", "lat": 5.55, "lon": 95.32}).inserted_id
+    now = datetime.now(timezone.utc)
+    # Bentuk sama dengan jobs.build_bmkg_payload
+    payload = {
+        "location_id": str(loc_id),
+        "timestamp": now.isoformat(),
+        "source": "BMKG_API",
+        "data": {"temp": 30, "humidity": 70, "weather_desc": "Cerah", "precip_mm": 0.0, "wind_speed": 2.5},
+        "forecast_3h": [{"time": "+3h", "temp": 29, "desc": "Berawan", "humidity": 75, "wind_speed": 3.0, "precip": 0.0}]
+    }
+
+    try:
+        docs, errors = validate_logs(WeatherLog, [payload])
+        rollup_errors = []
+        inserted = store_weather_logs(db, docs, errors, rollup_errors)
+        view = db.latest_forecast.find_one({"_id": str(loc_id)})
+
+        if errors or rollup_errors or len(inserted) != 1:
+            print(f"❌ Store gagal: errors={errors} rollup_errors={rollup_errors}")
+        elif not view:
+            print("❌ latest_forecast tidak diperbarui untuk payload bot")
+        elif view["source"] != "BMKG" or view["location_name"] != "Test Bot Location":
+            print(f"❌ View salah: source={view['source']} location_name={view.get('location_name')}")
+        else:
+            print("✅ latest_forecast terisi dari payload bot (source dinormalisasi ke BMKG)")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+    # Cleanup
+    db.locations.delete_one({"_id": loc_id})
+    db.weather_logs.delete_many({"location_id": str(loc_id)})
+    db.latest_forecast.delete_one({"_id": str(loc_id)})
+    for name in ("weather_rollups_hourly", "weather_rollups_daily"):
+        db[name].delete_many({"_id.location_id": str(loc_id)})
+
 if __name__ == "__main__":
     test_precip_calculation()
+    test_bot_payload_latest_forecast()